@@ -11,18 +11,17 @@ import sys
 import tempfile
 import urllib.parse
 from datetime import datetime, timezone
+from http import HTTPStatus
 from pathlib import Path
 from typing import TYPE_CHECKING, Any
 
 from pyodide_lock import PyodideLockSpec
-from pyodide_lock.utils import add_wheels_to_spec
 
 if sys.version_info >= (3, 11):
     import tomllib
 else:
     import tomli as tomllib
 
-import pkginfo
 from jupyterlite_core.constants import JSON_FMT, UTF8
 from jupyterlite_core.trait_types import TypedTuple
 from packaging.requirements import Requirement
@@ -30,12 +29,14 @@ from packaging.utils import canonicalize_name
 from psutil import Popen
 from traitlets import Unicode, default
 
+from jupyterlite_pyodide_lock.catalog import add_wheels_to_spec
 from jupyterlite_pyodide_lock.constants import (
     PYODIDE_LOCK,
     PYODIDE_LOCK_STEM,
     RE_REMOTE_URL,
 )
 from jupyterlite_pyodide_lock.lockers._base import BaseLocker  # noqa: PLC2701
+from jupyterlite_pyodide_lock.proxy_cache import write_bytes_atomic
 from jupyterlite_pyodide_lock.utils import find_binary
 
 if TYPE_CHECKING:
@@ -50,16 +51,16 @@ class UvLocker(BaseLocker):
     uv_bin: str = Unicode(help="a custom executable for ``uv``").tag(config=True)
     uv_platform: str = Unicode(
         "wasm32-pyodide2024", help="the ``uv`` python platform"
-    ).tag(config=True)
+    ).tag(config=True, cassette=True)
     uv_pip_compile_args = TypedTuple(
         Unicode(),
         default_value=["--format=pylock.toml", "--no-build"],
         help="arguments to ``uv pip compile``",
-    ).tag(config=True)
+    ).tag(config=True, cassette=True)
     extra_uv_pip_compile_args = TypedTuple(
         Unicode(),
         help=("extra arguments to ``uv pip compile``, such as ``--default-index``"),
-    ).tag(config=True)
+    ).tag(config=True, cassette=True)
 
     # trait defaults
     @default("uv_bin")
@@ -72,8 +73,14 @@ class UvLocker(BaseLocker):
         self.cache_dir.mkdir(parents=True, exist_ok=True)
         reqs = self.build_requirements_txt()
         self.build_constraints_txt(reqs)
-        self.run_pip_compile()
-        self.build_pyodide_lock()
+        try:
+            if not self.run_pip_compile():
+                return False
+            self.build_pyodide_lock()
+        finally:
+            if self._cassette:
+                self._cassette.save()
+                self._cassette.close()
         return True
 
     def build_requirements_txt(self) -> dict[str, str]:
@@ -107,6 +114,13 @@ class UvLocker(BaseLocker):
             name = canonicalize_name(req.name)
             package_specs[name] = constraint
 
+        for pin in self.pins:
+            name = canonicalize_name(Requirement(pin).name)
+            if name in package_specs:  # pragma: no cover
+                self.log.debug("[uv] [constraints] [%s] not pinning %s", name, pin)
+                continue
+            package_specs[name] = pin
+
         self.constraints_txt.write_text(
             "\n".join(sorted(package_specs.values())), **UTF8
         )
@@ -139,14 +153,21 @@ class UvLocker(BaseLocker):
             ])
         return {name: spec}
 
-    def run_pip_compile(self) -> None:
-        """Run a constrained ``uv pip compile``."""
+    def run_pip_compile(self) -> bool:
+        """Run a constrained ``uv pip compile``, returning whether it succeeded.
+
+        Any ``pylock.toml`` from a previous run is removed first, so a failed solve
+        is never mistaken for a new one.
+        """
+        self.pylock.unlink(missing_ok=True)
         args = [*self.all_uv_pip_compile_args]
         self.log.debug("[uv] [compile] %s", "\t".join(args))
         proc = Popen(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
         out = proc.communicate()
         if proc.returncode != 0:
             self.log.error("[uv] [compile] error %s: %s", proc.returncode, out)
+            return False
+        return self.pylock.exists()
 
     def build_pyodide_lock(self) -> None:
         """Update ``{out_dir}/pyodide-lock/pyodide-lock.json`` from wheels."""
@@ -179,15 +200,11 @@ class UvLocker(BaseLocker):
     ) -> dict[str, Any]:
         """Use local wheels to make a patched ``pyodide-lock.json``."""
         with tempfile.TemporaryDirectory() as td:
-            tdp = Path(td)
-            tmp_lock = tdp / PYODIDE_LOCK
-            self.parent.copy_one(old_lockfile, tdp / PYODIDE_LOCK)
-            [
-                self.parent.copy_one(path, tdp / path.name)
-                for path in sorted(set(wheels))
-            ]
-            spec = PyodideLockSpec.from_json(tdp / PYODIDE_LOCK)
-            spec = add_wheels_to_spec(spec, [*tdp.glob("*.whl")])
+            tmp_lock = Path(td) / PYODIDE_LOCK
+            spec = PyodideLockSpec.from_json(old_lockfile)
+            spec = add_wheels_to_spec(
+                spec, sorted(set(wheels)), self.parent.wheel_catalog
+            )
             spec.to_json(tmp_lock)
             return {**json.loads(tmp_lock.read_text(**UTF8))}
 
@@ -212,7 +229,7 @@ class UvLocker(BaseLocker):
             else:
                 # copy to be sibling of lockfile, leaving name unchanged
                 dest = lock_dir / file_name
-                self.parent.copy_one(found_path, dest)
+                self.parent.install_wheel(found_path, dest)
                 new_file_name = f"../../static/{PYODIDE_LOCK_STEM}/{file_name}"
         else:
             new_file_name = f"{self.parent.pyodide_cdn_url}/{just_file_name}"
@@ -250,20 +267,34 @@ class UvLocker(BaseLocker):
                 self.log.debug("[uv] [%s] already cached: %s", pkg["name"], dest)
             else:
                 self.log.debug("[uv] [%s] downloading: %s", pkg["name"], dest)
-                self.parent.fetch_one(raw_url, dest)
+                self.fetch_or_replay(raw_url, dest)
+
+            if dest.exists() and self._cassette and self._cassette.recording:
+                self._cassette.record(raw_url, HTTPStatus.OK, {}, dest.read_bytes())
 
         if dest and dest.exists():
             self.log.debug("[uv] [%s] will be locked: %s", pkg["name"], dest.name)
             yield dest
 
+    def fetch_or_replay(self, url: str, dest: Path) -> None:
+        """Download a wheel, or copy it from a replayed cassette."""
+        if not (self._cassette and self._cassette.replaying):
+            self.parent.fetch_one(url, dest)
+            return
+        played = self._cassette.play(url)
+        if played is None:
+            self.log.error("[uv] [cassette] not recorded: %s", url)
+            return
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        write_bytes_atomic(dest, played[2])
+
     def build_one_package_requirement(self, wheel: Path) -> dict[str, str]:
         """Build a ``package @ file://url`` spec for an on-disk wheel."""
-        info = pkginfo.get_metadata(f"{wheel}")
-        name = info and info.name
-        if not name:  # pragma: no cover
+        info = self.parent.wheel_catalog.get(wheel)
+        if info is None:  # pragma: no cover
             self.log.error("[uv] failed to parse wheel metadata for %s", wheel)
             return {}
-        name = canonicalize_name(name)
+        name = info["name"]
         return {name: f"{name} @ {wheel.absolute().as_uri()}"}
 
     # derived properties
@@ -306,6 +337,9 @@ class UvLocker(BaseLocker):
             *self.extra_uv_pip_compile_args,
         ]
 
+        if self._cassette and self._cassette.replaying:
+            args += ["--offline"]
+
         if self.parent.lock_date_epoch:
             rfc339 = datetime.fromtimestamp(
                 self.parent.lock_date_epoch, timezone.utc
@@ -0,0 +1,61 @@
+"""Tests of the ``uv`` locker without a network."""
+# Copyright (c) jupyterlite-pyodide-lock contributors.
+# Distributed under the terms of the BSD-3-Clause License.
+
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, Any
+
+from jupyterlite_core.constants import UTF8
+from jupyterlite_pyodide_lock_uv.locker import UvLocker
+from pyodide_lock import PyodideLockSpec
+from pyodide_lock.spec import InfoSpec
+from traitlets import Instance
+
+from jupyterlite_pyodide_lock.constants import PYODIDE_LOCK
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+INFO = InfoSpec(
+    arch="wasm32", platform="emscripten_3_1_58", version="0.26.0", python="3.12.1"
+)
+
+
+class OrphanUvLocker(UvLocker):
+    """A locker that doesn't need a ``PyodideLockAddon``."""
+
+    parent: Any = Instance(object, allow_none=True)
+
+
+def make_locker(tmp_path: Path, exit_code: int, pins: list[str]) -> UvLocker:
+    """Make a locker with a fake ``uv`` that exits with a code."""
+    out_pyodide = tmp_path / "output/static/pyodide"
+    out_pyodide.mkdir(parents=True)
+    PyodideLockSpec(info=INFO, packages={}).to_json(out_pyodide / PYODIDE_LOCK)
+    uv = tmp_path / "uv"
+    uv.write_text(f"#!/bin/sh\nexit {exit_code}\n", **UTF8)
+    uv.chmod(0o755)
+    locker = OrphanUvLocker(uv_bin=str(uv), specs=["foo"], pins=pins)
+    locker.parent = SimpleNamespace(
+        pyodide_addon=SimpleNamespace(output_pyodide=out_pyodide),
+        manager=SimpleNamespace(cache_dir=tmp_path / "cache"),
+        lockfile=tmp_path / "output/static/pyodide-lock" / PYODIDE_LOCK,
+        lock_date_epoch=None,
+        pyodide_cdn_url="https://example.com/pyodide",
+    )
+    return locker
+
+
+def test_locker_failed_compile(tmp_path: Path) -> None:
+    """Verify a failed pinned compile doesn't lock with an old ``pylock.toml``."""
+    locker = make_locker(tmp_path, 1, ["bar ==1.0.0"])
+    locker.cache_dir.mkdir(parents=True)
+    locker.pylock.write_text("packages = []\n", **UTF8)
+
+    assert not asyncio.run(locker.resolve())
+    assert not locker.pylock.exists()
+    assert not locker.parent.lockfile.exists()
+    assert locker.constraints_txt.read_text(**UTF8) == "bar ==1.0.0"
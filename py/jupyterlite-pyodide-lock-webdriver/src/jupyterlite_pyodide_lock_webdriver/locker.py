@@ -72,17 +72,12 @@ class WebDriverLocker(TornadoLocker):
 
         self._webdriver_task = asyncio.create_task(self._webdriver_get_async())
 
-        try:
-            while True:
-                if self._solve_halted:
-                    self.log.info("Lock is finished")
-                    break
+        await self.wait_for_solve()
 
-                await asyncio.sleep(1)
-        finally:
-            self.cleanup()
+        if self._solve_halted:
+            self.log.info("Lock is finished")
 
-    def cleanup(self) -> None:
+    def cleanup_client(self) -> None:
         """Clean up the WebDriver."""
         if self._webdriver:  # pragma: no cover
             for method in [self._webdriver.close, self._webdriver.quit]:
@@ -91,24 +86,26 @@ class WebDriverLocker(TornadoLocker):
                 except Exception as err:
                     self.log.debug("[webdriver] cleanup error: %s", err)
             self._webdriver = None
-        super().cleanup()
 
     async def _webdriver_get_async(self) -> None:
         """Wrap the blocking webdriver behavior for making a ``Task``."""
-        await asyncio.get_event_loop().run_in_executor(None, self._webdriver_get)
+        loop = asyncio.get_running_loop()
+        if not await loop.run_in_executor(None, self._webdriver_get):
+            self.halt_solve()
 
-    def _webdriver_get(self) -> None:
-        """Actually open the page (or fail)."""
+    def _webdriver_get(self) -> bool:
+        """Actually open the page, returning whether it could be opened."""
         if self._webdriver is None:  # pragma: no cover
             self.log.warning("[webdriver] halting because no webdriver")
-            self._solve_halted = True
-            return
+            return False
 
         try:
             self._webdriver.get(self.lock_html_url)
         except Exception as err:  # pragma: no cover
             self.log.warning("[webdriver] halting due to error: %s", err)
-            self._solve_halted = True
+            return False
+
+        return True
 
     # defaults
     @default("browser")
@@ -4,7 +4,6 @@
 
 from __future__ import annotations
 
-from hashlib import sha256
 from logging import Logger
 from pathlib import Path
 from typing import TYPE_CHECKING, Any
@@ -14,6 +13,7 @@ from jupyterlite_pyodide_kernel.constants import PYODIDE_JS, PYODIDE_LOCK
 from jupyterlite_pyodide_kernel.constants import PYODIDE_URL as OPTION_PYODIDE_URL
 from traitlets import Bool
 
+from jupyterlite_pyodide_lock.catalog import WheelCatalog, get_catalog
 from jupyterlite_pyodide_lock.constants import (
     LOAD_PYODIDE_OPTIONS,
     OPTION_LOCK_FILE_URL,
@@ -23,6 +23,15 @@ from jupyterlite_pyodide_lock.constants import (
     PYODIDE_LOCK_OFFLINE_ADDON,
     PYODIDE_LOCK_STEM,
 )
+from jupyterlite_pyodide_lock.downloads import fetch_many
+from jupyterlite_pyodide_lock.hashing import (
+    DigestMemo,
+    fetch_with_sha256,
+    get_digest_memo,
+)
+from jupyterlite_pyodide_lock.linking import Linker, get_linker
+from jupyterlite_pyodide_lock.store import WheelStore
+from jupyterlite_pyodide_lock.utils import url_sha256, url_wheel_filename
 
 if TYPE_CHECKING:
     from collections.abc import Generator
@@ -97,6 +106,96 @@ class BaseAddon(_BaseAddon):  # type: ignore[misc]
         """The root of the ``pyodide-lock`` cache."""
         return self.cache_dir / f"{PYODIDE_LOCK_STEM}"
 
+    @property
+    def wheel_store(self) -> WheelStore | None:
+        """The shared wheel store, if configured by ``PyodideLockAddon``."""
+        lock_addon = self.pyodide_lock_addon
+
+        if TYPE_CHECKING:
+            from jupyterlite_pyodide_lock.addons.lock import PyodideLockAddon
+
+            assert isinstance(lock_addon, PyodideLockAddon)
+
+        store_dir = lock_addon.wheel_store_dir
+        if not store_dir:
+            return None
+        return WheelStore(Path(store_dir), log=self.log, linker=self.linker)
+
+    @property
+    def wheel_catalog(self) -> WheelCatalog:
+        """The shared catalog of wheel metadata in the ``package_cache``."""
+        return get_catalog(self.package_cache / "wheel-catalog.sqlite3")
+
+    @property
+    def digests(self) -> DigestMemo:
+        """The shared memo of file digests in the ``package_cache``."""
+        return get_digest_memo(self.package_cache / "digests.json")
+
+    @property
+    def linker(self) -> Linker:
+        """The shared linker for the strategies configured by ``PyodideLockAddon``."""
+        lock_addon = self.pyodide_lock_addon
+
+        if TYPE_CHECKING:
+            from jupyterlite_pyodide_lock.addons.lock import PyodideLockAddon
+
+            assert isinstance(lock_addon, PyodideLockAddon)
+
+        return get_linker(tuple(lock_addon.link_strategies))
+
+    def fetch_one(self, url: str, dest: Path, sha256: str | None = None) -> None:
+        """Fetch one file, resolving wheels through the shared ``wheel_store``.
+
+        A stored wheel is found by its ``sha256``, if known from the argument or a
+        ``#sha256=`` URL fragment, or else by name. The ``sha256`` of a downloaded
+        file is calculated while it is written, and remembered for later verification.
+        """
+        if dest.exists():
+            self.log.info("[lock] [fetch] already downloaded %s, skipping", dest.name)
+            return
+
+        store = self.wheel_store
+        file_name = url_wheel_filename(url)
+
+        if store is None or file_name is None:
+            store = None
+        elif store.link_to(dest, file_name=file_name, sha256=sha256 or url_sha256(url)):
+            self.log.info("[lock] [store] reused %s", file_name)
+            return
+
+        digest = fetch_with_sha256(url, dest)
+        self.digests.record(dest, digest)
+
+        if store is None:
+            return
+
+        try:
+            store.add(dest, sha256=digest)
+        except OSError as err:  # pragma: no cover
+            self.log.warning("[lock] [store] failed to store %s: %s", file_name, err)
+
+    def install_wheel(self, src: Path, dest: Path) -> None:
+        """Place a wheel at a destination with the best available link strategy."""
+        strategy = self.linker.link(src, dest)
+        self.log.debug("[lock] [%s] %s to %s", strategy, src.name, dest.parent)
+
+    def fetch_many(self, pending: dict[str, Path]) -> bool:
+        """Download many remote files concurrently, bounded by ``PyodideLockAddon``."""
+        lock_addon = self.pyodide_lock_addon
+
+        if TYPE_CHECKING:
+            from jupyterlite_pyodide_lock.addons.lock import PyodideLockAddon
+
+            assert isinstance(lock_addon, PyodideLockAddon)
+
+        return fetch_many(
+            self.fetch_one,
+            pending,
+            max_workers=lock_addon.fetch_max_workers,
+            max_per_host=lock_addon.fetch_max_per_host,
+            log=self.log,
+        )
+
     def patch_config(self, jupyterlite_json: Path, lockfile: Path) -> None:
         """Update the runtime ``jupyter-lite-config.json``."""
         self.log.debug("[lock] patching %s for pyodide-lock", jupyterlite_json)
@@ -109,7 +208,7 @@ class BaseAddon(_BaseAddon):  # type: ignore[misc]
         settings[OPTION_PYODIDE_URL] = url
 
         rel = lockfile.relative_to(self.output_dir).as_posix()
-        lock_hash = sha256(lockfile.read_bytes()).hexdigest()
+        lock_hash = self.digests.sha256(lockfile)
         load_pyodide_options = settings.setdefault(LOAD_PYODIDE_OPTIONS, {})
 
         lock_addon = self.pyodide_lock_addon
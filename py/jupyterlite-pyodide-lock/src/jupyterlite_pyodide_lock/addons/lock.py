@@ -15,7 +15,6 @@ from datetime import datetime, timezone
 from pathlib import Path
 from typing import TYPE_CHECKING, Any, ClassVar
 
-import pkginfo
 from doit.tools import config_changed
 from jupyterlite_core.constants import JUPYTERLITE_JSON, LAB_EXTENSIONS, UTF8
 from jupyterlite_core.trait_types import TypedTuple
@@ -25,22 +24,32 @@ from jupyterlite_pyodide_kernel.constants import (
     PKG_JSON_WHEELDIR,
     PYODIDE_LOCK,
 )
-from traitlets import CInt, Enum, Unicode, default
+from packaging.requirements import Requirement
+from packaging.utils import canonicalize_name, parse_wheel_filename
+from traitlets import Bool, CInt, Enum, Unicode, default
 
 from jupyterlite_pyodide_lock import __version__
 from jupyterlite_pyodide_lock.addons._base import BaseAddon
 from jupyterlite_pyodide_lock.constants import (
+    BROWSER_LOCKER_CACHE,
     ENV_VAR_LOCK_DATE_EPOCH,
+    ENV_VAR_WHEEL_STORE,
+    LINK_STRATEGIES,
     PYODIDE_CDN_URL,
     PYODIDE_CORE_URL,
     PYODIDE_LOCK_STEM,
     RE_REMOTE_URL,
     WAREHOUSE_UPLOAD_FORMAT,
 )
+from jupyterlite_pyodide_lock.lock_cache import LockResultCache, get_inputs_digest
 from jupyterlite_pyodide_lock.lockers import get_locker_entry_points
+from jupyterlite_pyodide_lock.lockers.handlers.wheelhouse import find_wheelhouse_wheels
+from jupyterlite_pyodide_lock.proxy_cache import ProxyCache
+from jupyterlite_pyodide_lock.store import get_default_wheel_store_dir
 from jupyterlite_pyodide_lock.utils import url_wheel_filename
 
 if TYPE_CHECKING:
+    from collections.abc import Callable
     from importlib.metadata import EntryPoint
     from logging import Logger
 
@@ -167,6 +176,52 @@ class PyodideLockAddon(BaseAddon):
         ),
     ).tag(config=True)  # type: ignore[assignment]
 
+    fetch_max_workers: int = CInt(
+        default_value=8,
+        min=1,
+        help="the maximum number of remote packages to download at once",
+    ).tag(config=True)  # type: ignore[assignment]
+
+    fetch_max_per_host: int = CInt(
+        default_value=4,
+        min=1,
+        help="the maximum number of remote packages to download at once from one host",
+    ).tag(config=True)  # type: ignore[assignment]
+
+    lock_cache: bool = Bool(
+        default_value=True,
+        help=(
+            "whether to restore a previously-solved ``pyodide-lock.json`` with"
+            " identical inputs from the ``cache_dir``, rather than solving again"
+        ),
+    ).tag(config=True)  # type: ignore[assignment]
+
+    incremental: bool = Bool(
+        default_value=False,
+        help=(
+            "whether to seed a new solve with ``==`` pins from the previous"
+            " ``pyodide-lock.json``, falling back to a full solve if they conflict."
+            " Requires ``micropip >=0.9.0``."
+        ),
+    ).tag(config=True)  # type: ignore[assignment]
+
+    wheel_store_dir: str = Unicode(
+        help=(
+            "a folder of wheels keyed by ``sha256``, shared by all builds and"
+            " projects: if empty, wheels will not be shared. Defaults to"
+            f" ``${ENV_VAR_WHEEL_STORE}`` or a folder in the user cache"
+        ),
+    ).tag(config=True)  # type: ignore[assignment]
+
+    link_strategies: tuple[str, ...] = TypedTuple(
+        Enum(values=LINK_STRATEGIES),
+        default_value=LINK_STRATEGIES,
+        help=(
+            "ways to place wheels in the ``{output_dir}``, tried in order for each"
+            " pair of filesystems: use ``['copy']`` to always make full copies"
+        ),
+    ).tag(config=True)
+
     # JupyterLite API methods
     def pre_status(self, manager: LiteManager) -> TTaskGenerator:
         """Patch configuration of ``PyodideAddon`` if needed."""
@@ -201,11 +256,20 @@ class PyodideLockAddon(BaseAddon):
                 ]
 
             if self.enabled:
+                lock_cache = self.lock_cache_dir if self.lock_cache else None
+                proxy_stats = ProxyCache.read_stats(
+                    manager.cache_dir / BROWSER_LOCKER_CACHE
+                )
                 lines += [
                     f"""locker:       {self.locker}""",
                     f"""specs:        {", ".join(self.specs)}""",
                     f"""packages:     {", ".join(self.packages)}""",
                     f"""fallback:     {self.pyodide_cdn_url}""",
+                    f"""lock cache:   {lock_cache}""",
+                    f"""incremental:  {self.incremental}""",
+                    f"""wheel store:  {self.wheel_store_dir or None}""",
+                    f"""linking:      {self.get_link_strategy()}""",
+                    f"""proxy cache:  {ProxyCache.describe_stats(proxy_stats)}""",
                 ]
 
             print(indent("\n".join(lines), "    "), flush=True)
@@ -217,6 +281,19 @@ class PyodideLockAddon(BaseAddon):
         if not self.enabled:  # pragma: no cover
             return
 
+        pending: dict[str, Path] = {}
+
+        for path_or_url in self.package_candidates:
+            pending.update(self.get_pending_fetch(path_or_url, self.package_cache))
+
+        if pending:
+            yield self.task(
+                name="fetch",
+                doc=f"fetch {len(pending)} remote wheels",
+                actions=[(self.fetch_many, [pending])],
+                targets=[*pending.values()],
+            )
+
         for path_or_url in self.package_candidates:
             yield from self.resolve_one_file_requirement(
                 path_or_url,
@@ -238,6 +315,7 @@ class PyodideLockAddon(BaseAddon):
         out_lock = json.loads(out_lockfile.read_text(**UTF8))
 
         lock_dep_wheels = []
+        bootstrap_pending: dict[str, Path] = {}
 
         for dep in self.bootstrap_wheels:
             file_name = url_wheel_filename(dep)
@@ -250,10 +328,14 @@ class PyodideLockAddon(BaseAddon):
             if out_whl.exists():  # pragma: no cover
                 continue
             lock_dep_wheels += [out_whl]
+            bootstrap_pending[url] = out_whl
+
+        if bootstrap_pending:
             yield self.task(
-                name=f"bootstrap:{dep}",
-                actions=[(self.fetch_one, [url, out_whl])],
-                targets=[out_whl],
+                name="bootstrap",
+                doc=f"fetch {len(bootstrap_pending)} bootstrap wheels",
+                actions=[(self.fetch_many, [bootstrap_pending])],
+                targets=[*bootstrap_pending.values()],
             )
 
         args = {
@@ -316,21 +398,129 @@ class PyodideLockAddon(BaseAddon):
             self.log.exception("[lock] failed to load locker %s", self.locker)
             return False
 
-        # build
-        locker: BaseLocker = locker_class(
-            parent=self,
-            specs=specs,
+        digest = self.get_lock_inputs_digest(
             packages=packages,
-            lockfile=lockfile,
+            specs=specs,
             constraints=constraints,
+            wheelhouse_wheels=find_wheelhouse_wheels(
+                self.config, locker_class, Path(self.manager.lite_dir)
+            ),
+        )
+        result_cache = LockResultCache(
+            self.lock_cache_dir, log=self.log, linker=self.linker
         )
 
+        if self.lock_cache and result_cache.restore(digest, lockfile):
+            return True
+
+        pins = self.get_previous_pins(packages, specs, constraints)
+
         if self.lockfile.exists():  # pragma: no cover
             self.lockfile.unlink()
 
-        locker.resolve_sync()
+        def _make_locker(attempt_pins: list[str]) -> BaseLocker:
+            locker: BaseLocker = locker_class(
+                parent=self,
+                specs=specs,
+                packages=packages,
+                lockfile=lockfile,
+                constraints=constraints,
+                pins=attempt_pins,
+            )
+            return locker
+
+        if not resolve_with_pins(_make_locker, lockfile, pins, self.log):
+            return False
+
+        self.previous_lockfile.parent.mkdir(parents=True, exist_ok=True)
+        self.copy_one(self.lockfile, self.previous_lockfile)
+
+        if self.lock_cache:
+            result_cache.save(digest, lockfile)
 
-        return self.lockfile.exists()
+        return True
+
+    def get_link_strategy(self) -> str:
+        """Find the link strategy used from the ``package_cache`` to the output."""
+        try:
+            return self.linker.probe(self.package_cache, self.lock_output_dir)
+        except OSError as err:  # pragma: no cover
+            self.log.debug("[lock] failed to probe link strategy: %s", err)
+            return f"unknown ({err})"
+
+    def get_previous_pins(
+        self, packages: list[Path], specs: list[str], constraints: list[str]
+    ) -> list[str]:
+        """Get ``==`` pins for packages from a previous solve, if ``incremental``.
+
+        Packages which are directly required, constrained, provided as local wheels,
+        or unchanged from the bootstrap ``pyodide-lock.json`` are not pinned.
+        """
+        if not self.incremental:
+            return []
+
+        previous = self.lockfile if self.lockfile.exists() else self.previous_lockfile
+
+        if not previous.exists():
+            self.log.info("[lock] no previous lock to seed an incremental solve")
+            return []
+
+        old_packages = json.loads(previous.read_text(**UTF8))["packages"]
+        bootstrap_lock = self.pyodide_addon.output_pyodide / PYODIDE_LOCK
+        bootstrap_packages = json.loads(bootstrap_lock.read_text(**UTF8))["packages"]
+
+        unpinned = {
+            *[canonicalize_name(Requirement(s).name) for s in [*specs, *constraints]],
+            *[parse_wheel_filename(p.name)[0] for p in packages],
+        }
+
+        pins = []
+        for raw_name, pkg_info in sorted(old_packages.items()):
+            name = canonicalize_name(raw_name)
+            version = pkg_info["version"]
+            if name in unpinned or pkg_info.get("package_type") != "package":
+                continue
+            if bootstrap_packages.get(raw_name, {}).get("version") == version:
+                continue
+            pins += [f"{name} =={version}"]
+
+        self.log.info("[lock] seeding incremental solve with %s pins", len(pins))
+        self.log.debug("[lock] incremental pins: %s", pins)
+        return pins
+
+    def get_lock_inputs_digest(
+        self,
+        *,
+        packages: list[Path],
+        specs: list[str],
+        constraints: list[str],
+        wheelhouse_wheels: list[Path],
+    ) -> str:
+        """Get a digest of everything that can change the outcome of a solve."""
+        bootstrap_lock = self.pyodide_addon.output_pyodide / PYODIDE_LOCK
+        digests = self.digests.sha256_many(
+            [*packages, bootstrap_lock, *wheelhouse_wheels],
+            max_workers=self.fetch_max_workers,
+        )
+        inputs = {
+            "version": __version__,
+            "specs": [*specs],
+            "constraints": [*constraints],
+            "packages": {pkg.name: digests[pkg] for pkg in packages},
+            "bootstrap_lock": digests[bootstrap_lock],
+            "bootstrap_wheels": [*self.bootstrap_wheels],
+            "pyodide_cdn_url": self.pyodide_cdn_url,
+            "lock_date_epoch": self.lock_date_epoch,
+            "locker": self.locker,
+            "locker_config": self.locker_config,
+            "incremental": self.incremental,
+            "wheelhouse_wheels": [
+                [wheel.name, digests[wheel]] for wheel in wheelhouse_wheels
+            ],
+        }
+        digest = get_inputs_digest(inputs)
+        self.log.debug("[lock] inputs digest %s:\n%s", digest, pprint.pformat(inputs))
+        return digest
 
     # traitlets
     @default("lock_date_epoch")
@@ -339,6 +529,10 @@ class PyodideLockAddon(BaseAddon):
             return None
         return int(json.loads(os.environ[ENV_VAR_LOCK_DATE_EPOCH]))
 
+    @default("wheel_store_dir")
+    def _default_wheel_store_dir(self) -> str:
+        return str(get_default_wheel_store_dir())
+
     # derived properties
     @property
     def bootstrap_packages(self) -> list[str]:
@@ -349,6 +543,16 @@ class PyodideLockAddon(BaseAddon):
             wheels += [file_name or name_or_wheel]
         return wheels
 
+    @property
+    def lock_cache_dir(self) -> Path:
+        """The location of previously-solved lockfiles, keyed by their inputs."""
+        return self.package_cache / "lock-results"
+
+    @property
+    def previous_lockfile(self) -> Path:
+        """The location of the most recently solved ``pyodide-lock.json``."""
+        return self.package_cache / f"{PYODIDE_LOCK_STEM}-previous.json"
+
     @property
     def well_known_packages(self) -> Path:
         """The location of ``.whl`` in the ``{lite_dir}`` to pick up."""
@@ -400,21 +604,33 @@ class PyodideLockAddon(BaseAddon):
         return [*self.packages, *map(str, list_packages(self.well_known_packages))]
 
     # task generators
+    def get_pending_fetch(
+        self, path_or_url: str | Path, cache_root: Path
+    ) -> dict[str, Path]:
+        """Get the cache path of a remote wheel, if it still needs to be downloaded."""
+        cached = self.get_remote_cache_path(path_or_url, cache_root)
+        if cached is None or cached.exists():
+            return {}
+        return {f"{path_or_url}": cached}
+
+    def get_remote_cache_path(
+        self, path_or_url: str | Path, cache_root: Path
+    ) -> Path | None:
+        """Get the cache path of a remote wheel, or ``None`` for a local path."""
+        if not re.findall(RE_REMOTE_URL, f"{path_or_url}"):
+            return None
+        url = urllib.parse.urlparse(f"{path_or_url}")
+        return cache_root / f"""{url.path.split("/")[-1]}"""
+
     def resolve_one_file_requirement(
         self, path_or_url: str | Path, cache_root: Path
     ) -> TTaskGenerator:
-        """Download a wheel, and copy to the cache."""
-        if re.findall(RE_REMOTE_URL, f"{path_or_url}"):
-            url = urllib.parse.urlparse(f"{path_or_url}")
-            name = f"""{url.path.split("/")[-1]}"""
-            cached = cache_root / name
-            if not cached.exists():
-                yield self.task(
-                    name=f"fetch:{name}",
-                    doc=f"fetch the wheel {name}",
-                    actions=[(self.fetch_one, [f"{path_or_url}", cached])],
-                    targets=[cached],
-                )
+        """Copy a wheel to the ``{output_dir}``, once downloaded to the cache.
+
+        Remote wheels are downloaded by the ``fetch`` task from ``post_init``.
+        """
+        cached = self.get_remote_cache_path(path_or_url, cache_root)
+        if cached is not None:
             yield from self.copy_wheel(cached)
         else:
             local_path = (self.manager.lite_dir / path_or_url).resolve()
@@ -441,7 +657,7 @@ class PyodideLockAddon(BaseAddon):
             name=f"copy:whl:{wheel.name}",
             file_dep=[wheel],
             targets=[dest],
-            actions=[(self.copy_one, [wheel, dest])],
+            actions=[(self.install_wheel, [wheel, dest])],
         )
 
     def get_packages(self) -> list[Path]:
@@ -463,16 +679,18 @@ class PyodideLockAddon(BaseAddon):
                     ):
                         wheels += [target]
 
+        infos = self.wheel_catalog.get_many(wheels)
+
         for wheel in wheels:
-            metadata = pkginfo.get_metadata(str(wheel))
-            if not metadata or not metadata.name:  # pragma: no cover
+            info = infos.get(wheel)
+            if info is None:  # pragma: no cover
                 self.log.error("[lock] failed to parse wheel metadata for %s", wheel)
                 continue
-            if metadata.name in named_packages:
+            if info["name"] in named_packages:
                 self.log.warning(
-                    "[lock] clobbering %s with %s", named_packages[metadata.name], wheel
+                    "[lock] clobbering %s with %s", named_packages[info["name"]], wheel
                 )
-            named_packages[metadata.name] = wheel
+            named_packages[info["name"]] = wheel
 
         return sorted(named_packages.values())
 
@@ -484,3 +702,25 @@ def list_packages(package_dir: Path) -> list[Path]:
             operator.iadd, ([[*package_dir.glob(f"*{pkg}")] for pkg in [*ALL_WHL]])
         )
     )
+
+
+def resolve_with_pins(
+    make_locker: Callable[[list[str]], BaseLocker],
+    lockfile: Path,
+    pins: list[str],
+    log: Logger,
+) -> bool:
+    """Solve with any ``pins`` from a previous lock, then without, if that fails."""
+    for attempt_pins in [pins, []] if pins else [[]]:
+        make_locker(attempt_pins).resolve_sync()
+
+        if lockfile.exists():
+            return True
+
+        if attempt_pins:
+            log.warning(
+                "[lock] incremental solve with %s pins failed, solving fully",
+                len(attempt_pins),
+            )
+
+    return False
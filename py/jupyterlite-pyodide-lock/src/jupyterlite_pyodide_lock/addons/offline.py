@@ -7,15 +7,14 @@ from __future__ import annotations
 import json
 import re
 import urllib.parse
-from copy import deepcopy
-from hashlib import sha256
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 from typing import TYPE_CHECKING, Any, ClassVar
 
 from doit.tools import config_changed
 from jupyterlite_core.constants import JSON_FMT, JUPYTERLITE_JSON, UTF8
 from jupyterlite_core.trait_types import TypedTuple
 from jupyterlite_pyodide_kernel.constants import PYODIDE
-from packaging.utils import canonicalize_name
 from traitlets import Bool, Unicode, default
 
 from jupyterlite_pyodide_lock import __version__
@@ -25,10 +24,11 @@ from jupyterlite_pyodide_lock.constants import (
     PYODIDE_LOCK_STEM,
     RE_REMOTE_URL,
 )
+from jupyterlite_pyodide_lock.graph import LockGraph
+from jupyterlite_pyodide_lock.lock_cache import get_inputs_digest
 
 if TYPE_CHECKING:
     from logging import Logger
-    from pathlib import Path
 
     from jupyterlite_core.manager import LiteManager
     from packaging.utils import NormalizedName
@@ -102,6 +102,23 @@ class PyodideLockOfflineAddon(BaseAddon):
         """A convenience property for a derived offline ``pyodide-lock`` output."""
         return self.lockfile.parent / PYODIDE_LOCK_OFFLINE
 
+    @property
+    def offline_state(self) -> Path:
+        """The results of the last offline resolution, by package name."""
+        return self.package_cache / "offline-state.json"
+
+    @property
+    def offline_max_workers(self) -> int:
+        """The number of packages to verify at once, shared with downloads."""
+        lock_addon = self.pyodide_lock_addon
+
+        if TYPE_CHECKING:
+            from jupyterlite_pyodide_lock.addons.lock import PyodideLockAddon
+
+            assert isinstance(lock_addon, PyodideLockAddon)
+
+        return max(1, lock_addon.fetch_max_workers)
+
     @property
     def all_includes(self) -> list[str]:
         """Get all inclusion patterns."""
@@ -164,7 +181,11 @@ class PyodideLockOfflineAddon(BaseAddon):
 
     # offline logic
     def resolve_offline(self) -> bool:
-        """Download and rewrite lockfile with selected packages and dependencies."""
+        """Download and rewrite lockfile with selected packages and dependencies.
+
+        Packages with an unchanged lock entry and wheel reuse their previous result,
+        while the rest are fetched and verified concurrently.
+        """
         lock_data = json.loads(self.lockfile.read_text(**UTF8))
 
         raw_packages: dict[str, dict[str, Any]] = lock_data["packages"]
@@ -180,28 +201,73 @@ class PyodideLockOfflineAddon(BaseAddon):
         out_dir = self.lockfile.parent
         stem = f"../../static/{PYODIDE_LOCK_STEM}"
 
+        old_state = self.load_offline_state()
+        new_state: dict[str, dict[str, Any]] = {}
+        changed: dict[str, str] = {}
+
         for pkg_name in sorted({*leaf_included, *dep_included}):
-            self.resolve_one_offline(pkg_name, out_dir, stem, new_packages)
+            pkg_info = new_packages[pkg_name]
+            key = get_offline_key(pkg_info, stem)
+            old = old_state.get(pkg_name)
+            if old and old["key"] == key and is_offline_current(old):
+                self.log.debug("[offline] [%s] unchanged", pkg_name)
+                pkg_info.update(file_name=old["file_name"], sha256=old["sha256"])
+                new_state[pkg_name] = old
+            else:
+                changed[pkg_name] = key
+
+        self.log.info(
+            "[offline] %s of %s packages changed",
+            len(changed),
+            len(changed) + len(new_state),
+        )
+
+        self.fetch_many({
+            url: path
+            for pkg_name in changed
+            for url, path in self.get_offline_fetch(
+                new_packages[pkg_name], out_dir
+            ).items()
+        })
+
+        def _resolve(pkg_name: str) -> Path | None:
+            return self.resolve_one_offline(pkg_name, out_dir, stem, new_packages)
 
+        with ThreadPoolExecutor(max_workers=self.offline_max_workers) as executor:
+            dests = dict(zip(changed, executor.map(_resolve, changed), strict=True))
+
+        for changed_name, dest in dests.items():
+            if dest is not None:
+                new_state[changed_name] = get_offline_state(
+                    changed[changed_name], new_packages[changed_name], dest
+                )
+
+        self.digests.save()
         self.offline_lockfile.write_text(json.dumps(lock_data, **JSON_FMT))
+        self.offline_state.write_text(json.dumps(new_state, **JSON_FMT), **UTF8)
 
         return True
 
-    def resolve_one_offline(
-        self,
-        pkg_name: str,
-        out_dir: Path,
-        stem: str,
-        packages: dict[str, dict[str, Any]],
-    ) -> None:
-        """Rewrite a single package's info (if needed)."""
-        pkg_info = packages[pkg_name]
+    def load_offline_state(self) -> dict[str, dict[str, Any]]:
+        """Load the results of the last offline resolution, if any."""
+        if not self.offline_state.exists():
+            return {}
+        try:
+            state: dict[str, dict[str, Any]] = json.loads(
+                self.offline_state.read_text(**UTF8)
+            )
+        except json.JSONDecodeError as err:  # pragma: no cover
+            self.log.warning("[offline] ignoring invalid state: %s", err)
+            return {}
+        return state
+
+    def get_offline_paths(
+        self, pkg_info: dict[str, Any], out_dir: Path
+    ) -> tuple[str, Path, Path, str | None] | None:
+        """Get the name, cache path, destination and URL of a remote wheel."""
         file_name = pkg_info["file_name"]
         if not re.match(RE_REMOTE_URL, file_name):
-            self.log.debug(
-                "[offline] [%s] already available locally %s", pkg_name, file_name
-            )
-            return
+            return None
         url = urllib.parse.urlparse(file_name)
         whl_name = url.path.split("/")[-1]
         cache_whl = self.package_cache / whl_name
@@ -213,15 +279,55 @@ class PyodideLockOfflineAddon(BaseAddon):
             dest = pyodide_whl
             dest_url = f"../../static/{PYODIDE}/{whl_name}"
 
+        return whl_name, cache_whl, dest, dest_url
+
+    def get_offline_fetch(
+        self, pkg_info: dict[str, Any], out_dir: Path
+    ) -> dict[str, Path]:
+        """Get the URL and cache path of a wheel which must be downloaded."""
+        paths = self.get_offline_paths(pkg_info, out_dir)
+        if paths is None:
+            return {}
+        _whl_name, cache_whl, dest, _dest_url = paths
+        if dest.exists() or cache_whl.exists():
+            return {}
+        store = self.wheel_store
+        if store and store.link_to(cache_whl, sha256=pkg_info["sha256"]):
+            return {}
+        return {f"""{pkg_info["file_name"]}#sha256={pkg_info["sha256"]}""": cache_whl}
+
+    def resolve_one_offline(
+        self,
+        pkg_name: str,
+        out_dir: Path,
+        stem: str,
+        packages: dict[str, dict[str, Any]],
+    ) -> Path | None:
+        """Rewrite a single package's info (if needed), returning the local wheel."""
+        pkg_info = packages[pkg_name]
+        file_name = pkg_info["file_name"]
+        paths = self.get_offline_paths(pkg_info, out_dir)
+        if paths is None:
+            self.log.debug(
+                "[offline] [%s] already available locally %s", pkg_name, file_name
+            )
+            return None
+        whl_name, cache_whl, dest, dest_url = paths
+
         if not dest.exists():
+            if cache_whl.exists() and not self.digests.verify(
+                cache_whl, pkg_info["sha256"]
+            ):  # pragma: no cover
+                self.log.warning("[offline] [%s] refetching %s", pkg_name, cache_whl)
+                cache_whl.unlink()
             if not cache_whl.exists():  # pragma: no cover
                 self.log.info("[offline] [%s] fetching %s", pkg_name, file_name)
-                self.fetch_one(file_name, cache_whl)
-            self.copy_one(cache_whl, dest)
+                self.fetch_one(file_name, cache_whl, sha256=pkg_info["sha256"])
+            self.install_wheel(cache_whl, dest)
 
         pkg_info["file_name"] = dest_url or f"""{stem}/{whl_name}"""
         old_sha256 = pkg_info["sha256"]
-        whl_sha256 = sha256(dest.read_bytes()).hexdigest()
+        whl_sha256 = self.digests.sha256(dest)
         if old_sha256 != whl_sha256:  # pragma: no cover
             self.log.warning(
                 "[offline] fixing sha256 for %s: lock:%s observed:%s wheel:%s",
@@ -232,24 +338,25 @@ class PyodideLockOfflineAddon(BaseAddon):
             )
             pkg_info["sha256"] = whl_sha256
 
+        return dest
+
     def get_pruned_packages(
         self,
         raw_packages: dict[str, dict[str, Any]],
         leaf_included: set[NormalizedName],
         dep_included: set[NormalizedName],
     ) -> dict[str, dict[str, Any]]:
-        """Provide a copy of packages, potentially with pruning."""
+        """Provide a copy of packages, potentially with pruning.
+
+        Only the included packages, which may be rewritten, are copied.
+        """
         any_included = {*leaf_included, *dep_included}
-        raw_packages = deepcopy(raw_packages)
 
-        if self.prune:
-            new_packages = {
-                pkg_name: pkg_info
-                for pkg_name, pkg_info in raw_packages.items()
-                if pkg_name in any_included
-            }
-        else:
-            new_packages = raw_packages
+        new_packages = {
+            pkg_name: {**pkg_info} if pkg_name in any_included else pkg_info
+            for pkg_name, pkg_info in raw_packages.items()
+            if pkg_name in any_included or not self.prune
+        }
 
         pruned_names = sorted(p for p in raw_packages if p not in new_packages)
         self.log.warning(
@@ -264,51 +371,54 @@ class PyodideLockOfflineAddon(BaseAddon):
     def get_included_names(
         self, raw_packages: dict[str, dict[str, Any]]
     ) -> tuple[set[NormalizedName], set[NormalizedName]]:
-        """Generate the lock."""
-        includes = self.all_includes
-        excludes = self.all_excludes
-
-        leaf_included: set[NormalizedName] = set()
-        check_deps: set[NormalizedName] = set()
-
-        # get leaf deps on first pass
-        for raw_name, pkg_info in raw_packages.items():
-            pkg_name = canonicalize_name(raw_name)
-            if not self.is_included(raw_name, includes=includes, excludes=excludes):
-                self.log.debug("[offline] [%s] is excluded", pkg_name)
-                continue
-            leaf_included = {pkg_name, *leaf_included}
-            check_deps = {*check_deps, *map(canonicalize_name, pkg_info["depends"])}
+        """Find the packages matched by ``includes``, and their dependencies."""
+        graph = LockGraph(raw_packages, log=self.log)
 
+        leaf_included = graph.match(self.all_includes)
+        excluded = graph.match(self.all_excludes) - leaf_included
+
+        self.log.debug("[offline] %s excluded: %s", len(excluded), sorted(excluded))
         self.log.debug(
             "[offline] %s leaf deps: %s", len(leaf_included), sorted(leaf_included)
         )
+
+        for pkg_name, missing in sorted(graph.missing.items()):
+            self.log.warning(
+                "[offline] [%s] depends on packages not in the lock: %s",
+                pkg_name,
+                missing,
+            )
+
+        dep_included = graph.closure(leaf_included) - leaf_included
         self.log.debug(
-            "[offline] %s deps to check: %s", len(check_deps), sorted(check_deps)
+            "[offline] %s dependencies: %s", len(dep_included), sorted(dep_included)
         )
 
-        dep_included: set[NormalizedName] = set()
+        return leaf_included, dep_included
 
-        while check_deps:
-            pkg_name = check_deps.pop()
-            if pkg_name in leaf_included or pkg_name in dep_included:
-                continue
-            dep_included = {*dep_included, pkg_name}
-            new_deps = {*map(canonicalize_name, raw_packages[pkg_name]["depends"])}
-            if new_deps:
-                self.log.debug("[offline] dep %s depends on: %s", pkg_name, new_deps)
-                check_deps = {*check_deps, *new_deps}
 
-        return leaf_included, dep_included
+def get_offline_key(pkg_info: dict[str, Any], stem: str) -> str:
+    """Get a digest of a lock entry, before it is rewritten for offline use."""
+    return get_inputs_digest({"package": pkg_info, "stem": stem})
+
+
+def get_offline_state(key: str, pkg_info: dict[str, Any], dest: Path) -> dict[str, Any]:
+    """Describe the result of rewriting a package, to be reused if still current."""
+    stat = dest.stat()
+    return {
+        "key": key,
+        "file_name": pkg_info["file_name"],
+        "sha256": pkg_info["sha256"],
+        "dest": f"{dest}",
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+    }
+
 
-    def is_included(
-        self, pkg_name: str, includes: list[str], excludes: list[str]
-    ) -> bool:
-        """Get whether a package should be downloaded for offline use."""
-        included = any(re.match(i, pkg_name) for i in includes)
-        excluded = any(re.match(e, pkg_name) for e in excludes)
-        if included:
-            return included
-        if excluded:
-            return False
+def is_offline_current(state: dict[str, Any]) -> bool:
+    """Get whether the wheel from a previous offline result is unchanged."""
+    dest = Path(state["dest"])
+    if not dest.exists():
         return False
+    stat = dest.stat()
+    return (stat.st_size, stat.st_mtime_ns) == (state["size"], state["mtime_ns"])
@@ -0,0 +1,139 @@
+"""Record upstream HTTP responses of a solve, and replay them without a network."""
+# Copyright (c) jupyterlite-pyodide-lock contributors.
+# Distributed under the terms of the BSD-3-Clause License.
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import threading
+import zipfile
+from hashlib import sha256
+from logging import getLogger
+from typing import TYPE_CHECKING, Any
+
+from jupyterlite_core.constants import JSON_FMT
+
+from .constants import (
+    CASSETTE_HEADERS,
+    CASSETTE_INDEX,
+    CASSETTE_RECORD,
+    CASSETTE_REPLAY,
+)
+from .proxy_cache import write_bytes_atomic
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
+    from logging import Logger
+    from pathlib import Path
+
+#: a fallback logger
+_log = getLogger(__name__)
+
+#: bytes in a megabyte, for reporting
+MB = 1024 * 1024
+
+#: a recorded status code, headers, and body
+TPlayed = tuple[int, dict[str, str], bytes]
+
+
+def get_cassette_key(inputs: Mapping[str, Any]) -> str:
+    """Get a stable name for a cassette from the inputs of a solve."""
+    return sha256(json.dumps(inputs, sort_keys=True).encode("utf-8")).hexdigest()[:32]
+
+
+class Cassette:
+    """A ``zip`` of upstream responses, by URL, with each distinct body stored once.
+
+    While recording, bodies are written to a ``.partial`` folder next to the
+    cassette, which is only packed into place by ``save``.
+    """
+
+    path: Path
+    mode: str
+    log: Logger
+    #: the status, headers, and body digest of each URL
+    entries: dict[str, dict[str, Any]]
+    _zip: zipfile.ZipFile | None
+    _lock: threading.Lock
+
+    def __init__(self, path: Path, *, mode: str, log: Logger | None = None) -> None:
+        """Initialize the cassette, reading the index of a replayed cassette."""
+        self.path = path
+        self.mode = mode
+        self.log = log or _log
+        self.entries = {}
+        self._zip = None
+        self._lock = threading.Lock()
+        if not self.replaying:
+            return
+        if not path.exists():
+            self.log.error("[cassette] nothing recorded for these inputs: %s", path)
+            return
+        self._zip = zipfile.ZipFile(path)
+        self.entries = json.loads(self._zip.read(CASSETTE_INDEX).decode("utf-8"))
+        self.log.info("[cassette] replaying %s responses: %s", len(self.entries), path)
+
+    @property
+    def recording(self) -> bool:
+        """Whether upstream responses are being recorded."""
+        return self.mode == CASSETTE_RECORD
+
+    @property
+    def replaying(self) -> bool:
+        """Whether upstream responses are being replayed."""
+        return self.mode == CASSETTE_REPLAY
+
+    @property
+    def partial_dir(self) -> Path:
+        """The folder of bodies recorded, but not yet saved."""
+        return self.path.with_name(f"{self.path.name}.partial")
+
+    def record(
+        self, url: str, code: int, headers: Mapping[str, str], body: bytes
+    ) -> None:
+        """Remember a response for a URL, replacing any earlier response."""
+        digest = sha256(body).hexdigest()
+        body_path = self.partial_dir / digest
+        if not body_path.exists():
+            self.partial_dir.mkdir(parents=True, exist_ok=True)
+            write_bytes_atomic(body_path, body)
+        kept = {k: v for k, v in headers.items() if k.lower() in CASSETTE_HEADERS}
+        with self._lock:
+            self.entries[url] = {"code": code, "headers": kept, "sha256": digest}
+
+    def play(self, url: str) -> TPlayed | None:
+        """Get the recorded response for a URL, if any."""
+        entry = self.entries.get(url)
+        if entry is None or self._zip is None:
+            return None
+        with self._lock:
+            body = self._zip.read(entry["sha256"])
+        return int(entry["code"]), dict(entry["headers"]), body
+
+    def save(self) -> None:
+        """Pack the recorded responses into the cassette, replacing any old one."""
+        if not self.recording or not self.entries:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        digests = sorted({entry["sha256"] for entry in self.entries.values()})
+        with zipfile.ZipFile(tmp_path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr(CASSETTE_INDEX, json.dumps(self.entries, **JSON_FMT))
+            for digest in digests:
+                zf.write(self.partial_dir / digest, digest)
+        tmp_path.replace(self.path)
+        shutil.rmtree(self.partial_dir, ignore_errors=True)
+        self.log.info(
+            "[cassette] recorded %s responses, %.1fMB: %s",
+            len(self.entries),
+            self.path.stat().st_size / MB,
+            self.path,
+        )
+
+    def close(self) -> None:
+        """Close a replayed cassette."""
+        if self._zip is not None:
+            self._zip.close()
+            self._zip = None
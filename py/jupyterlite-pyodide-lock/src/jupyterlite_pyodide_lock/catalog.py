@@ -0,0 +1,246 @@
+"""A persistent catalog of wheel metadata, to avoid re-reading unchanged wheels."""
+# Copyright (c) jupyterlite-pyodide-lock contributors.
+# Distributed under the terms of the BSD-3-Clause License.
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+from functools import cache
+from logging import getLogger
+from typing import TYPE_CHECKING, TypedDict
+
+import pkginfo
+from packaging.requirements import Requirement
+from packaging.utils import canonicalize_name, parse_wheel_filename
+from pyodide_lock.utils import parse_top_level_import_name
+
+from .hashing import sha256_file
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+    from logging import Logger
+    from pathlib import Path
+
+    from pyodide_lock import PyodideLockSpec
+    from pyodide_lock.spec import PackageSpec
+
+#: a fallback logger
+_log = getLogger(__name__)
+
+#: bump to discard catalogs written by older versions
+SCHEMA_VERSION = 1
+
+#: the statements to create the catalog
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS wheels (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    info TEXT NOT NULL
+)
+"""
+
+#: find a catalog entry that is still fresh
+SELECT_INFO = "SELECT info FROM wheels WHERE path = ? AND size = ? AND mtime_ns = ?"
+
+#: add or update catalog entries
+UPSERT_INFO = "INSERT OR REPLACE INTO wheels VALUES (?, ?, ?, ?)"
+
+
+class WheelInfo(TypedDict):
+    """The parsed metadata of a wheel."""
+
+    name: str
+    version: str
+    requires_dist: list[str]
+    imports: list[str] | None
+    tags: list[str]
+    sha256: str
+    size: int
+
+
+def read_wheel_info(wheel: Path) -> WheelInfo | None:
+    """Read the metadata of a wheel from its archive, or ``None`` if unparseable."""
+    metadata = pkginfo.get_metadata(str(wheel))
+    if not metadata or not metadata.name:
+        return None
+    _name, _version, _build, tags = parse_wheel_filename(wheel.name)
+    return {
+        "name": canonicalize_name(metadata.name),
+        "version": f"{metadata.version}",
+        "requires_dist": [*metadata.requires_dist],
+        "imports": parse_top_level_import_name(wheel),
+        "tags": sorted(map(str, tags)),
+        "sha256": sha256_file(wheel),
+        "size": wheel.stat().st_size,
+    }
+
+
+class WheelCatalog:
+    """Remember wheel metadata in SQLite, keyed by path, size and modification time.
+
+    A wheel whose path, size and ``mtime_ns`` are unchanged is not reopened.
+    """
+
+    path: Path
+    log: Logger
+    _connection: sqlite3.Connection
+    _lock: threading.Lock
+
+    def __init__(self, path: Path, log: Logger | None = None) -> None:
+        """Open (or create) the catalog database."""
+        self.path = path
+        self.log = log or _log
+        self._lock = threading.Lock()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection as conn:
+            (version,) = conn.execute("PRAGMA user_version").fetchone()
+            if version != SCHEMA_VERSION:
+                conn.execute("DROP TABLE IF EXISTS wheels")
+                conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            conn.execute(SCHEMA)
+
+    def get(self, wheel: Path) -> WheelInfo | None:
+        """Get the metadata of one wheel."""
+        return self.get_many([wheel]).get(wheel)
+
+    def get_many(self, wheels: Sequence[Path]) -> dict[Path, WheelInfo]:
+        """Get the metadata of many wheels, only reading those that changed."""
+        found: dict[Path, WheelInfo] = {}
+        stale: list[tuple[str, int, int, str]] = []
+
+        with self._lock:
+            for wheel in wheels:
+                stat = wheel.stat()
+                key = f"{wheel.resolve()}"
+                row = self._connection.execute(
+                    SELECT_INFO, (key, stat.st_size, stat.st_mtime_ns)
+                ).fetchone()
+                if row:
+                    found[wheel] = json.loads(row[0])
+                    continue
+                info = read_wheel_info(wheel)
+                if info is None:  # pragma: no cover
+                    self.log.error("[catalog] failed to parse metadata for %s", wheel)
+                    continue
+                found[wheel] = info
+                stale += [(key, stat.st_size, stat.st_mtime_ns, json.dumps(info))]
+
+            if stale:
+                with self._connection as conn:
+                    conn.executemany(UPSERT_INFO, stale)
+                self.log.debug("[catalog] read %s of %s wheels", len(stale), len(found))
+
+        return found
+
+
+@cache
+def get_catalog(path: Path) -> WheelCatalog:
+    """Get a shared catalog for a database path."""
+    return WheelCatalog(path)
+
+
+def add_wheels_to_spec(
+    lock_spec: PyodideLockSpec, wheel_files: list[Path], catalog: WheelCatalog
+) -> PyodideLockSpec:
+    """Add wheels to a copy of a lock, as ``pyodide_lock.utils.add_wheels_to_spec``.
+
+    Wheel metadata, imports and hashes are read from the ``catalog``, and each
+    ``file_name`` is the bare wheel name, as if it were a sibling of the lock.
+
+    As this uses private ``pyodide_lock`` helpers, ``pyodide-lock`` is pinned to the
+    versions whose upstream output it is tested to match.
+    """
+    from pyodide_lock.spec import PackageSpec
+    from pyodide_lock.utils import _check_wheel_compatible  # noqa: PLC2701
+
+    new_spec = lock_spec.model_copy(deep=True)
+    if not wheel_files:
+        return new_spec
+
+    infos = catalog.get_many(wheel_files)
+
+    new_packages: dict[str, PackageSpec] = {}
+    requires: dict[str, list[str]] = {}
+
+    for wheel in wheel_files:
+        _check_wheel_compatible(wheel, lock_spec.info)
+        info = infos.get(wheel)
+        if info is None:  # pragma: no cover
+            msg = f"Could not parse wheel metadata from {wheel.name}"
+            raise RuntimeError(msg)
+        new_packages[info["name"]] = PackageSpec(
+            name=info["name"],
+            version=info["version"],
+            file_name=wheel.name,
+            sha256=info["sha256"],
+            package_type="package",
+            install_dir="site",
+            imports=info["imports"] or [],
+            depends=[],
+        )
+        requires[info["name"]] = info["requires_dist"]
+
+    fix_new_package_depends(lock_spec, new_packages, requires)
+    new_spec.packages |= new_packages
+    return new_spec
+
+
+def fix_new_package_depends(
+    lock_spec: PyodideLockSpec,
+    new_packages: dict[str, PackageSpec],
+    requires: dict[str, list[str]],
+) -> None:
+    """Fill the ``depends`` of new packages, including those needed by extras."""
+    from pyodide_lock.utils import _get_marker_environment  # noqa: PLC2701
+
+    env = _get_marker_environment(**lock_spec.info.model_dump())
+    known = {*new_packages, *lock_spec.packages}
+    with_extras: list[Requirement] = []
+
+    for name, package in new_packages.items():
+        package.depends = []
+        reqs = [*map(Requirement, requires[name])]
+        with_extras += _add_depends(package, reqs, env, known)
+
+    while with_extras:
+        extra_req = with_extras.pop()
+        name = canonicalize_name(extra_req.name)
+        if name not in new_packages:
+            continue
+        reqs = [*map(Requirement, requires[name])]
+        for extra in extra_req.extras:
+            with_extras += _add_depends(
+                new_packages[name], reqs, {**env, "extra": extra}, known, extra=True
+            )
+
+
+def _add_depends(
+    package: PackageSpec,
+    reqs: list[Requirement],
+    env: dict[str, str],
+    known: set[str],
+    *,
+    extra: bool = False,
+) -> list[Requirement]:
+    """Add the requirements that apply to a package, returning any with extras.
+
+    For an ``extra``, only new requirements with markers are considered.
+    """
+    with_extras: list[Requirement] = []
+    for req in reqs:
+        name = canonicalize_name(req.name)
+        if extra and (req.marker is None or name in package.depends):
+            continue
+        if req.marker is not None and not req.marker.evaluate(env):
+            continue
+        if name not in known:
+            msg = f"Requirement {name} from {req} is not in this distribution."
+            raise RuntimeError(msg)
+        package.depends += [name]
+        if req.extras:
+            with_extras += [req]
+    return with_extras
@@ -30,7 +30,23 @@ ENV_VAR_LOCK_DATE_EPOCH = "JLPL_LOCK_DATE_EPOCH"
 #: environment variable for setting the timeout
 ENV_VAR_TIMEOUT = "JLPL_TIMEOUT"
 
-ENV_VAR_ALL = [ENV_VAR_BROWSER, ENV_VAR_LOCK_DATE_EPOCH, ENV_VAR_TIMEOUT]
+#: environment variable for setting the seconds a solve may show no progress
+ENV_VAR_STALL_TIMEOUT = "JLPL_STALL_TIMEOUT"
+
+#: environment variable for setting the shared wheel store
+ENV_VAR_WHEEL_STORE = "JLPL_WHEEL_STORE"
+
+#: environment variable for recording or replaying upstream HTTP responses
+ENV_VAR_CASSETTE = "JLPL_CASSETTE"
+
+ENV_VAR_ALL = [
+    ENV_VAR_BROWSER,
+    ENV_VAR_CASSETTE,
+    ENV_VAR_LOCK_DATE_EPOCH,
+    ENV_VAR_STALL_TIMEOUT,
+    ENV_VAR_TIMEOUT,
+    ENV_VAR_WHEEL_STORE,
+]
 
 #: the entry point name for locker implementations
 LOCKER_ENTRYPOINT = f"{NAME.replace('-', '_')}.locker.v0"
@@ -41,9 +57,15 @@ PYODIDE_LOCK_STEM = PYODIDE_LOCK.split(".")[0]
 #: the default name for a re-solved offline lockfile
 PYODIDE_LOCK_OFFLINE = f"{PYODIDE_LOCK_STEM}-offline.json"
 
+#: the name of a bootstrap lockfile with missing packages from the CDN proxy
+PYODIDE_LOCK_PROXIED = f"{PYODIDE_LOCK_STEM}-proxied.json"
+
 #: the URL prefix for proxies
 PROXY = "_proxy"
 
+#: the URL prefix for local folders of wheels
+WHEELHOUSE = "_wheelhouse"
+
 #: the name of the hosted HTML app
 LOCK_HTML = "lock.html"
 
@@ -93,6 +115,24 @@ FILE_EXT_MIME_MAP = {
 #: the failed in the warehouse API used for release dates
 WAREHOUSE_UPLOAD_DATE = "upload_time_iso_8601"
 
+#: the field in the PEP 691 Simple JSON API used for upload dates
+SIMPLE_UPLOAD_TIME = "upload-time"
+
+#: the content type of the PEP 691 Simple JSON API
+SIMPLE_JSON_MIME = "application/vnd.pypi.simple.v1+json"
+
+#: the default URL of the PEP 691 Simple API
+PYPI_SIMPLE_URL = "https://pypi.org/simple"
+
+#: use the Warehouse JSON API for package metadata
+INDEX_MODE_JSON = "json"
+
+#: use the PEP 691 Simple JSON API for package metadata
+INDEX_MODE_SIMPLE = "simple"
+
+#: the ways ``TornadoLocker`` can proxy package metadata
+INDEX_MODES = [INDEX_MODE_JSON, INDEX_MODE_SIMPLE]
+
 #: a string template for the warehouse iso8601 timestamp
 WAREHOUSE_UPLOAD_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
 WAREHOUSE_UPLOAD_FORMAT_SHORT = "%Y-%m-%dT%H:%M:%SZ"
@@ -101,6 +141,53 @@ WAREHOUSE_UPLOAD_FORMAT_ANY = [
     WAREHOUSE_UPLOAD_FORMAT_SHORT,
 ]
 
+# linking ###
+
+#: a copy-on-write clone, where supported by the filesystem
+LINK_REFLINK = "reflink"
+
+#: a hard link, on the same filesystem
+LINK_HARDLINK = "hardlink"
+
+#: a full copy
+LINK_COPY = "copy"
+
+#: the default order of strategies for placing wheels
+LINK_STRATEGIES = (LINK_REFLINK, LINK_HARDLINK, LINK_COPY)
+
+# proxy cache ###
+
+#: the folder in the ``cache_dir`` for files fetched by ``TornadoLocker`` proxies
+BROWSER_LOCKER_CACHE = "browser-locker"
+
+#: the statistics of the proxy cache, reported by ``PyodideLockAddon.status``
+PROXY_CACHE_STATS = "proxy-cache.json"
+
+#: the suffix of a compressed, cached document
+GZIP_SUFFIX = ".gz"
+
+# cassettes ###
+
+#: neither record nor replay upstream responses
+CASSETTE_OFF = "off"
+
+#: record upstream responses of a solve into a cassette
+CASSETTE_RECORD = "record"
+
+#: replay upstream responses of a solve from a cassette, without a network
+CASSETTE_REPLAY = "replay"
+
+CASSETTE_MODES = [CASSETTE_OFF, CASSETTE_RECORD, CASSETTE_REPLAY]
+
+#: the folder in the ``cache_dir`` for cassettes, if not configured
+CASSETTES = "cassettes"
+
+#: the member of a cassette with the responses for each URL
+CASSETTE_INDEX = "index.json"
+
+#: the lowercase names of upstream response headers kept in a cassette
+CASSETTE_HEADERS = {"content-type", "etag", "last-modified"}
+
 # HTTP ###
 LOCALHOST = "127.0.0.1"
 
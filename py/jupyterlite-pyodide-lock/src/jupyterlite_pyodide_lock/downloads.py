@@ -0,0 +1,71 @@
+"""Concurrent, bounded-parallel downloads of remote files."""
+# Copyright (c) jupyterlite-pyodide-lock contributors.
+# Distributed under the terms of the BSD-3-Clause License.
+
+from __future__ import annotations
+
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from logging import getLogger
+from typing import TYPE_CHECKING
+from urllib.parse import urlparse
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from logging import Logger
+    from pathlib import Path
+
+    #: a callable that downloads one URL to one path
+    TFetchOne = Callable[[str, Path], None]
+
+#: a fallback logger
+_log = getLogger(__name__)
+
+
+def fetch_many(
+    fetch_one: TFetchOne,
+    pending: dict[str, Path],
+    *,
+    max_workers: int = 8,
+    max_per_host: int = 4,
+    log: Logger | None = None,
+) -> bool:
+    """Download many URLs to paths at once, limiting the concurrency for each host.
+
+    All downloads are attempted, even if some fail: the first error is re-raised
+    once every download has finished.
+    """
+    log = log or _log
+
+    if not pending:
+        return True
+
+    host_limits = {
+        urlparse(url).netloc: threading.BoundedSemaphore(max_per_host)
+        for url in pending
+    }
+
+    def _fetch_one(url: str, dest: Path) -> None:
+        with host_limits[urlparse(url).netloc]:
+            log.debug("[fetch] fetching %s", url)
+            fetch_one(url, dest)
+
+    errors: list[Exception] = []
+    workers = max(1, min(max_workers, len(pending)))
+
+    log.info("[fetch] fetching %s files with %s workers", len(pending), workers)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(_fetch_one, url, dest): url for url, dest in pending.items()
+        }
+        for future in as_completed(futures):
+            err = future.exception()
+            if err is not None:
+                log.error("[fetch] failed to fetch %s: %s", futures[future], err)
+                errors += [err]  # type: ignore[list-item]
+
+    if errors:
+        raise errors[0]
+
+    return True
@@ -0,0 +1,104 @@
+"""An index of the dependencies between packages in a ``pyodide-lock.json``."""
+# Copyright (c) jupyterlite-pyodide-lock contributors.
+# Distributed under the terms of the BSD-3-Clause License.
+
+from __future__ import annotations
+
+import re
+from collections import deque
+from logging import getLogger
+from typing import TYPE_CHECKING, Any
+
+from packaging.utils import canonicalize_name
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Sequence
+    from logging import Logger
+
+    from packaging.utils import NormalizedName
+
+    #: a predicate for whether a package name matches some patterns
+    TNameMatcher = Callable[[str], bool]
+
+#: a fallback logger
+_log = getLogger(__name__)
+
+
+def compile_patterns(patterns: Sequence[str]) -> TNameMatcher:
+    """Build a predicate that is true if any pattern matches the start of a name.
+
+    Patterns are combined into a single alternation, unless one can't be combined,
+    such as a pattern with global inline flags.
+    """
+    if not patterns:
+        return lambda _name: False
+    try:
+        combined = re.compile("|".join(f"(?:{pattern})" for pattern in patterns))
+    except re.error:
+        compiled = [re.compile(pattern) for pattern in patterns]
+        return lambda name: any(c.match(name) for c in compiled)
+    return lambda name: combined.match(name) is not None
+
+
+class LockGraph:
+    """The packages of a lock, with indexes of their dependencies and dependents.
+
+    Dependencies not found in the lock are reported in ``missing``, and are not
+    part of any closure.
+    """
+
+    log: Logger
+    #: the lock keys, by normalized name
+    keys: dict[NormalizedName, str]
+    #: the normalized dependencies of each package
+    depends: dict[NormalizedName, tuple[NormalizedName, ...]]
+    #: the normalized packages which depend on each package
+    dependents: dict[NormalizedName, list[NormalizedName]]
+    #: the dependencies of each package which are not in the lock
+    missing: dict[NormalizedName, list[NormalizedName]]
+
+    def __init__(
+        self, packages: dict[str, dict[str, Any]], log: Logger | None = None
+    ) -> None:
+        """Build the indexes for some ``pyodide-lock`` packages."""
+        self.log = log or _log
+        self.keys = {canonicalize_name(key): key for key in packages}
+        self.depends = {}
+        self.dependents = {name: [] for name in self.keys}
+        self.missing = {}
+
+        for name, key in self.keys.items():
+            deps = tuple(map(canonicalize_name, packages[key].get("depends", [])))
+            self.depends[name] = deps
+            for dep in deps:
+                if dep in self.dependents:
+                    self.dependents[dep] += [name]
+                else:
+                    self.missing.setdefault(name, []).append(dep)
+
+    def match(self, patterns: Sequence[str]) -> set[NormalizedName]:
+        """Get the packages with a lock key matched by any pattern."""
+        matcher = compile_patterns(patterns)
+        return {name for name, key in self.keys.items() if matcher(key)}
+
+    def closure(self, names: Iterable[str]) -> set[NormalizedName]:
+        """Get some packages and all of their transitive dependencies."""
+        return self._walk(names, self.depends)
+
+    def dependents_closure(self, names: Iterable[str]) -> set[NormalizedName]:
+        """Get some packages and all of the packages that transitively need them."""
+        return self._walk(names, self.dependents)
+
+    def _walk(
+        self, names: Iterable[str], edges: dict[NormalizedName, Any]
+    ) -> set[NormalizedName]:
+        """Visit each package reachable from some start packages exactly once."""
+        seen: set[NormalizedName] = set()
+        queue = deque(canonicalize_name(name) for name in names)
+        while queue:
+            name = queue.popleft()
+            if name in seen or name not in self.keys:
+                continue
+            seen.add(name)
+            queue.extend(dep for dep in edges[name] if dep not in seen)
+        return seen
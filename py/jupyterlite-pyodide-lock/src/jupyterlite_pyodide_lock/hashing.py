@@ -0,0 +1,165 @@
+"""Streaming ``sha256`` digests of files, remembered while files are unchanged."""
+# Copyright (c) jupyterlite-pyodide-lock contributors.
+# Distributed under the terms of the BSD-3-Clause License.
+
+from __future__ import annotations
+
+import atexit
+import email.utils
+import json
+import os
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from functools import cache
+from hashlib import sha256
+from logging import getLogger
+from pathlib import Path
+from typing import IO, TYPE_CHECKING, Any
+
+from jupyterlite_core.constants import UTF8
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+    from logging import Logger
+
+#: a fallback logger
+_log = getLogger(__name__)
+
+#: bytes to read at a time when hashing files
+CHUNK_SIZE = 1024 * 1024
+
+
+def sha256_file(path: Path) -> str:
+    """Get the ``sha256`` hex digest of a file, without reading it all at once."""
+    digest = sha256()
+    with path.open("rb") as fd:
+        while chunk := fd.read(CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def fetch_with_sha256(url: str, dest: Path) -> str:
+    """Download a URL to a path, returning the ``sha256`` of the bytes written.
+
+    Like ``jupyterlite_core.addons.base.BaseAddon.fetch_one``, the file is written
+    under a temporary name, and gets the ``Last-Modified`` time of the response.
+    """
+    digest = sha256()
+    dest.parent.mkdir(parents=True, exist_ok=True)
+
+    with tempfile.TemporaryDirectory(dir=dest.parent) as td:
+        tmp_dest = Path(td) / dest.name
+        # set a custom User-Agent to avoid 403 errors with ReadTheDocs
+        req = urllib.request.Request(url, headers={"User-Agent": "Mozilla/5.0"})  # noqa: S310
+        with urllib.request.urlopen(req) as response, tmp_dest.open("wb") as fd:  # noqa: S310
+            copy_with_sha256(response, fd, digest)
+            last_modified = response.headers.get("Last-Modified")
+        if last_modified:
+            parsed = email.utils.parsedate(last_modified)
+            if parsed:
+                epoch_time = time.mktime(parsed)
+                os.utime(tmp_dest, (epoch_time, epoch_time))
+        tmp_dest.replace(dest)
+
+    return digest.hexdigest()
+
+
+def copy_with_sha256(src: IO[bytes], dest: IO[bytes], digest: Any) -> None:
+    """Copy one binary stream to another, updating a digest with every chunk."""
+    while chunk := src.read(CHUNK_SIZE):
+        digest.update(chunk)
+        dest.write(chunk)
+
+
+class DigestMemo:
+    """Remember file digests by device, inode, size and modification time.
+
+    Hard links share an inode, so a wheel linked from a cache or store is only
+    hashed once. The memo is saved to ``path`` as JSON, if given.
+    """
+
+    path: Path | None
+    log: Logger
+    _digests: dict[str, tuple[int, int, str]]
+    _dirty: bool
+    _lock: threading.Lock
+
+    def __init__(self, path: Path | None = None, log: Logger | None = None) -> None:
+        """Initialize the memo, loading any saved digests."""
+        self.path = path
+        self.log = log or _log
+        self._digests = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+        if path and path.exists():
+            try:
+                raw = json.loads(path.read_text(**UTF8))
+                self._digests = {
+                    k: (int(v[0]), int(v[1]), str(v[2])) for k, v in raw.items()
+                }
+            except (ValueError, TypeError, IndexError) as err:  # pragma: no cover
+                self.log.warning("[hash] ignoring invalid digests %s: %s", path, err)
+
+    def sha256(self, path: Path) -> str:
+        """Get the ``sha256`` of a file, only reading it if changed."""
+        stat = path.stat()
+        key = f"{stat.st_dev}:{stat.st_ino}"
+        with self._lock:
+            known = self._digests.get(key)
+        if known and known[:2] == (stat.st_size, stat.st_mtime_ns):
+            return known[2]
+        digest = sha256_file(path)
+        self.record(path, digest)
+        return digest
+
+    def sha256_many(
+        self, paths: Sequence[Path], max_workers: int = 4
+    ) -> dict[Path, str]:
+        """Get the ``sha256`` of many files, hashing changed files on a thread pool."""
+        if not paths:
+            return {}
+        workers = max(1, min(max_workers, len(paths)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            digests = dict(zip(paths, executor.map(self.sha256, paths), strict=True))
+        self.save()
+        return digests
+
+    def record(self, path: Path, digest: str) -> None:
+        """Remember the digest of a file, as it is now."""
+        stat = path.stat()
+        with self._lock:
+            self._digests[f"{stat.st_dev}:{stat.st_ino}"] = (
+                stat.st_size,
+                stat.st_mtime_ns,
+                digest,
+            )
+            self._dirty = True
+
+    def verify(self, path: Path, expected: str) -> bool:
+        """Get whether a file has an expected ``sha256``."""
+        return self.sha256(path) == expected
+
+    def save(self) -> None:
+        """Write the memo, if anything has changed."""
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            as_json = json.dumps(self._digests, sort_keys=True)
+            self._dirty = False
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(as_json, **UTF8)
+        tmp_path.replace(self.path)
+
+
+@cache
+def get_digest_memo(path: Path) -> DigestMemo:
+    """Get a shared digest memo, which will be saved when the process exits."""
+    memo = DigestMemo(path)
+    atexit.register(memo.save)
+    return memo
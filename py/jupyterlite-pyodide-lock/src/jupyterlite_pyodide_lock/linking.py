@@ -0,0 +1,160 @@
+"""Strategies for placing files without copying their bytes, where possible."""
+# Copyright (c) jupyterlite-pyodide-lock contributors.
+# Distributed under the terms of the BSD-3-Clause License.
+
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+from collections import Counter
+from functools import cache
+from logging import getLogger
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from .constants import LINK_COPY, LINK_HARDLINK, LINK_REFLINK, LINUX, OSX
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Sequence
+    from logging import Logger
+
+    #: a function that places a copy of ``src`` at a new ``dest``
+    TLinkFunction = Callable[[Path, Path], None]
+
+    #: the devices of a source and destination folder
+    TDevicePair = tuple[int, int]
+
+#: a fallback logger
+_log = getLogger(__name__)
+
+#: the Linux ``ioctl`` request for a copy-on-write clone, from ``linux/fs.h``
+FICLONE = 0x40049409
+
+
+def reflink(src: Path, dest: Path) -> None:
+    """Make a copy-on-write clone of a file, if the filesystem supports it."""
+    if LINUX:
+        import fcntl
+
+        with src.open("rb") as src_fd, dest.open("wb") as dest_fd:
+            fcntl.ioctl(dest_fd.fileno(), FICLONE, src_fd.fileno())
+    elif OSX:  # pragma: no cover
+        import ctypes
+
+        libc = ctypes.CDLL(None, use_errno=True)
+        if libc.clonefile(os.fsencode(src), os.fsencode(dest), 0):
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), str(dest))
+    else:  # pragma: no cover
+        msg = "reflinks are not supported on this platform"
+        raise OSError(msg)
+    shutil.copystat(src, dest)
+
+
+def hardlink(src: Path, dest: Path) -> None:
+    """Make a hard link to a file."""
+    dest.hardlink_to(src)
+
+
+def copy(src: Path, dest: Path) -> None:
+    """Copy a file, with its metadata."""
+    shutil.copy2(src, dest)
+
+
+#: link functions, by name, in order of preference
+LINK_FUNCTIONS: dict[str, TLinkFunction] = {
+    LINK_REFLINK: reflink,
+    LINK_HARDLINK: hardlink,
+    LINK_COPY: copy,
+}
+
+
+class Linker:
+    """Place files with the first strategy that works for a pair of filesystems.
+
+    Files are always placed under a temporary name, then moved over the
+    destination, so existing links are replaced rather than written through.
+    """
+
+    strategies: tuple[str, ...]
+    log: Logger
+    #: the strategy that last worked for a pair of devices
+    chosen: dict[TDevicePair, str]
+    #: the number of files placed by each strategy
+    counts: Counter[str]
+
+    def __init__(self, strategies: Sequence[str], log: Logger | None = None) -> None:
+        """Initialize the linker members."""
+        unknown = sorted(set(strategies) - set(LINK_FUNCTIONS))
+        if unknown:
+            msg = f"Unknown link strategies {unknown}: expected {[*LINK_FUNCTIONS]}"
+            raise ValueError(msg)
+        self.strategies = tuple(strategies) or (LINK_COPY,)
+        self.log = log or _log
+        self.chosen = {}
+        self.counts = Counter()
+
+    def link(self, src: Path, dest: Path) -> str:
+        """Place a file at a destination, returning the name of the strategy used."""
+        if dest.exists() and dest.samefile(src):
+            return LINK_HARDLINK
+
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        key = (src.stat().st_dev, dest.parent.stat().st_dev)
+        last_error: OSError | None = None
+
+        with tempfile.TemporaryDirectory(dir=dest.parent) as td:
+            tmp_dest = Path(td) / dest.name
+            for strategy in self.get_candidates(key):
+                try:
+                    LINK_FUNCTIONS[strategy](src, tmp_dest)
+                except OSError as err:
+                    self.log.debug("[link] %s failed for %s: %s", strategy, dest, err)
+                    tmp_dest.unlink(missing_ok=True)
+                    last_error = err
+                    continue
+                tmp_dest.replace(dest)
+                self.chosen.setdefault(key, strategy)
+                self.counts[strategy] += 1
+                return strategy
+
+        if TYPE_CHECKING:
+            assert last_error
+
+        raise last_error  # pragma: no cover
+
+    def get_candidates(self, key: TDevicePair) -> list[str]:
+        """Get the strategies to try for a pair of devices, best known first."""
+        chosen = self.chosen.get(key)
+        if chosen is None:
+            return [*self.strategies]
+        return [chosen, *[s for s in self.strategies if s != chosen]]
+
+    def probe(self, src_dir: Path, dest_dir: Path) -> str:
+        """Find the strategy that would be used between two folders."""
+        src_dir, dest_dir = _existing_parent(src_dir), _existing_parent(dest_dir)
+        with (
+            tempfile.TemporaryDirectory(dir=src_dir) as src_td,
+            tempfile.TemporaryDirectory(dir=dest_dir) as dest_td,
+        ):
+            src = Path(src_td) / "probe"
+            src.write_bytes(b"probe")
+            return self.link(src, Path(dest_td) / "probe")
+
+    def summary(self) -> str:
+        """Describe how many files were placed with each strategy."""
+        return ", ".join(f"{s}: {self.counts[s]}" for s in self.strategies)
+
+
+@cache
+def get_linker(strategies: tuple[str, ...]) -> Linker:
+    """Get a shared linker for some strategies, to remember what works."""
+    return Linker(strategies)
+
+
+def _existing_parent(path: Path) -> Path:
+    """Get the nearest folder that exists."""
+    while not path.exists() and path.parent != path:
+        path = path.parent
+    return path
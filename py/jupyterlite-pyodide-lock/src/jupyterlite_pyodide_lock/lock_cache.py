@@ -0,0 +1,148 @@
+"""A persistent cache of solved ``pyodide-lock.json`` files, keyed by their inputs."""
+# Copyright (c) jupyterlite-pyodide-lock contributors.
+# Distributed under the terms of the BSD-3-Clause License.
+
+from __future__ import annotations
+
+import json
+import re
+import shutil
+import tempfile
+from hashlib import sha256
+from logging import getLogger
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from jupyterlite_core.constants import UTF8
+
+from .constants import LINK_STRATEGIES, PYODIDE_LOCK, RE_REMOTE_URL
+from .linking import Linker, get_linker
+
+if TYPE_CHECKING:
+    from logging import Logger
+
+#: a fallback logger
+_log = getLogger(__name__)
+
+
+def get_inputs_digest(inputs: dict[str, Any]) -> str:
+    """Get a stable ``sha256`` hex digest of some JSON-compatible lock inputs."""
+    as_json = json.dumps(inputs, sort_keys=True, default=str)
+    return sha256(as_json.encode("utf-8")).hexdigest()
+
+
+class LockResultCache:
+    """Store and restore solved lockfiles, and the wheels they collected.
+
+    Each entry is a folder named by the digest of the lock inputs, containing the
+    ``pyodide-lock.json`` and any wheels that were copied to be its siblings.
+    """
+
+    root: Path
+    log: Logger
+    linker: Linker
+
+    def __init__(
+        self, root: Path, log: Logger | None = None, linker: Linker | None = None
+    ) -> None:
+        """Initialize the cache members."""
+        self.root = root
+        self.log = log or _log
+        self.linker = linker or get_linker(LINK_STRATEGIES)
+
+    def entry_dir(self, digest: str) -> Path:
+        """Get the folder for a cache entry."""
+        return self.root / digest
+
+    def restore(self, digest: str, lockfile: Path) -> bool:
+        """Restore a cached lockfile and its sibling wheels, if every file is found."""
+        entry = self.entry_dir(digest)
+        cached_lock = entry / PYODIDE_LOCK
+
+        if not cached_lock.exists():
+            self.log.info("[lock] [cache] miss %s", digest)
+            return False
+
+        lock_dir = lockfile.parent
+        lock_json = json.loads(cached_lock.read_text(**UTF8))
+        siblings = self.find_siblings(digest, lock_dir, lock_json)
+
+        if siblings is None:  # pragma: no cover
+            return False
+
+        lock_dir.mkdir(parents=True, exist_ok=True)
+
+        for name in sorted(self.find_placed(lockfile) - set(siblings)):
+            self.log.warning("[lock] [cache] pruning unlocked %s", name)
+            (lock_dir / name).unlink(missing_ok=True)
+
+        for name, cached_whl in siblings.items():
+            self.linker.link(cached_whl, lock_dir / name)
+
+        shutil.copy2(cached_lock, lockfile)
+        self.log.info("[lock] [cache] restored %s from %s", lockfile.name, digest)
+        return True
+
+    def find_placed(self, lockfile: Path) -> set[str]:
+        """Find the names of sibling wheels placed for an existing lockfile."""
+        if not lockfile.exists():
+            return set()
+        lock_dir = lockfile.parent.resolve()
+        lock_json = json.loads(lockfile.read_text(**UTF8))
+        return {
+            local_path.name
+            for file_name in get_local_file_names(lock_json)
+            if (local_path := (lock_dir / file_name).resolve()).parent == lock_dir
+        }
+
+    def find_siblings(
+        self, digest: str, lock_dir: Path, lock_json: dict[str, Any]
+    ) -> dict[str, Path] | None:
+        """Find cached sibling wheels, or ``None`` if any locked file is missing."""
+        entry = self.entry_dir(digest)
+        siblings: dict[str, Path] = {}
+
+        for file_name in get_local_file_names(lock_json):
+            local_path = (lock_dir / file_name).resolve()
+            if local_path.parent == lock_dir.resolve():
+                cached_whl = entry / local_path.name
+                if not cached_whl.exists():  # pragma: no cover
+                    self.log.warning("[lock] [cache] %s missing %s", digest, file_name)
+                    return None
+                siblings[local_path.name] = cached_whl
+            elif not local_path.exists():  # pragma: no cover
+                self.log.warning("[lock] [cache] %s needs %s", digest, local_path)
+                return None
+
+        return siblings
+
+    def save(self, digest: str, lockfile: Path) -> None:
+        """Store a solved lockfile, and any sibling wheels it references."""
+        entry = self.entry_dir(digest)
+        lock_dir = lockfile.parent
+        lock_json = json.loads(lockfile.read_text(**UTF8))
+        self.root.mkdir(parents=True, exist_ok=True)
+
+        with tempfile.TemporaryDirectory(dir=self.root) as td:
+            tdp = Path(td) / digest
+            tdp.mkdir()
+            for file_name in get_local_file_names(lock_json):
+                local_path = (lock_dir / file_name).resolve()
+                if local_path.parent == lock_dir.resolve() and local_path.exists():
+                    self.linker.link(local_path, tdp / local_path.name)
+            shutil.copy2(lockfile, tdp / PYODIDE_LOCK)
+
+            if entry.exists():  # pragma: no cover
+                shutil.rmtree(entry)
+            tdp.rename(entry)
+
+        self.log.info("[lock] [cache] stored %s as %s", lockfile.name, digest)
+
+
+def get_local_file_names(lock_json: dict[str, Any]) -> list[str]:
+    """Get the ``file_name`` of every package in a lock that isn't a remote URL."""
+    return sorted(
+        package["file_name"]
+        for package in lock_json["packages"].values()
+        if not re.match(RE_REMOTE_URL, package["file_name"])
+    )
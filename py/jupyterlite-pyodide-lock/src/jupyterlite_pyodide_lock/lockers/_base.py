@@ -8,13 +8,21 @@ import asyncio
 import json
 import os
 from pathlib import Path
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 
 from jupyterlite_pyodide_kernel.constants import PYODIDE_LOCK, PYODIDE_VERSION
-from traitlets import Dict, Instance, Int, List, Unicode, default
+from traitlets import Dict, Enum, Instance, Int, List, Unicode, default
 from traitlets.config import LoggingConfigurable
 
-from jupyterlite_pyodide_lock.constants import ENV_VAR_TIMEOUT, FILES_PYTHON_HOSTED
+from jupyterlite_pyodide_lock.cassette import Cassette, get_cassette_key
+from jupyterlite_pyodide_lock.constants import (
+    CASSETTE_MODES,
+    CASSETTE_OFF,
+    CASSETTES,
+    ENV_VAR_CASSETTE,
+    ENV_VAR_TIMEOUT,
+    FILES_PYTHON_HOSTED,
+)
 
 if TYPE_CHECKING:
     from jupyterlite_pyodide_lock.addons.lock import PyodideLockAddon
@@ -30,20 +38,33 @@ class BaseLocker(LoggingConfigurable):
             "remote URL for the version of a full pyodide distribution;"
             " defaults to the version provided by ``jupyterlite_pyodide_kernel``"
         ),
-    ).tag(config=True)
+    ).tag(config=True, cassette=True)
 
     timeout = Int(help="seconds to wait for a solve").tag(config=True)
 
+    cassette_mode = Enum(
+        CASSETTE_MODES,
+        help=(
+            "``record`` upstream HTTP responses to a cassette named for the solve"
+            " inputs, or ``replay`` them without a network"
+        ),
+    ).tag(config=True)
+    cassette_dir = Unicode(
+        help="a folder of cassettes; defaults to ``cassettes`` in the ``cache_dir``"
+    ).tag(config=True)
+
     # from parent
     specs = List(Unicode())
     packages = List(Instance(Path))
     lockfile = Instance(Path)
     constraints = List(Unicode())
+    pins = List(Unicode(), help="``==`` pins from a previous solve to prefer")
 
     # runtime
     parent: PyodideLockAddon = Instance(  # type: ignore[assignment]
         "jupyterlite_pyodide_lock.addons.lock.PyodideLockAddon",
     )
+    _cassette = Instance(Cassette, allow_none=True)
 
     # API methods
     def resolve_sync(self) -> bool | None:
@@ -80,17 +101,54 @@ class BaseLocker(LoggingConfigurable):
     def _default_timeout(self) -> int:
         return int(json.loads(os.environ.get(ENV_VAR_TIMEOUT, "").strip() or "120"))
 
+    @default("cassette_mode")
+    def _default_cassette_mode(self) -> str:
+        return os.environ.get(ENV_VAR_CASSETTE, "").strip() or CASSETTE_OFF
+
+    @property
+    def cassette_inputs(self) -> dict[str, Any]:
+        """The inputs and settings which change the requests of a solve.
+
+        Settings are traits tagged with ``cassette=True``. ``pins`` are omitted, as
+        they change with each recorded lock.
+        """
+        return {
+            "locker": type(self).__name__,
+            "specs": sorted(self.specs),
+            "packages": sorted(path.name for path in self.packages),
+            "constraints": sorted(self.constraints),
+            "lock_date_epoch": self.parent.lock_date_epoch,
+            **{name: getattr(self, name) for name in self.trait_names(cassette=True)},
+        }
+
+    @default("_cassette")
+    def _default_cassette(self) -> Cassette | None:
+        if self.cassette_mode == CASSETTE_OFF:
+            return None
+        cassette_dir = (
+            Path(self.cassette_dir)
+            if self.cassette_dir
+            else Path(self.parent.manager.cache_dir) / CASSETTES
+        )
+        return Cassette(
+            cassette_dir / f"{get_cassette_key(self.cassette_inputs)}.zip",
+            mode=self.cassette_mode,
+            log=self.log,
+        )
+
 
 class MicropipLocker(BaseLocker):
     """Common traits and methods for ``micropip``-based lockers."""
 
-    extra_micropip_args = Dict(help="options for ``micropip.install``").tag(config=True)
+    extra_micropip_args = Dict(help="options for ``micropip.install``").tag(
+        config=True, cassette=True
+    )
     pypi_api_url = Unicode(
         "https://pypi.org/pypi",
         help="remote URL for a Warehouse-compatible JSON API",
-    ).tag(config=True)
+    ).tag(config=True, cassette=True)
     pythonhosted_cdn_url = Unicode(
         FILES_PYTHON_HOSTED,
         help="remote URL for python packages (third-party not supported)",
-    )
+    ).tag(cassette=True)
     micropip_args = Dict()
@@ -91,7 +91,7 @@ class BrowserLocker(TornadoLocker):
     _temp_profile_path: Path | None = Instance(Path, allow_none=True)
     _browser_process: psutil.Popen | None = Instance(psutil.Popen, allow_none=True)
 
-    def cleanup(self) -> None:
+    def cleanup_client(self) -> None:
         """Clean up the browser process and profile directory."""
         proc, path = self._browser_process, self._temp_profile_path
         self.log.debug("[browser] cleanup process: %s", proc)
@@ -111,30 +111,19 @@ class BrowserLocker(TornadoLocker):
         self.log.debug("[browser] cleanup process: %s", proc)
         self.log.debug("[browser] cleanup path: %s", path)
 
-        super().cleanup()
-
     async def fetch(self) -> None:
-        """Open the browser to the lock page, and wait for it to finish."""
+        """Open the browser to the lock page, and wait for it to finish or exit."""
         args = [*self.browser_argv, *self.extra_browser_argv, self.lock_html_url]
         self.log.debug("[browser] browser args: %s", args)
-        self._browser_process = psutil.Popen(args)
-
-        try:
-            while True:
-                if self._solve_halted:
-                    self.log.info("Lock is finished")
-                    break
-
-                if self._browser_process.returncode is not None:  # pragma: no cover
-                    self.log.info(
-                        "Browser is closed with code: %s",
-                        self._browser_process.returncode,
-                    )
-                    break
-
-                await asyncio.sleep(1)
-        finally:
-            self.cleanup()
+        proc = self._browser_process = psutil.Popen(args)
+        exited = asyncio.get_running_loop().run_in_executor(None, proc.wait)
+
+        await self.wait_for_solve(exited)
+
+        if self._solve_halted:
+            self.log.info("Lock is finished")
+        elif not self._solve_stalled:  # pragma: no cover
+            self.log.info("Browser is closed with code: %s", proc.returncode)
 
     # trait defaults
     @default("browser")
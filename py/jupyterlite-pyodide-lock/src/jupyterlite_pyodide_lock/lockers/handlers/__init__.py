@@ -5,15 +5,23 @@
 from __future__ import annotations
 
 import json
+import re
 from typing import TYPE_CHECKING, Any
 
-from jupyterlite_core.constants import JSON_FMT
+from jupyterlite_core.constants import JSON_FMT, UTF8
+from packaging.requirements import Requirement
+from packaging.utils import canonicalize_name
 
 from jupyterlite_pyodide_lock.constants import (
+    INDEX_MODE_SIMPLE,
     LOCK_HTML,
     PROXY,
     PYODIDE_LOCK,
-    WAREHOUSE_UPLOAD_DATE,
+    PYODIDE_LOCK_PROXIED,
+    RE_REMOTE_URL,
+    SIMPLE_JSON_MIME,
+    SIMPLE_UPLOAD_TIME,
+    WHEELHOUSE,
 )
 from jupyterlite_pyodide_lock.utils import (
     epoch_to_warehouse_date,
@@ -25,31 +33,47 @@ from .freezer import MicropipFreeze
 from .logger import Log
 from .mime import ExtraMimeFiles
 from .solver import SolverHTML
+from .warehouse import WarehouseSlimmer
+from .wheelhouse import WheelhouseIndex
 
 if TYPE_CHECKING:
     from collections.abc import Callable
+    from pathlib import Path
 
     from jupyterlite_pyodide_lock.lockers.browser import BrowserLocker
 
+    from .wheelhouse import Wheelhouse
+
     TRouteRule = tuple[str, type, dict[str, Any]]
 
 
-def make_lock_date_epoch_replacer(locker: BrowserLocker) -> Callable[[str], str]:
-    """Filter out releases newer than the lock date."""
-    lock_date_epoch = locker.parent.lock_date_epoch
-    lock_date_iso8601 = epoch_to_warehouse_date(lock_date_epoch)
+def make_simple_lock_date_replacer(
+    locker: BrowserLocker,
+) -> Callable[[bytes], bytes]:
+    """Filter out files of a PEP 691 project page newer than the lock date."""
+    uploaded_before = make_uploaded_before(locker, SIMPLE_UPLOAD_TIME)
 
     def _clamp_to_lock_date_epoch(json_str: bytes) -> bytes:
-        release_data = json.loads(json_str.decode("utf-8"))
-        release_data["releases"] = {
-            release: artifacts
-            for release, artifacts in release_data["releases"].items()
-            if artifacts and all(map(_uploaded_before, artifacts))
-        }
-        return json.dumps(release_data, **JSON_FMT).encode("utf-8")
+        project_data = json.loads(json_str.decode("utf-8"))
+        project_data["files"] = [
+            artifact
+            for artifact in project_data["files"]
+            if SIMPLE_UPLOAD_TIME not in artifact or uploaded_before(artifact)
+        ]
+        return json.dumps(project_data, **JSON_FMT).encode("utf-8")
+
+    return _clamp_to_lock_date_epoch
+
+
+def make_uploaded_before(
+    locker: BrowserLocker, date_key: str
+) -> Callable[[dict[str, Any]], bool]:
+    """Make a check that an artifact was uploaded before the lock date."""
+    lock_date_epoch = locker.parent.lock_date_epoch
+    lock_date_iso8601 = epoch_to_warehouse_date(lock_date_epoch)
 
     def _uploaded_before(artifact: dict[str, Any]) -> bool:
-        upload_iso8601 = artifact[WAREHOUSE_UPLOAD_DATE]
+        upload_iso8601 = artifact[date_key]
         upload_epoch = warehouse_date_to_epoch(upload_iso8601)
 
         if upload_epoch <= lock_date_epoch:
@@ -65,7 +89,20 @@ def make_lock_date_epoch_replacer(locker: BrowserLocker) -> Callable[[str], str]
         )
         return False
 
-    return _clamp_to_lock_date_epoch
+    return _uploaded_before
+
+
+def make_locked_name_skipper(locker: BrowserLocker) -> Callable[[str], bool]:
+    """Skip PyPI JSON for packages in the bootstrap lock, unless in ``specs``."""
+    bootstrap_lock = locker.parent.pyodide_addon.output_pyodide / PYODIDE_LOCK
+    packages = json.loads(bootstrap_lock.read_text(**UTF8))["packages"]
+    locked = {canonicalize_name(pkg.get("name", key)) for key, pkg in packages.items()}
+    locked -= {canonicalize_name(Requirement(spec).name) for spec in locker.specs}
+
+    def _is_locked(path: str) -> bool:
+        return canonicalize_name(path.split("/", 1)[0]) in locked
+
+    return _is_locked
 
 
 def make_handlers(locker: BrowserLocker) -> tuple[TRouteRule]:
@@ -73,17 +110,70 @@ def make_handlers(locker: BrowserLocker) -> tuple[TRouteRule]:
     files_cdn = locker.pythonhosted_cdn_url.encode("utf-8")
     files_local = f"{locker.base_url}/{PROXY}/pythonhosted".encode()
 
-    pypi_kwargs = {
+    # a recorded solve fetches every wheel, to keep it in the cassette
+    wheel_store = (
+        None
+        if locker._cassette and locker._cassette.recording  # noqa: SLF001
+        else locker.parent.wheel_store
+    )
+    # the ``sha256`` of wheels in index documents, to find them in the store
+    wheel_digests: dict[str, str] | None = None if wheel_store is None else {}
+
+    pypi_kwargs: dict[str, Any] = {
         "rewrites": {"/json$": [(files_cdn, files_local)]},
         "mime_map": {r"/json$": "application/json"},
+        "max_age": locker.json_max_age,
+        "frozen_epoch": locker.parent.lock_date_epoch,
+        "negative_ttl": locker.json_negative_ttl,
+        "wheel_digests": wheel_digests,
+    }
+
+    if locker.skip_locked_json:
+        pypi_kwargs["skip"] = make_locked_name_skipper(locker)
+
+    slimmer = WarehouseSlimmer(
+        lock_date_epoch=locker.parent.lock_date_epoch,
+        slim=locker.slim_json,
+        constraints=(
+            [*locker.constraints, *locker.pins] if locker.slim_json_constraints else []
+        ),
+        log=locker.log,
+    )
+
+    if slimmer.enabled:
+        pypi_kwargs.update(transform=slimmer, transform_key=slimmer.key)
+
+    simple_kwargs: dict[str, Any] = {
+        **{k: v for k, v in pypi_kwargs.items() if not k.startswith("transform")},
+        "rewrites": {"/$": [(files_cdn, files_local)]},
+        "mime_map": {r"/index\.json$": SIMPLE_JSON_MIME},
+        "index_file": "index.json",
+        "accept": SIMPLE_JSON_MIME,
     }
 
     if locker.parent.lock_date_epoch:
-        replacer = make_lock_date_epoch_replacer(locker)
-        pypi_kwargs["rewrites"]["/json$"] += [
-            (WAREHOUSE_UPLOAD_DATE.encode("utf-8"), replacer)
+        replacer = make_simple_lock_date_replacer(locker)
+        simple_kwargs["rewrites"]["/$"] += [
+            (SIMPLE_UPLOAD_TIME.encode("utf-8"), replacer)
         ]
 
+    index_rules = []
+    wheelhouse = locker._wheelhouse  # noqa: SLF001
+    if wheelhouse:
+        index_rules += make_wheelhouse_rules(locker, wheelhouse)
+
+    index_proxy = (
+        make_proxy(locker, "simple", locker.pypi_simple_url, **simple_kwargs)
+        if locker.index_mode == INDEX_MODE_SIMPLE
+        else make_proxy(locker, "pypi", locker.pypi_api_url, **pypi_kwargs)
+    )
+    if not locker.wheelhouse_only:
+        index_rules += [index_proxy]
+
+    pyodide_rules = []
+    if locker.proxy_pyodide_cdn:
+        pyodide_rules += make_pyodide_rules(locker, wheel_store=wheel_store)
+
     solver_kwargs = {
         "context": locker._context,  # noqa: SLF001
         "log": locker.log,
@@ -99,15 +189,98 @@ def make_handlers(locker: BrowserLocker) -> tuple[TRouteRule]:
         # the page to which the client POSTs
         (f"^/{PYODIDE_LOCK}$", MicropipFreeze, {"locker": locker}),
         # logs
-        ("^/log/(.*)$", Log, {"log": locker.log}),
+        ("^/log/(.*)$", Log, {"log": locker.log, "activity": locker.note_activity}),
         # remote proxies
-        make_proxy(locker, "pythonhosted", locker.pythonhosted_cdn_url),
-        make_proxy(locker, "pypi", locker.pypi_api_url, **pypi_kwargs),
+        make_proxy(
+            locker,
+            "pythonhosted",
+            locker.pythonhosted_cdn_url,
+            wheel_store=wheel_store,
+            wheel_digests=wheel_digests,
+        ),
+        *pyodide_rules,
+        *index_rules,
         # fallback to ``output_dir``
         (r"^/(.*)$", ExtraMimeFiles, fallback_kwargs),
     )
 
 
+def make_wheelhouse_rules(
+    locker: BrowserLocker, wheelhouse: Wheelhouse
+) -> list[TRouteRule]:
+    """Generate the handler rules for the index and files of local wheels."""
+    index_kwargs = {
+        "wheelhouse": wheelhouse,
+        "files_url": f"{locker.base_url}/{WHEELHOUSE}/files",
+        "index_mode": locker.index_mode,
+        "log": locker.log,
+    }
+    index_route = (
+        f"^/{WHEELHOUSE}/simple/([^/]+)/$"
+        if locker.index_mode == INDEX_MODE_SIMPLE
+        else f"^/{WHEELHOUSE}/pypi/([^/]+)/json$"
+    )
+    return [
+        (index_route, WheelhouseIndex, index_kwargs),
+        *[
+            (
+                f"^/{WHEELHOUSE}/files/{index}/(.*)$",
+                ExtraMimeFiles,
+                {"path": wheel_dir, "log": locker.log},
+            )
+            for index, wheel_dir in enumerate(wheelhouse.dirs)
+        ],
+    ]
+
+
+def make_pyodide_rules(locker: BrowserLocker, **extra_config: Any) -> list[TRouteRule]:
+    """Generate the handler rules for a bootstrap lockfile using the CDN proxy."""
+    lock_path = write_proxied_lock(locker)
+    return [
+        (
+            f"^/{PROXY}/({re.escape(lock_path.name)})$",
+            ExtraMimeFiles,
+            {"path": lock_path.parent, "log": locker.log},
+        ),
+        make_proxy(locker, "pyodide", locker.parent.pyodide_cdn_url, **extra_config),
+    ]
+
+
+def write_proxied_lock(locker: BrowserLocker) -> Path:
+    """Write the bootstrap lockfile, with packages not in ``output_pyodide`` proxied.
+
+    As ``pyodide`` resolves a relative ``file_name`` against the folder of the
+    lockfile, which is served by the proxy, packages found in ``output_pyodide`` get
+    the absolute URL of where it is served.
+    """
+    out_pyodide = locker.parent.pyodide_addon.output_pyodide
+    lock_json = json.loads((out_pyodide / PYODIDE_LOCK).read_text(**UTF8))
+    out_rel = out_pyodide.relative_to(locker.parent.manager.output_dir).as_posix()
+    local_url = f"{locker.base_url}/{out_rel}"
+    proxy_url = f"{locker.base_url}/{PROXY}/pyodide"
+    proxied = 0
+
+    for package in lock_json["packages"].values():
+        file_name = package["file_name"]
+        if re.match(RE_REMOTE_URL, file_name):
+            continue
+        if (out_pyodide / file_name).exists():
+            package["file_name"] = f"{local_url}/{file_name}"
+            continue
+        package["file_name"] = f"{proxy_url}/{file_name}"
+        proxied += 1
+
+    lock_path = locker.cache_dir / PYODIDE_LOCK_PROXIED
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    lock_path.write_text(json.dumps(lock_json, **JSON_FMT), **UTF8)
+    locker.log.info(
+        "[tornado] %s of %s bootstrap packages from the CDN proxy",
+        proxied,
+        len(lock_json["packages"]),
+    )
+    return lock_path
+
+
 def make_proxy(
     locker: BrowserLocker,
     path: str,
@@ -121,6 +294,13 @@ def make_proxy(
         "path": locker.cache_dir / path,
         "remote": remote,
         "log": locker.log,
+        "activity": locker.note_activity,
+        "retry_policy": locker._retry_policy,  # noqa: SLF001
+        "client": locker._upstream_client,  # noqa: SLF001
+        "stream": locker.stream_proxies,
+        "cache": locker._proxy_cache,  # noqa: SLF001
+        "executor": locker._rewrite_executor,  # noqa: SLF001
+        "prefetcher": locker._prefetcher,  # noqa: SLF001
         **extra_config,
     }
     return (route, CachingRemoteFiles, config)
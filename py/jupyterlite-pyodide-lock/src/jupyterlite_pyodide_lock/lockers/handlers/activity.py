@@ -0,0 +1,36 @@
+"""A ``tornado`` application that reports each request it serves."""
+# Copyright (c) jupyterlite-pyodide-lock contributors.
+# Distributed under the terms of the BSD-3-Clause License.
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+
+from tornado.web import Application, RequestHandler
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+
+class ActivityApplication(Application):
+    """An application which reports every finished request as progress."""
+
+    activity: Callable[[str, int], None] | None
+
+    def __init__(
+        self,
+        *args: Any,
+        activity: Callable[[str, int], None] | None = None,
+        **kwargs: Any,
+    ) -> None:
+        """Initialize the application, with an optional progress callback."""
+        super().__init__(*args, **kwargs)
+        self.activity = activity
+
+    def log_request(self, handler: RequestHandler) -> None:
+        """Report a finished request, then log it as usual."""
+        if self.activity:
+            request = handler.request
+            status = handler.get_status()
+            self.activity(f"{request.method} {request.uri} {status}", 0)
+        super().log_request(handler)
@@ -5,66 +5,439 @@
 from __future__ import annotations
 
 import asyncio
+import json
+import os
 import re
+import time
+import urllib.parse
 from collections.abc import Callable
+from functools import partial
+from hashlib import sha256
+from http import HTTPStatus
 from pathlib import Path
-from typing import TYPE_CHECKING, Any
+from typing import IO, TYPE_CHECKING, Any, ClassVar
 
-from tornado.httpclient import AsyncHTTPClient, HTTPError
-from tornado.simple_httpclient import HTTPTimeoutError
+from jupyterlite_core.constants import UTF8
+from tornado.httpclient import AsyncHTTPClient, HTTPClientError
+from tornado.httputil import HTTPHeaders
+from tornado.iostream import StreamClosedError
+from tornado.web import HTTPError
+
+from jupyterlite_pyodide_lock.proxy_cache import ProxyCache, write_bytes_atomic
 
 from .mime import ExtraMimeFiles
+from .offload import offload
+from .retry import RetryPolicy
+from .warehouse import get_artifact_digests
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
+    from tornado.httpclient import HTTPResponse
+
+    from jupyterlite_pyodide_lock.store import WheelStore
+
+    from .prefetch import Prefetcher
+    from .upstream import UpstreamClient
 
 TReplacer = bytes | Callable[[bytes], bytes]
+TActivity = Callable[[str, int], None]
+TPathFilter = Callable[[str], bool]
+TTransform = Callable[[bytes], bytes]
 TRouteRewrite = tuple[str, TReplacer]
 TRewriteMap = dict[str, list[TRouteRewrite]]
 
+#: the suffix of the file beside a cached document, with its HTTP validators
+META_SUFFIX = ".meta.json"
+
+#: the suffix of a cached, transformed document
+TRANSFORMED_SUFFIX = ".slim"
+
+#: upstream statuses of documents which are remembered as missing
+NEGATIVE_STATUS = (HTTPStatus.NOT_FOUND, HTTPStatus.GONE)
+
+#: bytes forwarded to a client but not yet sent, before it catches up from the cache
+STREAM_MAX_PENDING = 8 * 1024 * 1024
+
+#: bytes read from the cache at a time, for a client catching up
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+async def record_wheel_digests(
+    wheel_digests: dict[str, str] | None, executor: Executor | None, body: bytes
+) -> None:
+    """Remember the ``sha256`` of the wheels in a document, if needed."""
+    if wheel_digests is None:
+        return
+    digests, _elapsed = await offload(
+        executor, get_artifact_digests, body, picklable=True
+    )
+    wheel_digests.update(digests)
+
 
 class CachingRemoteFiles(ExtraMimeFiles):
     """a handler which serves files from a cache, downloading them as needed."""
 
     #: remote URL root
     remote: str
-    #: HTTP client
-    client: AsyncHTTPClient
+    #: HTTP client, usually shared by all proxies
+    client: AsyncHTTPClient | UpstreamClient
     #: URL patterns that should have text replaced
     rewrites: TRewriteMap
+    #: a shared store of wheels
+    wheel_store: WheelStore | None
+    #: the ``sha256`` of remote wheel URLs, from documents, shared by proxies
+    wheel_digests: dict[str, str] | None
+    #: a callback for progress, and the change in the number of pending fetches
+    activity: TActivity | None
+    #: when to retry failed fetches
+    retry_policy: RetryPolicy
+    #: forward files without rewrites to the client while they are cached
+    stream: bool
+    #: seconds a cached document is used before revalidating it
+    max_age: float
+    #: documents validated after this epoch are never revalidated
+    frozen_epoch: int | None
+    #: the budget, compression and memory tier of cached files
+    cache: ProxyCache
+    #: seconds to remember a missing document, without asking upstream again
+    negative_ttl: float
+    #: paths which are never fetched, as they are already satisfied locally
+    skip: TPathFilter | None
+    #: the file name to cache paths ending in ``/``, like a PEP 691 project page
+    index_file: str | None
+    #: the content type to request from upstream
+    accept: str | None
+    #: a filter of documents, cached by the digest of the document and ``transform_key``
+    transform: TTransform | None
+    #: the settings of the ``transform``
+    transform_key: str
+    #: workers for transforms and rewrites, or the event loop's default threads
+    executor: Executor | None
+    #: speculative downloads of the wheels likely to be requested after documents
+    prefetcher: Prefetcher | None
+    #: fetches in progress, shared by concurrent requests for the same file
+    in_flight: ClassVar[dict[Path, asyncio.Future[None]]] = {}
 
-    def initialize(self, *args: Any, **kwargs: Any) -> None:
+    def initialize(self, *args: Any, **kwargs: Any) -> None:  # noqa: PLR0914
         """Extend the base initialize with instance members."""
         remote: str = kwargs.pop("remote")
         rewrites: TRewriteMap | None = kwargs.pop("rewrites", None)
+        wheel_store: WheelStore | None = kwargs.pop("wheel_store", None)
+        wheel_digests: dict[str, str] | None = kwargs.pop("wheel_digests", None)
+        activity: TActivity | None = kwargs.pop("activity", None)
+        retry_policy: RetryPolicy | None = kwargs.pop("retry_policy", None)
+        client: UpstreamClient | None = kwargs.pop("client", None)
+        stream: bool = kwargs.pop("stream", False)
+        max_age: float = kwargs.pop("max_age", 0)
+        frozen_epoch: int | None = kwargs.pop("frozen_epoch", None)
+        cache: ProxyCache | None = kwargs.pop("cache", None)
+        negative_ttl: float = kwargs.pop("negative_ttl", 0)
+        skip: TPathFilter | None = kwargs.pop("skip", None)
+        index_file: str | None = kwargs.pop("index_file", None)
+        accept: str | None = kwargs.pop("accept", None)
+        transform: TTransform | None = kwargs.pop("transform", None)
+        transform_key: str = kwargs.pop("transform_key", "")
+        executor: Executor | None = kwargs.pop("executor", None)
+        prefetcher: Prefetcher | None = kwargs.pop("prefetcher", None)
         super().initialize(*args, **kwargs)
         self.remote = remote
-        self.client = AsyncHTTPClient()
+        self.client = client or AsyncHTTPClient()
         self.rewrites = rewrites or {}
+        self.wheel_store = wheel_store
+        self.wheel_digests = wheel_digests
+        self.activity = activity
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.stream = stream
+        self.max_age = max_age
+        self.frozen_epoch = frozen_epoch
+        self.cache = cache or ProxyCache(Path(self.root))
+        self.negative_ttl = negative_ttl
+        self.skip = skip
+        self.index_file = index_file
+        self.accept = accept
+        self.transform = transform
+        self.transform_key = transform_key
+        self.executor = executor
+        self.prefetcher = prefetcher
 
     async def get(self, path: str, include_body: bool = True) -> None:  # noqa: FBT002, FBT001
         """Actually fetch a file."""
-        cache_path = Path(self.root) / path
+        cache_path = self.get_cache_path(path)
+        if self.is_rewritten(path):
+            return await self.get_document(path, cache_path, include_body=include_body)
+        if self.prefetcher:
+            await self.prefetcher.wait(cache_path)
         if cache_path.exists():  # pragma: no cover
+            self.cache.record("hits")
             cache_path.touch()
+        elif self.link_stored_wheel(path, cache_path):
+            self.cache.record("hits")
+            self.log.debug("[cacher] linked from wheel store: %s", path)
+        elif self.can_stream(path, cache_path, include_body=include_body):
+            if await self.stream_file(path, cache_path):
+                return None
         else:
-            await self.cache_file(path, cache_path)
+            await self.cache_file_once(path, cache_path)
         return await super().get(path, include_body=include_body)
 
+    def get_cache_path(self, path: str) -> Path:
+        """Get the cache path for a URL path, using ``index_file`` for folders."""
+        cache_path = Path(self.root) / path
+        if self.index_file and (not path or path.endswith("/")):
+            cache_path /= self.index_file
+        return cache_path
+
+    async def cache_file_once(self, path: str, cache_path: Path) -> None:
+        """Cache a file, or wait for a concurrent request already caching it.
+
+        The shared fetch is shielded, so a request dropped by the client doesn't
+        cancel the fetch for any other requests.
+        """
+        in_flight = self.in_flight.get(cache_path)
+        if in_flight is None:
+            in_flight = asyncio.ensure_future(self.cache_and_store(path, cache_path))
+            self.in_flight[cache_path] = in_flight
+            in_flight.add_done_callback(lambda _: self.in_flight.pop(cache_path, None))
+        else:
+            self.log.debug("[cacher] waiting for in-flight fetch: %s", path)
+        await asyncio.shield(in_flight)
+
+    def is_rewritten(self, path: str) -> bool:
+        """Get whether a path has any rewrites."""
+        return any(re.search(pattern, path) for pattern in self.rewrites)
+
+    async def get_document(
+        self, path: str, cache_path: Path, *, include_body: bool
+    ) -> None:
+        """Serve a document, rewriting the cached upstream response.
+
+        The raw response is kept with its HTTP validators, and only revalidated
+        when stale, so rewrites which depend on the solve are never cached.
+        Documents which are skipped, or recently missing upstream, are not found.
+        """
+        if self.skip and self.skip(path):
+            self.log.debug("[cacher] skipped: %s", path)
+            self.cache.record("skipped")
+            raise HTTPError(HTTPStatus.NOT_FOUND)
+
+        missing = self.get_recently_missing(cache_path)
+        if missing:
+            self.log.debug("[cacher] recently missing (%s): %s", missing, path)
+            self.cache.record("negative_hits")
+            raise HTTPError(missing)
+
+        if self.is_stale(cache_path):
+            try:
+                await self.cache_file_once(path, cache_path)
+            except HTTPClientError as err:
+                if err.code in NEGATIVE_STATUS:
+                    raise HTTPError(err.code) from err
+                raise
+        else:
+            self.log.debug("[cacher] fresh: %s", path)
+            self.cache.record("hits")
+
+        loop = asyncio.get_running_loop()
+        raw = await loop.run_in_executor(None, self.cache.read, cache_path)
+        transformed = await self.transform_body(cache_path, raw)
+        digests = asyncio.ensure_future(
+            record_wheel_digests(
+                self.wheel_digests if include_body else None, self.executor, transformed
+            )
+        )
+        body = transformed
+        if self.rewrites:
+            body, elapsed = await offload(self.executor, self.rewrite_body, path, body)
+            self.log.debug("[cacher] rewrote %s in %.1fms", path, elapsed * 1000)
+        await digests
+
+        self.absolute_path = str(cache_path)
+        self.set_header("Content-Type", self.get_content_type())
+        self.set_header("Content-Length", len(body))
+        self.set_header("Etag", f'"{sha256(body).hexdigest()}"')
+        if include_body:
+            self.write(body)
+        await self.finish()
+
+        if self.prefetcher and include_body:
+            await self.prefetcher.schedule(transformed)
+
+    async def transform_body(self, cache_path: Path, raw: bytes) -> bytes:
+        """Apply the ``transform``, reusing the result for the same input."""
+        if self.transform is None:
+            return raw
+        loop = asyncio.get_running_loop()
+        raw_digest = read_meta(cache_path).get("sha256") or sha256(raw).hexdigest()
+        key = sha256(f"{self.transform_key}:{raw_digest}".encode()).hexdigest()
+        out_path = cache_path.with_name(
+            f"{cache_path.name}.{key[:16]}{TRANSFORMED_SUFFIX}"
+        )
+        if self.cache.exists(out_path):
+            self.cache.record("transform_hits")
+            return await loop.run_in_executor(None, self.cache.read, out_path)
+        body: bytes
+        body, elapsed = await offload(
+            self.executor, self.transform, raw, picklable=True
+        )
+        self.log.debug("[cacher] transformed %s in %.1fms", out_path, elapsed * 1000)
+        self.cache.record("transforms")
+        await loop.run_in_executor(None, self.cache.write, out_path, body)
+        return body
+
+    def get_recently_missing(self, cache_path: Path) -> int | None:
+        """Get the status of a document missing upstream within ``negative_ttl``."""
+        meta = read_meta(cache_path)
+        status = meta.get("status")
+        age = time.time() - meta.get("validated", 0)
+        if status in NEGATIVE_STATUS and age < self.negative_ttl:
+            return int(status)
+        return None
+
+    def is_stale(self, cache_path: Path) -> bool:
+        """Get whether a cached document needs to be (re)validated upstream."""
+        meta = read_meta(cache_path)
+        if not meta or meta.get("status") or not self.cache.exists(cache_path):
+            return True
+        validated = float(meta.get("validated", 0))
+        if self.frozen_epoch and validated >= self.frozen_epoch:
+            return False
+        return time.time() - validated > self.max_age
+
+    def can_stream(self, path: str, cache_path: Path, *, include_body: bool) -> bool:
+        """Get whether a file can be forwarded to the client while it is cached."""
+        return (
+            self.stream
+            and include_body
+            and cache_path not in self.in_flight
+            and not self.is_rewritten(path)
+        )
+
+    async def stream_file(self, path: str, cache_path: Path) -> bool:
+        """Forward a file to the client while writing it to the cache.
+
+        Concurrent requests for the same file wait for it to be cached. Returns
+        whether anything was forwarded: if not, the cached file is still to serve.
+        """
+        future: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self.in_flight[cache_path] = future
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+
+        url = f"{self.remote}/{path}"
+        tee = StreamTee(self, cache_path)
+        self.cache.record("misses")
+        self.note_activity(f"streaming {url}", 1)
+        try:
+            await self.fetch_with_retries(url, tee=tee)
+            tee.finish()
+            self.store_wheel(cache_path)
+        except Exception as err:
+            tee.abort()
+            future.set_exception(err)
+            raise
+        except BaseException:
+            tee.abort()
+            future.cancel()
+            raise
+        else:
+            future.set_result(None)
+        finally:
+            self.in_flight.pop(cache_path, None)
+            self.note_activity(f"streamed {url}", -1)
+
+        await tee.catch_up()
+        return tee.started
+
+    def start_stream(self, cache_path: Path, headers: HTTPHeaders) -> None:
+        """Set the response headers, before forwarding the first chunk."""
+        self.absolute_path = str(cache_path)
+        self.set_header("Content-Type", self.get_content_type())
+        length = headers.get("Content-Length")
+        if length and not headers.get("Content-Encoding"):
+            self.set_header("Content-Length", length)
+
+    async def cache_and_store(self, path: str, cache_path: Path) -> None:
+        """Cache a file, then add it to the wheel store."""
+        await self.cache_file(path, cache_path)
+        self.store_wheel(cache_path)
+
+    def link_stored_wheel(self, path: str, cache_path: Path) -> bool:
+        """Link a wheel from the shared store into the cache, if found.
+
+        A wheel is found by the ``sha256`` from an index document, if known.
+        """
+        store = self.wheel_store
+        if store is None or cache_path.suffix != ".whl":
+            return False
+        digest = (self.wheel_digests or {}).get(f"{self.remote}/{path}")
+        return store.link_to(cache_path, file_name=cache_path.name, sha256=digest)
+
+    def store_wheel(self, cache_path: Path) -> None:
+        """Add a newly-cached wheel to the shared store."""
+        store = self.wheel_store
+        if store is None or cache_path.suffix != ".whl":
+            return
+        try:
+            store.add(cache_path)
+        except OSError as err:  # pragma: no cover
+            self.log.warning("[cacher] failed to store %s: %s", cache_path.name, err)
+
     async def cache_file(self, path: str, cache_path: Path) -> None:
-        """Get the file, and rewrite it."""
+        """Get the file, revalidating any cached document with its validators."""
         if not cache_path.parent.exists():  # pragma: no cover
             cache_path.parent.mkdir(parents=True)
 
         url = f"{self.remote}/{path}"
-        body = await self.fetch_body_with_retries(url)
+        is_document = self.is_rewritten(path)
+        headers = {"Accept": self.accept} if self.accept else {}
+        if is_document and self.cache.exists(cache_path):
+            headers.update(get_conditional_headers(read_meta(cache_path)))
+
+        loop = asyncio.get_running_loop()
+        meta: dict[str, Any]
+        self.note_activity(f"fetching {url}", 1)
+        try:
+            res = await self.fetch_with_retries(url, headers=headers)
+        except HTTPClientError as err:
+            if is_document and self.negative_ttl and err.code in NEGATIVE_STATUS:
+                meta = {"status": err.code, "validated": time.time()}
+                await loop.run_in_executor(None, write_meta, cache_path, meta)
+            raise
+        finally:
+            self.note_activity(f"fetched {url}", -1)
+
+        if res.code == HTTPStatus.NOT_MODIFIED:
+            self.log.debug("[cacher] not modified: %s", url)
+            self.cache.record("revalidated")
+        else:
+            self.cache.record("misses")
+            write = self.cache.write if is_document else write_bytes_atomic
+            await loop.run_in_executor(None, write, cache_path, res.body)
+
+        if is_document:
+            meta = {"validated": time.time()}
+            if res.code == HTTPStatus.NOT_MODIFIED:
+                meta = {**read_meta(cache_path), **meta}
+            else:
+                meta.update(
+                    etag=res.headers.get("ETag"),
+                    last_modified=res.headers.get("Last-Modified"),
+                    sha256=sha256(res.body).hexdigest(),
+                )
+            await loop.run_in_executor(None, write_meta, cache_path, meta)
 
+    def rewrite_body(self, path: str, body: bytes) -> bytes:
+        """Apply any rewrites for a path."""
         for url_pattern, replacements in self.rewrites.items():
             if re.search(url_pattern, path) is None:  # pragma: no cover
-                self.log.debug("[cacher] %s is not %s", url, url_pattern)
+                self.log.debug("[cacher] %s is not %s", path, url_pattern)
                 continue
             for marker, replacement in replacements:
                 if marker not in body:  # pragma: no cover
-                    self.log.debug("[cacher] %s does not contain %s", url, marker)
+                    self.log.debug("[cacher] %s does not contain %s", path, marker)
                     continue
-                self.log.debug("[cacher] %s contains %s", url, marker)
+                start = time.perf_counter()
                 if isinstance(replacement, bytes):
                     body = body.replace(marker, replacement)
                 elif callable(replacement):
@@ -72,29 +445,241 @@ class CachingRemoteFiles(ExtraMimeFiles):
                 else:  # pragma: no cover
                     msg = f"Don't know what to do with {type(replacement)}"
                     raise NotImplementedError(msg)
+                self.log.debug(
+                    "[cacher] %s rewrote %s in %.1fms",
+                    path,
+                    marker,
+                    (time.perf_counter() - start) * 1000,
+                )
+        return body
 
-        await asyncio.get_running_loop().run_in_executor(
-            None, cache_path.write_bytes, body
-        )
+    def note_activity(self, reason: str, pending: int = 0) -> None:
+        """Report progress to the locker, if it is listening."""
+        if self.activity:
+            self.activity(reason, pending)
+
+    async def fetch_body_with_retries(
+        self, fetch_url: str, retries: int | None = None
+    ) -> bytes:
+        """Fetch the raw bytes of URL with retries."""
+        res = await self.fetch_with_retries(fetch_url, retries)
+        return res.body
 
-    async def fetch_body_with_retries(self, fetch_url: str, retries: int = 5) -> bytes:
-        """Fetch the raw bytes of URL with retries.
+    async def fetch_with_retries(
+        self,
+        fetch_url: str,
+        retries: int | None = None,
+        tee: StreamTee | None = None,
+        headers: dict[str, str] | None = None,
+    ) -> HTTPResponse:
+        """Fetch a URL with retries.
 
-        In the event of a timeout, wait for an increasing number of seconds
+        The first attempt is immediate: retryable failures are retried after a
+        backoff from the ``retry_policy``, within the budget for the host.
+
+        With a ``tee``, the body is streamed to it instead, and is only retried if
+        nothing has yet been forwarded to the client. A ``304 Not Modified``
+        response to conditional ``headers`` is returned, rather than raised.
         """
+        fetch_kwargs = get_fetch_kwargs(tee, headers)
+        policy = self.retry_policy
+        host = urllib.parse.urlparse(fetch_url).netloc
+        attempts = retries or policy.retries
+        last_error: Exception | None = None
+
         self.log.debug("[cacher] fetching:    %s", fetch_url)
-        last_error: HTTPError | None = None
-        for attempt in range(retries):
-            await asyncio.sleep(2**attempt)
+
+        for attempt in range(attempts):
+            if attempt:
+                delay = policy.get_delay(attempt)
+                if not policy.take_retry(host, delay):
+                    self.log.warning("[cacher] no retries left for %s", host)
+                    break
+                self.log.warning(
+                    "[cacher] retry %s of %s in %.2fs for %s: %s",
+                    attempt,
+                    attempts - 1,
+                    delay,
+                    fetch_url,
+                    last_error,
+                )
+                await asyncio.sleep(delay)
+            policy.record(host, "attempts")
             try:
-                res = await self.client.fetch(fetch_url)
-            except HTTPTimeoutError as err:  # pragma: no cover
+                res = await self.client.fetch(fetch_url, **fetch_kwargs)
+            except Exception as err:
+                if is_not_modified(err):
+                    return err.response  # type: ignore[attr-defined,no-any-return]
+                if not policy.is_retryable(err) or (tee and tee.started):
+                    policy.record(host, "failures")
+                    raise
                 last_error = err
                 continue
             else:
-                return res.body
+                return res
+
+        policy.record(host, "failures")
 
         if TYPE_CHECKING:
             assert last_error
 
         raise last_error  # pragma: no cover
+
+
+class StreamTee:
+    """Forward chunks of a successful upstream response to a client and a file.
+
+    The file is written under a temporary name, and only moved into place once the
+    whole response has been received.
+
+    As upstream chunks can't wait for the client, a client with more than
+    ``max_pending`` bytes not yet sent stops being forwarded chunks, and is sent the
+    rest of the file from the cache, at its own pace, once it is complete.
+    """
+
+    handler: CachingRemoteFiles
+    cache_path: Path
+    tmp_path: Path
+    status: int
+    headers: HTTPHeaders
+    started: bool
+    max_pending: int
+    #: bytes forwarded to the client, but not yet sent
+    pending: int
+    #: bytes forwarded to the client
+    forwarded: int
+    #: whether the client fell behind, and will catch up from the cache
+    lagging: bool
+    _fd: IO[bytes] | None
+
+    def __init__(
+        self,
+        handler: CachingRemoteFiles,
+        cache_path: Path,
+        max_pending: int = STREAM_MAX_PENDING,
+    ) -> None:
+        """Initialize the tee members."""
+        self.handler = handler
+        self.cache_path = cache_path
+        self.tmp_path = cache_path.with_name(f".{cache_path.name}.{os.getpid()}.tmp")
+        self.status = 0
+        self.headers = HTTPHeaders()
+        self.started = False
+        self.max_pending = max_pending
+        self.pending = 0
+        self.forwarded = 0
+        self.lagging = False
+        self._fd = None
+
+    def on_header(self, line: str) -> None:
+        """Track the status and headers of the latest response, e.g. after redirects."""
+        if line.startswith("HTTP/"):
+            self.status = int(line.split(" ", 2)[1])
+            self.headers = HTTPHeaders()
+        elif line.strip():
+            self.headers.parse_line(line)
+
+    def on_chunk(self, chunk: bytes) -> None:
+        """Write a chunk of a successful response, ignoring the bodies of errors."""
+        if self.status != HTTPStatus.OK:
+            return
+        if self._fd is None:
+            self._fd = self.tmp_path.open("wb")
+        if not self.started:
+            self.started = True
+            self.handler.start_stream(self.cache_path, self.headers)
+        self._fd.write(chunk)
+        if self.lagging:
+            return
+        self.handler.write(chunk)
+        self.forwarded += len(chunk)
+        self.pending += len(chunk)
+        self.handler.flush().add_done_callback(partial(self.on_flushed, len(chunk)))
+        self.lagging = self.pending > self.max_pending
+
+    def on_flushed(self, size: int, future: asyncio.Future[None]) -> None:
+        """Forget the bytes of a chunk sent to the client, or that never will be."""
+        self.pending -= size
+        _ = future.cancelled() or future.exception()
+
+    async def catch_up(self) -> None:
+        """Send the rest of the cached file to a client that fell behind."""
+        if not self.lagging:
+            return
+        try:
+            with self.cache_path.open("rb") as fd:
+                fd.seek(self.forwarded)
+                while chunk := fd.read(STREAM_CHUNK_SIZE):
+                    self.handler.write(chunk)
+                    await self.handler.flush()
+        except StreamClosedError:  # pragma: no cover
+            self.handler.log.debug("[cacher] client left: %s", self.cache_path.name)
+
+    def finish(self) -> None:
+        """Move the complete file into the cache."""
+        if self._fd is None:
+            self.tmp_path.write_bytes(b"")
+        else:
+            self._fd.close()
+        self.tmp_path.replace(self.cache_path)
+
+    def abort(self) -> None:
+        """Discard a partial file."""
+        if self._fd is not None:
+            self._fd.close()
+        self.tmp_path.unlink(missing_ok=True)
+
+
+def get_fetch_kwargs(
+    tee: StreamTee | None, headers: dict[str, str] | None
+) -> dict[str, Any]:
+    """Get the extra arguments for a fetch, if any."""
+    fetch_kwargs: dict[str, Any] = {}
+    if headers:
+        fetch_kwargs.update(headers=headers)
+    if tee:
+        fetch_kwargs.update(
+            header_callback=tee.on_header, streaming_callback=tee.on_chunk
+        )
+    return fetch_kwargs
+
+
+def is_not_modified(err: Exception) -> bool:
+    """Get whether an error is a ``304 Not Modified`` response."""
+    return (
+        isinstance(err, HTTPClientError)
+        and err.code == HTTPStatus.NOT_MODIFIED
+        and err.response is not None
+    )
+
+
+def get_meta_path(cache_path: Path) -> Path:
+    """Get the path of the validators of a cached document."""
+    return cache_path.with_name(f"{cache_path.name}{META_SUFFIX}")
+
+
+def read_meta(cache_path: Path) -> dict[str, Any]:
+    """Read the validators of a cached document, if any."""
+    meta_path = get_meta_path(cache_path)
+    if not meta_path.exists():
+        return {}
+    try:
+        meta = json.loads(meta_path.read_text(**UTF8))
+    except json.JSONDecodeError:  # pragma: no cover
+        return {}
+    return meta if isinstance(meta, dict) else {}
+
+
+def write_meta(cache_path: Path, meta: dict[str, Any]) -> None:
+    """Write the validators of a cached document."""
+    write_bytes_atomic(get_meta_path(cache_path), json.dumps(meta).encode("utf-8"))
+
+
+def get_conditional_headers(meta: dict[str, Any]) -> dict[str, str]:
+    """Get the headers to revalidate a cached document."""
+    headers = {}
+    if meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+    return headers
@@ -44,6 +44,6 @@ class MicropipFreeze(RequestHandler):
                 textwrap.indent(msg, "\t"),
             )
 
-        self.locker._solve_halted = True  # noqa: SLF001
+        self.locker.halt_solve()
 
         await self.finish()
@@ -10,15 +10,24 @@ from typing import TYPE_CHECKING, Any
 from tornado.web import RequestHandler
 
 if TYPE_CHECKING:
+    from collections.abc import Callable
     from logging import Logger
 
 
 class Log(RequestHandler):
     """Log repeater from the browser."""
 
-    def initialize(self, log: Logger, **kwargs: Any) -> None:
+    activity: Callable[[str, int], None] | None
+
+    def initialize(
+        self,
+        log: Logger,
+        activity: Callable[[str, int], None] | None = None,
+        **kwargs: Any,
+    ) -> None:
         """Initialize handler instance members."""
         self.log = log
+        self.activity = activity
         super().initialize(**kwargs)
 
     def post(self, pipe: str) -> None:
@@ -29,4 +38,8 @@ class Log(RequestHandler):
             message = body["message"]
             self.log.debug("[pyodidejs] [%s] %s", pipe, message)
         except Exception:  # pragma: no cover
+            message = body
             self.log.debug("[pyodidejs] [%s] %s", pipe, body)
+
+        if self.activity:
+            self.activity(f"[{pipe}] {message}", 0)
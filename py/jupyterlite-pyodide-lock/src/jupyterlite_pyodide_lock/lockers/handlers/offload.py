@@ -0,0 +1,58 @@
+"""Run CPU-bound document rewrites away from the ``tornado`` event loop."""
+# Copyright (c) jupyterlite-pyodide-lock contributors.
+# Distributed under the terms of the BSD-3-Clause License.
+
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+#: run rewrites in threads, which share memory, but also the GIL
+EXECUTOR_THREAD = "thread"
+
+#: run picklable rewrites in processes, which can use more cores
+EXECUTOR_PROCESS = "process"
+
+EXECUTORS = [EXECUTOR_THREAD, EXECUTOR_PROCESS]
+
+
+def make_executor(kind: str, max_workers: int = 0) -> Executor:
+    """Create a pool of workers, with the default size if ``max_workers`` is 0."""
+    workers = max_workers or None
+    if kind == EXECUTOR_PROCESS:
+        # ``fork`` from a process with running threads is unsafe
+        context = multiprocessing.get_context("spawn")
+        return ProcessPoolExecutor(max_workers=workers, mp_context=context)
+    return ThreadPoolExecutor(
+        max_workers=workers, thread_name_prefix="jupyterlite-pyodide-lock-rewrite"
+    )
+
+
+def timed(fn: Callable[..., Any], *args: Any) -> tuple[Any, float]:
+    """Call a function, also returning the seconds it took in the worker."""
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+async def offload(
+    executor: Executor | None,
+    fn: Callable[..., Any],
+    *args: Any,
+    picklable: bool = False,
+) -> tuple[Any, float]:
+    """Run CPU-bound work in a pool, returning its result and the seconds it took.
+
+    Work which isn't ``picklable``, like bound methods of a handler, can't be sent
+    to another process, so uses the event loop's default threads instead.
+    """
+    if not picklable and isinstance(executor, ProcessPoolExecutor):
+        executor = None
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, timed, fn, *args)
@@ -0,0 +1,184 @@
+"""Speculatively fetch the wheel a browser will likely request after project JSON."""
+# Copyright (c) jupyterlite-pyodide-lock contributors.
+# Distributed under the terms of the BSD-3-Clause License.
+
+from __future__ import annotations
+
+import asyncio
+import json
+from logging import getLogger
+from typing import TYPE_CHECKING
+
+from packaging.utils import InvalidWheelFilename, parse_wheel_filename
+
+from jupyterlite_pyodide_lock.proxy_cache import MB, write_bytes_atomic
+
+from .cacher import CachingRemoteFiles
+
+if TYPE_CHECKING:
+    from logging import Logger
+    from pathlib import Path
+
+    from packaging.version import Version
+
+    from jupyterlite_pyodide_lock.proxy_cache import ProxyCache
+    from jupyterlite_pyodide_lock.store import WheelStore
+
+    from .upstream import UpstreamClient
+
+#: a fallback logger
+_log = getLogger(__name__)
+
+#: the URL and size of a wheel
+TCandidate = tuple[str, int]
+
+
+def get_pure_python_version(filename: str) -> Version | None:
+    """Get the version of a pure python wheel, or ``None`` for any other file."""
+    try:
+        _name, version, _build, tags = parse_wheel_filename(filename)
+    except InvalidWheelFilename:
+        return None
+    if all(tag.platform == "any" and tag.abi == "none" for tag in tags):
+        return version
+    return None
+
+
+def pick_likely_wheel(body: bytes) -> TCandidate | None:
+    """Pick the newest pure python wheel of a Warehouse or PEP 691 project document.
+
+    Final releases are preferred to pre-releases, and yanked files are ignored.
+    """
+    data = json.loads(body.decode("utf-8"))
+    if "releases" in data:
+        artifacts = [a for files in data["releases"].values() for a in files]
+    else:
+        artifacts = data.get("files", [])
+
+    best: tuple[tuple[bool, Version], TCandidate] | None = None
+    for artifact in artifacts:
+        version = get_pure_python_version(artifact.get("filename", ""))
+        if version is None or artifact.get("yanked") or not artifact.get("url"):
+            continue
+        rank = (not version.is_prerelease, version)
+        if best is None or rank > best[0]:
+            best = (rank, (artifact["url"], int(artifact.get("size") or 0)))
+
+    return None if best is None else best[1]
+
+
+class Prefetcher:
+    """Download likely wheels into a proxy's cache, within a byte budget.
+
+    A request for a wheel being prefetched waits for it, then is served from the
+    cache: as the download is speculative, it is never retried, and a failed
+    prefetch only means the wheel is fetched again, as usual.
+    """
+
+    root: Path
+    remote: str
+    client: UpstreamClient
+    cache: ProxyCache
+    wheel_store: WheelStore | None
+    max_bytes: int
+    log: Logger
+    #: bytes of wheels scheduled so far
+    spent: int
+    #: the number of prefetched wheels which were then requested
+    used: int
+    pending: dict[Path, asyncio.Future[bool]]
+
+    def __init__(  # noqa: PLR0913
+        self,
+        *,
+        root: Path,
+        remote: str,
+        client: UpstreamClient,
+        cache: ProxyCache,
+        max_bytes: int,
+        wheel_store: WheelStore | None = None,
+        log: Logger | None = None,
+    ) -> None:
+        """Initialize the prefetcher members."""
+        self.root = root
+        self.remote = remote.rstrip("/")
+        self.client = client
+        self.cache = cache
+        self.max_bytes = max_bytes
+        self.wheel_store = wheel_store
+        self.log = log or _log
+        self.spent = 0
+        self.used = 0
+        self.pending = {}
+
+    async def schedule(self, body: bytes) -> None:
+        """Start downloading the likely wheel of a project document, if worthwhile."""
+        loop = asyncio.get_running_loop()
+        try:
+            candidate = await loop.run_in_executor(None, pick_likely_wheel, body)
+        except (ValueError, TypeError, AttributeError) as err:  # pragma: no cover
+            self.log.debug("[prefetch] could not read project document: %s", err)
+            return
+
+        if candidate is None or not candidate[0].startswith(f"{self.remote}/"):
+            return
+
+        url, size = candidate
+        cache_path = self.root / url[len(self.remote) + 1 :].split("?")[0]
+        if (
+            cache_path in self.pending
+            or cache_path in CachingRemoteFiles.in_flight
+            or cache_path.exists()
+            or (self.wheel_store and self.wheel_store.find(file_name=cache_path.name))
+        ):
+            return
+
+        if not size or self.spent + size > self.max_bytes:
+            self.log.debug("[prefetch] over budget, skipping: %s", cache_path.name)
+            self.cache.record("prefetch_skipped")
+            return
+
+        self.spent += size
+        future = asyncio.ensure_future(self.download(url, cache_path))
+        self.pending[cache_path] = future
+        future.add_done_callback(lambda _: self.pending.pop(cache_path, None))
+
+    async def download(self, url: str, cache_path: Path) -> bool:
+        """Fetch a wheel into the cache, logging any failure."""
+        loop = asyncio.get_running_loop()
+        self.log.debug("[prefetch] fetching %s", url)
+        try:
+            res = await self.client.fetch(url)
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            await loop.run_in_executor(None, write_bytes_atomic, cache_path, res.body)
+        except Exception as err:  # noqa: BLE001
+            self.log.debug("[prefetch] failed %s: %s", url, err)
+            self.cache.record("prefetch_failed")
+            return False
+        self.cache.record("prefetched")
+        if self.wheel_store:
+            try:
+                await loop.run_in_executor(None, self.wheel_store.add, cache_path)
+            except OSError as err:  # pragma: no cover
+                self.log.warning("[prefetch] failed to store %s: %s", url, err)
+        return True
+
+    async def wait(self, cache_path: Path) -> None:
+        """Wait for any prefetch of a file to finish."""
+        future = self.pending.get(cache_path)
+        if future is None:
+            return
+        self.log.debug("[prefetch] waiting for %s", cache_path.name)
+        if await asyncio.shield(future):
+            self.used += 1
+
+    def close(self) -> None:
+        """Cancel any pending prefetches, and log the outcome."""
+        for future in [*self.pending.values()]:
+            future.cancel()
+        self.log.info(
+            "[prefetch] %.1fMB of %.1fMB budget scheduled; %s prefetched wheels used",
+            self.spent / MB,
+            self.max_bytes / MB,
+            self.used,
+        )
@@ -0,0 +1,106 @@
+"""A policy for retrying failed upstream fetches from ``tornado`` handlers."""
+# Copyright (c) jupyterlite-pyodide-lock contributors.
+# Distributed under the terms of the BSD-3-Clause License.
+
+from __future__ import annotations
+
+import random
+import threading
+from collections import Counter, defaultdict
+from typing import TYPE_CHECKING
+
+from tornado.httpclient import HTTPClientError
+from tornado.iostream import StreamClosedError
+from tornado.simple_httpclient import HTTPTimeoutError
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+#: the status ``tornado`` uses for connection errors and timeouts
+HTTP_STATUS_CONNECTION = 599
+
+#: response statuses which are worth retrying
+RETRY_STATUS = (408, 425, 429, 500, 502, 503, 504, HTTP_STATUS_CONNECTION)
+
+#: seconds of the first backoff, doubled for each retry
+RETRY_BASE_DELAY = 0.5
+
+
+class RetryPolicy:
+    """Decide whether, and when, to retry an upstream fetch.
+
+    The first attempt is always immediate. Later attempts wait a random delay, up
+    to an exponentially growing limit. Each host has a budget of retries for the
+    lifetime of the policy, so a failing upstream can't stall a whole solve.
+    """
+
+    retries: int
+    base_delay: float
+    max_delay: float
+    host_budget: int
+    retry_status: Sequence[int]
+    #: counts of attempts, retries and failures, by host
+    metrics: defaultdict[str, Counter[str]]
+    #: total seconds spent waiting to retry, by host
+    delays: defaultdict[str, float]
+
+    def __init__(
+        self,
+        *,
+        retries: int = 5,
+        base_delay: float = RETRY_BASE_DELAY,
+        max_delay: float = 10.0,
+        host_budget: int = 50,
+        retry_status: Sequence[int] = RETRY_STATUS,
+    ) -> None:
+        """Initialize the policy members."""
+        self.retries = max(1, retries)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.host_budget = host_budget
+        self.retry_status = retry_status
+        self.metrics = defaultdict(Counter)
+        self.delays = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def is_retryable(self, err: BaseException) -> bool:
+        """Get whether an error is a timeout, server error or dropped connection."""
+        if isinstance(err, HTTPClientError):
+            return err.code in self.retry_status
+        return isinstance(
+            err,
+            HTTPTimeoutError | StreamClosedError | ConnectionError | TimeoutError,
+        )
+
+    def get_delay(self, attempt: int) -> float:
+        """Get the seconds to wait before an attempt, with "full jitter"."""
+        if attempt < 1:
+            return 0.0
+        limit = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return random.uniform(0, limit)  # noqa: S311
+
+    def take_retry(self, host: str, delay: float) -> bool:
+        """Spend a retry from the budget of a host, if any remain."""
+        with self._lock:
+            host_metrics = self.metrics[host]
+            if host_metrics["retries"] >= self.host_budget:
+                host_metrics["exhausted"] += 1
+                return False
+            host_metrics["retries"] += 1
+            self.delays[host] += delay
+            return True
+
+    def record(self, host: str, metric: str) -> None:
+        """Count an event for a host."""
+        with self._lock:
+            self.metrics[host][metric] += 1
+
+    def summary(self) -> str:
+        """Describe the attempts, retries, failures and delays for each host."""
+        with self._lock:
+            return "; ".join(
+                f"{host}: "
+                + ", ".join(f"{k} {v}" for k, v in sorted(counts.items()))
+                + f", delay {self.delays[host]:.2f}s"
+                for host, counts in sorted(self.metrics.items())
+            )
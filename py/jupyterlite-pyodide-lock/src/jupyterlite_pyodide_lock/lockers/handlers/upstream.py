@@ -0,0 +1,191 @@
+"""A pooled ``tornado`` HTTP client, shared by all proxies of a solve."""
+# Copyright (c) jupyterlite-pyodide-lock contributors.
+# Distributed under the terms of the BSD-3-Clause License.
+
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import urllib.parse
+from http import HTTPStatus
+from io import BytesIO
+from typing import TYPE_CHECKING, Any
+
+from tornado.httpclient import HTTPClientError, HTTPRequest, HTTPResponse
+from tornado.httputil import HTTPHeaders
+
+if TYPE_CHECKING:
+    from logging import Logger
+
+    from tornado.httpclient import AsyncHTTPClient
+
+    from jupyterlite_pyodide_lock.cassette import Cassette
+
+#: the engine which keeps connections alive, if ``pycurl`` is installed
+ENGINE_CURL = "curl"
+
+#: the engine which ships with ``tornado``, opening a new connection for each fetch
+ENGINE_SIMPLE = "simple"
+
+#: pick the best available engine
+ENGINE_AUTO = "auto"
+
+ENGINES = [ENGINE_AUTO, ENGINE_CURL, ENGINE_SIMPLE]
+
+#: request headers which could yield a response without a body to record
+CONDITIONAL_HEADERS = {"if-none-match", "if-modified-since"}
+
+#: upstream errors which are recorded, as they are part of a normal solve
+RECORDED_ERRORS = {HTTPStatus.NOT_FOUND, HTTPStatus.GONE}
+
+
+def get_engine(engine: str) -> str:
+    """Resolve the ``auto`` engine to ``curl``, if available, or ``simple``."""
+    if engine != ENGINE_AUTO:
+        return engine
+    if importlib.util.find_spec("pycurl") is None:
+        return ENGINE_SIMPLE
+    return ENGINE_CURL
+
+
+class UpstreamClient:
+    """Fetch upstream URLs with one client, limiting concurrent fetches per host.
+
+    A ``curl`` client keeps connections alive between fetches, so many requests to
+    the same host only pay for one TLS handshake per connection.
+    """
+
+    engine: str
+    max_clients: int
+    max_per_host: int
+    client: AsyncHTTPClient
+    _host_limits: dict[str, asyncio.Semaphore]
+
+    def __init__(
+        self,
+        *,
+        engine: str = ENGINE_AUTO,
+        max_clients: int = 32,
+        max_per_host: int = 8,
+        log: Logger | None = None,
+    ) -> None:
+        """Initialize the client members."""
+        self.engine = get_engine(engine)
+        self.max_clients = max(1, max_clients)
+        self.max_per_host = max(1, max_per_host)
+        self._host_limits = {}
+        self.client = self.make_client()
+        if log:
+            log.debug(
+                "[upstream] %s client, %s connections, %s per host",
+                self.engine,
+                self.max_clients,
+                self.max_per_host,
+            )
+
+    def make_client(self) -> AsyncHTTPClient:
+        """Create a client which isn't shared with the rest of the process."""
+        if self.engine == ENGINE_CURL:
+            from tornado.curl_httpclient import CurlAsyncHTTPClient
+
+            return CurlAsyncHTTPClient(
+                force_instance=True, max_clients=self.max_clients
+            )
+
+        from tornado.simple_httpclient import SimpleAsyncHTTPClient
+
+        return SimpleAsyncHTTPClient(force_instance=True, max_clients=self.max_clients)
+
+    async def fetch(self, url: str, **kwargs: Any) -> HTTPResponse:
+        """Fetch a URL, waiting for a free connection to its host."""
+        host = urllib.parse.urlparse(url).netloc
+        limit = self._host_limits.get(host)
+        if limit is None:
+            limit = self._host_limits[host] = asyncio.Semaphore(self.max_per_host)
+        async with limit:
+            return await self.client.fetch(url, **kwargs)
+
+    def close(self) -> None:
+        """Close the client, and any open connections."""
+        self.client.close()
+
+
+class CassetteClient(UpstreamClient):
+    """Record upstream responses to a ``Cassette``, or replay them without fetching.
+
+    While recording, conditional request headers are dropped, so every response
+    has a body. Streamed responses are recorded as their chunks arrive.
+    """
+
+    cassette: Cassette
+
+    def __init__(self, *, cassette: Cassette, **kwargs: Any) -> None:
+        """Initialize the client members."""
+        super().__init__(**kwargs)
+        self.cassette = cassette
+
+    async def fetch(self, url: str, **kwargs: Any) -> HTTPResponse:
+        """Replay or record a URL."""
+        loop = asyncio.get_running_loop()
+
+        if self.cassette.replaying:
+            played = await loop.run_in_executor(None, self.cassette.play, url)
+            return self.replay(url, played, **kwargs)
+
+        headers = {
+            k: v
+            for k, v in (kwargs.pop("headers", None) or {}).items()
+            if k.lower() not in CONDITIONAL_HEADERS
+        }
+        streaming_callback = kwargs.get("streaming_callback")
+        chunks: list[bytes] = []
+        if streaming_callback:
+
+            def _tee(chunk: bytes) -> None:
+                chunks.append(chunk)
+                streaming_callback(chunk)
+
+            kwargs["streaming_callback"] = _tee
+
+        try:
+            res = await super().fetch(url, headers=headers, **kwargs)
+        except HTTPClientError as err:
+            if err.code in RECORDED_ERRORS:
+                await loop.run_in_executor(
+                    None, self.cassette.record, url, err.code, {}, b""
+                )
+            raise
+
+        body = b"".join(chunks) if streaming_callback else res.body
+        await loop.run_in_executor(
+            None, self.cassette.record, url, res.code, dict(res.headers), body
+        )
+        return res
+
+    def replay(
+        self, url: str, played: tuple[int, dict[str, str], bytes] | None, **kwargs: Any
+    ) -> HTTPResponse:
+        """Build a response from a recording, calling any streaming callbacks."""
+        if played is None:
+            self.cassette.log.warning("[cassette] not recorded: %s", url)
+            raise HTTPClientError(HTTPStatus.NOT_FOUND, "not in cassette")
+
+        code, headers, body = played
+        request = HTTPRequest(url)
+        if code >= HTTPStatus.BAD_REQUEST:
+            raise HTTPClientError(code, response=HTTPResponse(request, code))
+
+        header_callback = kwargs.get("header_callback")
+        streaming_callback = kwargs.get("streaming_callback")
+        if header_callback:
+            header_callback(f"HTTP/1.1 {code} {HTTPStatus(code).phrase}\r\n")
+            for name, value in [*headers.items(), ("Content-Length", len(body))]:
+                header_callback(f"{name}: {value}\r\n")
+            header_callback("\r\n")
+        if streaming_callback:
+            streaming_callback(body)
+            body = b""
+
+        return HTTPResponse(
+            request, code, headers=HTTPHeaders(headers), buffer=BytesIO(body)
+        )
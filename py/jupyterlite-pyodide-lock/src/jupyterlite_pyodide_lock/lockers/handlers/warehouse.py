@@ -0,0 +1,185 @@
+"""Slim Warehouse JSON to the releases and wheels ``micropip`` can use."""
+# Copyright (c) jupyterlite-pyodide-lock contributors.
+# Distributed under the terms of the BSD-3-Clause License.
+
+from __future__ import annotations
+
+import json
+from hashlib import sha256
+from logging import getLogger
+from typing import TYPE_CHECKING, Any
+
+from jupyterlite_core.constants import JSON_FMT
+from packaging.requirements import InvalidRequirement, Requirement
+from packaging.utils import (
+    InvalidWheelFilename,
+    canonicalize_name,
+    parse_wheel_filename,
+)
+from packaging.version import InvalidVersion, Version
+
+from jupyterlite_pyodide_lock.constants import WAREHOUSE_UPLOAD_DATE
+from jupyterlite_pyodide_lock.utils import (
+    epoch_to_warehouse_date,
+    warehouse_date_to_epoch,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+    from logging import Logger
+
+    from packaging.specifiers import SpecifierSet
+
+#: a fallback logger
+_log = getLogger(__name__)
+
+#: prefixes of wheel platform tags which can be installed in the browser
+BROWSER_PLATFORMS = ("any", "emscripten_", "pyodide_")
+
+
+def is_browser_wheel(filename: str) -> bool:
+    """Get whether a file is a pure python, or emscripten/pyodide, wheel."""
+    try:
+        _name, _version, _build, tags = parse_wheel_filename(filename)
+    except InvalidWheelFilename:
+        return False
+    return any(tag.platform.startswith(BROWSER_PLATFORMS) for tag in tags)
+
+
+def get_artifact_digests(body: bytes) -> dict[str, str]:
+    """Get the ``sha256`` of each artifact URL in a Warehouse or PEP 691 document."""
+    data = json.loads(body.decode("utf-8"))
+    if "releases" in data:
+        artifacts = [a for files in data["releases"].values() for a in files]
+        artifacts += data.get("urls", [])
+        key = "digests"
+    else:
+        artifacts = data.get("files", [])
+        key = "hashes"
+    digests = {}
+    for artifact in artifacts:
+        url = artifact.get("url", "").split("#")[0]
+        digest = (artifact.get(key) or {}).get("sha256")
+        if url and digest:
+            digests[url] = digest
+    return digests
+
+
+class WarehouseSlimmer:
+    """Filter a Warehouse project document in a single parse and serialize pass.
+
+    Releases with any artifact newer than the ``lock_date_epoch`` are removed. If
+    ``slim``, only wheels installable in the browser are kept. If a project is named
+    in ``constraints``, only releases in their range are kept. Releases left with
+    no artifacts are removed.
+
+    Instances only hold simple values, so they can be sent to another process.
+    """
+
+    lock_date_epoch: int
+    slim: bool
+    constraints: dict[str, str]
+    log: Logger
+
+    def __init__(
+        self,
+        *,
+        lock_date_epoch: int | None = None,
+        slim: bool = True,
+        constraints: Sequence[str] = (),
+        log: Logger | None = None,
+    ) -> None:
+        """Initialize the filter settings."""
+        self.lock_date_epoch = lock_date_epoch or 0
+        self.slim = slim
+        self.constraints = {}
+        for spec in constraints:
+            try:
+                req = Requirement(spec)
+            except InvalidRequirement:  # pragma: no cover
+                continue
+            name = canonicalize_name(req.name)
+            self.constraints[name] = ",".join(
+                filter(None, [self.constraints.get(name, ""), str(req.specifier)])
+            )
+        self.log = log or _log
+
+    @property
+    def enabled(self) -> bool:
+        """Whether the filter changes anything."""
+        return bool(self.lock_date_epoch or self.slim or self.constraints)
+
+    @property
+    def key(self) -> str:
+        """A digest of the settings, to cache filtered documents."""
+        settings = {
+            "lock_date_epoch": self.lock_date_epoch,
+            "slim": self.slim,
+            "constraints": self.constraints,
+        }
+        return sha256(json.dumps(settings, sort_keys=True).encode()).hexdigest()
+
+    def __call__(self, json_bytes: bytes) -> bytes:
+        """Filter a Warehouse project document."""
+        project_data = json.loads(json_bytes.decode("utf-8"))
+        name = canonicalize_name(project_data.get("info", {}).get("name", ""))
+        specifier = self.get_specifier(name)
+        releases = {}
+        for release, artifacts in project_data.get("releases", {}).items():
+            kept = self.filter_release(release, artifacts, specifier)
+            if kept:
+                releases[release] = kept
+        project_data["releases"] = releases
+        if "urls" in project_data:
+            kept_names = {
+                a["filename"] for artifacts in releases.values() for a in artifacts
+            }
+            project_data["urls"] = [
+                a for a in project_data["urls"] if a.get("filename") in kept_names
+            ]
+        return json.dumps(project_data, **JSON_FMT).encode("utf-8")
+
+    def get_specifier(self, name: str) -> SpecifierSet | None:
+        """Get the constraints of a project, if any."""
+        if name not in self.constraints:
+            return None
+        return Requirement(f"{name}{self.constraints[name]}").specifier
+
+    def filter_release(
+        self,
+        release: str,
+        artifacts: list[dict[str, Any]],
+        specifier: SpecifierSet | None,
+    ) -> list[dict[str, Any]]:
+        """Get the usable artifacts of a release, if it should be kept."""
+        if not artifacts:
+            return []
+        if specifier is not None:
+            try:
+                if not specifier.contains(Version(release), prereleases=True):
+                    return []
+            except InvalidVersion:
+                return []
+        if self.lock_date_epoch and not all(map(self.uploaded_before, artifacts)):
+            return []
+        if self.slim:
+            return [a for a in artifacts if is_browser_wheel(a.get("filename", ""))]
+        return artifacts
+
+    def uploaded_before(self, artifact: dict[str, Any]) -> bool:
+        """Check that an artifact was uploaded before the lock date."""
+        upload_iso8601 = artifact[WAREHOUSE_UPLOAD_DATE]
+        upload_epoch = warehouse_date_to_epoch(upload_iso8601)
+
+        if upload_epoch <= self.lock_date_epoch:
+            return True
+
+        self.log.warning(
+            "[tornado] [lock-date] %s uploaded %s (%s), newer than %s (%s)",
+            artifact["filename"],
+            upload_iso8601,
+            upload_epoch,
+            epoch_to_warehouse_date(self.lock_date_epoch),
+            self.lock_date_epoch,
+        )
+        return False
@@ -0,0 +1,219 @@
+"""Serve folders of local wheels as a Warehouse JSON or PEP 691 package index."""
+# Copyright (c) jupyterlite-pyodide-lock contributors.
+# Distributed under the terms of the BSD-3-Clause License.
+
+from __future__ import annotations
+
+import asyncio
+import json
+from datetime import datetime, timezone
+from http import HTTPStatus
+from logging import getLogger
+from typing import TYPE_CHECKING, Any
+
+from jupyterlite_core.constants import JSON_FMT
+from packaging.utils import (
+    InvalidWheelFilename,
+    canonicalize_name,
+    parse_wheel_filename,
+)
+from tornado.web import HTTPError, RequestHandler
+
+from jupyterlite_pyodide_lock.constants import (
+    INDEX_MODE_SIMPLE,
+    SIMPLE_JSON_MIME,
+    SIMPLE_UPLOAD_TIME,
+    WAREHOUSE_UPLOAD_DATE,
+    WAREHOUSE_UPLOAD_FORMAT,
+)
+from jupyterlite_pyodide_lock.hashing import DigestMemo
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+    from logging import Logger
+    from pathlib import Path
+
+    from packaging.version import Version
+    from traitlets.config import Config
+
+#: a fallback logger
+_log = getLogger(__name__)
+
+#: the PEP 691 version of the simple index documents
+SIMPLE_API_VERSION = "1.1"
+
+
+def find_wheelhouse_wheels(
+    config: Config, locker_class: type, lite_dir: Path
+) -> list[Path]:
+    """Find the wheels in any ``wheelhouses`` configured for a locker class.
+
+    As for ``traitlets``, the config of the most specific class is used.
+    """
+    wheelhouses: list[str] = []
+    for cls in reversed(locker_class.__mro__):
+        if cls.__name__ in config:
+            wheelhouses = [*config[cls.__name__].get("wheelhouses", wheelhouses)]
+
+    wheels: list[Path] = []
+    for wheelhouse in wheelhouses:
+        wheel_dir = (lite_dir / wheelhouse).resolve()
+        if wheel_dir.is_dir():
+            wheels += sorted(wheel_dir.rglob("*.whl"))
+    return wheels
+
+
+class Wheelhouse:
+    """An index of the wheels found in some local folders.
+
+    Wheels are found once, when created. Each is served from the numbered folder
+    in which it was found, as ``{files_url}/{index}/{relative path}``. If the same
+    file name, ignoring case, is in more than one folder, the first is used.
+    """
+
+    dirs: list[Path]
+    log: Logger
+    digests: DigestMemo
+    #: wheel paths, and their folder index, by canonical project name and version
+    projects: dict[str, dict[Version, list[tuple[int, Path]]]]
+
+    def __init__(
+        self,
+        dirs: Sequence[Path],
+        *,
+        digests: DigestMemo | None = None,
+        log: Logger | None = None,
+    ) -> None:
+        """Initialize the index, finding wheels in all folders."""
+        self.dirs = [*dirs]
+        self.log = log or _log
+        self.digests = digests or DigestMemo(log=self.log)
+        self.projects = {}
+        self.find_wheels()
+
+    def find_wheels(self) -> None:
+        """Find the wheels in each folder, ignoring invalid file names."""
+        seen: set[str] = set()
+        for index, wheel_dir in enumerate(self.dirs):
+            if not wheel_dir.is_dir():
+                self.log.warning("[wheelhouse] not a folder: %s", wheel_dir)
+                continue
+            for path in sorted(wheel_dir.rglob("*.whl")):
+                if path.name.lower() in seen:
+                    continue
+                try:
+                    name, version, _build, _tags = parse_wheel_filename(path.name)
+                except InvalidWheelFilename:  # pragma: no cover
+                    self.log.warning("[wheelhouse] ignoring %s", path)
+                    continue
+                seen.add(path.name.lower())
+                releases = self.projects.setdefault(canonicalize_name(name), {})
+                releases.setdefault(version, []).append((index, path))
+        self.log.info(
+            "[wheelhouse] %s wheels of %s projects in %s folders",
+            len(seen),
+            len(self.projects),
+            len(self.dirs),
+        )
+
+    def get_artifacts(
+        self, name: str, files_url: str
+    ) -> dict[str, list[dict[str, Any]]]:
+        """Get the details of each wheel of a project, by version."""
+        releases = self.projects.get(canonicalize_name(name), {})
+        return {
+            str(version): [
+                self.get_artifact(index, path, files_url)
+                for index, path in releases[version]
+            ]
+            for version in sorted(releases)
+        }
+
+    def get_artifact(self, index: int, path: Path, files_url: str) -> dict[str, Any]:
+        """Get the details of a wheel, named like the Warehouse JSON API."""
+        stat = path.stat()
+        uploaded = datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc)
+        rel = path.relative_to(self.dirs[index]).as_posix()
+        return {
+            "filename": path.name,
+            "url": f"{files_url}/{index}/{rel}",
+            "digests": {"sha256": self.digests.sha256(path)},
+            "packagetype": "bdist_wheel",
+            "requires_python": None,
+            "size": stat.st_size,
+            WAREHOUSE_UPLOAD_DATE: uploaded.strftime(WAREHOUSE_UPLOAD_FORMAT),
+            "yanked": False,
+        }
+
+    def get_warehouse_json(self, name: str, files_url: str) -> dict[str, Any] | None:
+        """Get a Warehouse JSON API project document, if the project has wheels."""
+        releases = self.get_artifacts(name, files_url)
+        if not releases:
+            return None
+        latest = [*releases][-1]
+        return {
+            "info": {"name": canonicalize_name(name), "version": latest},
+            "releases": releases,
+            "urls": releases[latest],
+        }
+
+    def get_simple_json(self, name: str, files_url: str) -> dict[str, Any] | None:
+        """Get a PEP 691 project document, if the project has wheels."""
+        releases = self.get_artifacts(name, files_url)
+        if not releases:
+            return None
+        return {
+            "meta": {"api-version": SIMPLE_API_VERSION},
+            "name": canonicalize_name(name),
+            "versions": [*releases],
+            "files": [
+                {
+                    "filename": artifact["filename"],
+                    "url": artifact["url"],
+                    "hashes": artifact["digests"],
+                    "size": artifact["size"],
+                    SIMPLE_UPLOAD_TIME: artifact[WAREHOUSE_UPLOAD_DATE],
+                }
+                for artifacts in releases.values()
+                for artifact in artifacts
+            ],
+        }
+
+
+class WheelhouseIndex(RequestHandler):
+    """Serve the project documents of a ``Wheelhouse``, or ``404`` if unknown."""
+
+    wheelhouse: Wheelhouse
+    files_url: str
+    index_mode: str
+    log: Logger
+
+    def initialize(self, *args: Any, **kwargs: Any) -> None:
+        """Initialize handler instance members."""
+        wheelhouse: Wheelhouse = kwargs.pop("wheelhouse")
+        files_url: str = kwargs.pop("files_url")
+        index_mode: str = kwargs.pop("index_mode")
+        log: Logger = kwargs.pop("log")
+        super().initialize(*args, **kwargs)
+        self.wheelhouse = wheelhouse
+        self.files_url = files_url
+        self.index_mode = index_mode
+        self.log = log
+
+    async def get(self, name: str) -> None:
+        """Handle a GET request for a project."""
+        if self.index_mode == INDEX_MODE_SIMPLE:
+            get_document = self.wheelhouse.get_simple_json
+            content_type = SIMPLE_JSON_MIME
+        else:
+            get_document = self.wheelhouse.get_warehouse_json
+            content_type = "application/json"
+        # new wheels are hashed, so read them off the event loop
+        loop = asyncio.get_running_loop()
+        data = await loop.run_in_executor(None, get_document, name, self.files_url)
+        if data is None:
+            self.log.debug("[wheelhouse] not found: %s", name)
+            raise HTTPError(HTTPStatus.NOT_FOUND)
+        self.log.debug("[wheelhouse] found: %s", name)
+        self.set_header("Content-Type", content_type)
+        await self.finish(json.dumps(data, **JSON_FMT))
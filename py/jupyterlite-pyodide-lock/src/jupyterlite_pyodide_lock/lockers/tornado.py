@@ -4,10 +4,15 @@
 
 from __future__ import annotations
 
+import asyncio
 import atexit
 import json
+import os
 import shutil
 import tempfile
+import time
+from collections import deque
+from concurrent.futures import Executor
 from pathlib import Path
 from typing import (
     TYPE_CHECKING,
@@ -16,21 +21,49 @@ from typing import (
 
 from jupyterlite_core.constants import JSON_FMT, UTF8
 from jupyterlite_core.trait_types import TypedTuple
-from traitlets import Bool, Dict, Instance, Int, Tuple, Type, Unicode, default
+from traitlets import (
+    Bool,
+    Dict,
+    Enum,
+    Float,
+    Instance,
+    Int,
+    Tuple,
+    Type,
+    Unicode,
+    default,
+)
 
+from jupyterlite_pyodide_lock.catalog import add_wheels_to_spec
 from jupyterlite_pyodide_lock.constants import (
+    BROWSER_LOCKER_CACHE,
+    ENV_VAR_STALL_TIMEOUT,
+    INDEX_MODE_JSON,
+    INDEX_MODE_SIMPLE,
+    INDEX_MODES,
     LOCALHOST,
     LOCK_HTML,
+    OPTION_LOCK_FILE_URL,
     PROXY,
     PYODIDE_LOCK,
+    PYODIDE_LOCK_PROXIED,
     PYODIDE_LOCK_STEM,
+    PYPI_SIMPLE_URL,
+    WHEELHOUSE,
 )
+from jupyterlite_pyodide_lock.proxy_cache import ProxyCache
 from jupyterlite_pyodide_lock.utils import get_unused_port
 
 from ._base import MicropipLocker
 from .handlers import make_handlers
+from .handlers.offload import EXECUTOR_THREAD, EXECUTORS, make_executor
+from .handlers.prefetch import Prefetcher
+from .handlers.retry import RetryPolicy
+from .handlers.upstream import ENGINE_AUTO, ENGINES, CassetteClient, UpstreamClient
+from .handlers.wheelhouse import Wheelhouse
 
 if TYPE_CHECKING:
+    from collections.abc import Awaitable
     from logging import Logger
 
     from tornado.httpserver import HTTPServer
@@ -42,6 +75,12 @@ if TYPE_CHECKING:
 #: a type for tornado rules
 THandler = tuple[str, type, dict[str, Any]]
 
+#: the number of recent activities to report if a solve stalls
+RECENT_ACTIVITY = 10
+
+#: the number of heartbeats the browser sends in each ``stall_timeout``
+HEARTBEATS_PER_STALL = 3
+
 
 class TornadoLocker(MicropipLocker):
     """Start a web server and a browser (somehow) to build a ``pyodide-lock.json``.
@@ -67,6 +106,12 @@ class TornadoLocker(MicropipLocker):
 
         * ``/_proxy/pypi``
         * ``/_proxy/pythonhosted``
+        * ``/_proxy/pyodide``, if ``proxy_pyodide_cdn``
+
+    GET of an index of local ``wheelhouses``, and their wheels, if configured:
+
+        * ``/_wheelhouse/pypi``
+        * ``/_wheelhouse/files``
 
     If an ``{output_dir}/static/pyodide`` distribution is found, these will also
     be proxied from the configured URL.
@@ -80,6 +125,128 @@ class TornadoLocker(MicropipLocker):
     tornado_settings = Dict(help="override settings used by the tornado server").tag(
         config=True,
     )
+    retries = Int(5, help="attempts to fetch each proxied file").tag(config=True)
+    retry_max_delay = Float(
+        10.0, help="the most seconds to wait before retrying a proxied fetch"
+    ).tag(config=True)
+    retry_host_budget = Int(
+        50, help="the most retries of proxied fetches from each host, per solve"
+    ).tag(config=True)
+    http_client_engine = Enum(
+        ENGINES,
+        ENGINE_AUTO,
+        help=(
+            "the client for proxied fetches: ``curl`` keeps connections alive, and"
+            " is used by ``auto`` if ``pycurl`` is installed"
+        ),
+    ).tag(config=True)
+    max_clients = Int(32, help="the most concurrent proxied fetches").tag(config=True)
+    max_per_host = Int(
+        8, help="the most concurrent proxied fetches from each host"
+    ).tag(config=True)
+    rewrite_executor = Enum(
+        EXECUTORS,
+        EXECUTOR_THREAD,
+        help=(
+            "workers for rewriting proxied documents: ``process`` only runs"
+            " picklable transforms, like slimming PyPI JSON, in other processes"
+        ),
+    ).tag(config=True)
+    rewrite_workers = Int(
+        0, help="the most workers for rewriting proxied documents; 0 for the default"
+    ).tag(config=True)
+    index_mode = Enum(
+        INDEX_MODES,
+        INDEX_MODE_JSON,
+        help=(
+            "the package metadata for micropip: the Warehouse ``json`` API, or the"
+            " smaller PEP 691 ``simple`` JSON API"
+        ),
+    ).tag(config=True, cassette=True)
+    pypi_simple_url = Unicode(
+        PYPI_SIMPLE_URL, help="remote URL for a PEP 691 Simple JSON API"
+    ).tag(config=True, cassette=True)
+    json_max_age = Float(
+        300.0,
+        help=(
+            "seconds to use cached PyPI JSON before revalidating it upstream; JSON"
+            " validated after ``lock_date_epoch`` is never revalidated"
+        ),
+    ).tag(config=True)
+    cache_max_bytes = Int(
+        2 * 1024**3,
+        help=(
+            "the most bytes of proxied files to keep between solves, evicting the"
+            " least recently used; 0 disables"
+        ),
+    ).tag(config=True)
+    cache_compress_min_bytes = Int(
+        64 * 1024,
+        help="the least bytes of cached PyPI JSON to store compressed; 0 disables",
+    ).tag(config=True)
+    cache_memory_bytes = Int(
+        32 * 1024**2, help="the most bytes of PyPI JSON to also keep in memory"
+    ).tag(config=True)
+    json_negative_ttl = Float(
+        10 * 60,
+        help=(
+            "seconds to remember PyPI JSON which was not found upstream, before"
+            " asking again; 0 disables"
+        ),
+    ).tag(config=True)
+    skip_locked_json = Bool(
+        default_value=False,
+        help=(
+            "answer 'not found' for PyPI JSON of packages in the bootstrap"
+            " ``pyodide-lock.json``, unless named in ``specs``"
+        ),
+    ).tag(config=True)
+    wheelhouses = TypedTuple(
+        Unicode(),
+        help=(
+            "local folders of wheels to serve as a package index, relative to"
+            " ``lite_dir``: projects found here are not fetched from the remote index"
+        ),
+    ).tag(config=True, cassette=True)
+    wheelhouse_only = Bool(
+        default_value=False,
+        help="only use the ``wheelhouses``, never fetching from the remote index",
+    ).tag(config=True, cassette=True)
+    slim_json = Bool(
+        default_value=True,
+        help=(
+            "only pass releases with pure python or emscripten/pyodide wheels in"
+            " PyPI JSON to the browser"
+        ),
+    ).tag(config=True, cassette=True)
+    slim_json_constraints = Bool(
+        default_value=False,
+        help="only pass releases within ``constraints`` in PyPI JSON to the browser",
+    ).tag(config=True, cassette=True)
+    proxy_pyodide_cdn = Bool(
+        default_value=False,
+        help=(
+            "fetch bootstrap packages missing from ``static/pyodide`` through a"
+            " caching proxy of ``pyodide_cdn_url``, then copy them next to the lockfile"
+        ),
+    ).tag(config=True, cassette=True)
+    prefetch_max_bytes = Int(
+        0,
+        help=(
+            "the most bytes of wheels to fetch before the browser asks for them,"
+            " guessed from PyPI JSON; 0 disables"
+        ),
+    ).tag(config=True)
+    stream_proxies = Bool(
+        default_value=True,
+        help="forward proxied files without rewrites to the browser while caching",
+    ).tag(config=True)
+    stall_timeout = Float(
+        help=(
+            "seconds without any requests, browser logs or heartbeats, or proxy"
+            " fetches before abandoning a solve; 0 disables"
+        )
+    ).tag(config=True)
 
     # runtime
     _context: dict[str, Any] = Dict()
@@ -89,10 +256,25 @@ class TornadoLocker(MicropipLocker):
     )
     _handlers: tuple[THandler, ...] = TypedTuple(Tuple(Unicode(), Type(), Dict()))
     _solve_halted: bool = Bool(default_value=False)
+    _solve_event = Instance(asyncio.Event)
+    _solve_stalled = Bool(default_value=False)
+    _last_activity = Float()
+    _pending_fetches = Int(0)
+    _recent_activity = Instance(deque, kw={"maxlen": RECENT_ACTIVITY})
+    _retry_policy = Instance(RetryPolicy)
+    _upstream_client = Instance(UpstreamClient)
+    _proxy_cache = Instance(ProxyCache)
+    _rewrite_executor = Instance(Executor)
+    _wheelhouse = Instance(Wheelhouse, allow_none=True)
+    _prefetcher = Instance(Prefetcher, allow_none=True)
 
     # API methods
     async def resolve(self) -> bool | None:
-        """Launch a web application, then delegate to actually run the solve."""
+        """Launch a web application, then delegate to actually run the solve.
+
+        Once the solve is halted, the client is stopped in a thread while the
+        solved packages are collected.
+        """
         self.preflight()
         self.log.info("Starting server at:   %s", self.base_url)
 
@@ -103,20 +285,101 @@ class TornadoLocker(MicropipLocker):
         try:
             server.listen(self.port, self.host)
             await self.fetch()
-        finally:
+        except BaseException:
             self.cleanup()
+            raise
+        finally:
+            self.log.info("[tornado] proxy fetches: %s", self._retry_policy.summary())
 
-        if not self.lockfile_cache.exists():
-            self.log.error("No lockfile was created at %s", self.lockfile)
-            return False
+        teardown = asyncio.ensure_future(self.cleanup_async())
 
-        found = self.collect()
-        self.fix_lock(found)
+        try:
+            if not self.lockfile_cache.exists():
+                self.log.error("No lockfile was created at %s", self.lockfile)
+                return False
+
+            found = self.collect()
+            self.fix_lock(found)
+        finally:
+            await teardown
+            self.log.info("[tornado] proxy cache: %s", self._proxy_cache.prune())
+            if self._cassette:
+                self._cassette.save()
+                self._cassette.close()
 
         return True
 
+    def halt_solve(self) -> None:
+        """Signal that the solve is finished, successfully or not."""
+        self._solve_halted = True
+        self._solve_event.set()
+
+    async def wait_for_solve(self, *others: Awaitable[Any]) -> None:
+        """Wait until the solve is halted or stalls, or any of the ``others`` finish."""
+        self.note_activity("waiting for solve")
+        if self.stall_timeout > 0:
+            others = (*others, self.watch_for_stall())
+        waiters = {
+            asyncio.ensure_future(self._solve_event.wait()),
+            *map(asyncio.ensure_future, others),
+        }
+        try:
+            await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.cancel()
+
+    def note_activity(self, reason: str, pending: int = 0) -> None:
+        """Record progress, and any change in the number of pending proxy fetches.
+
+        A reason repeated by consecutive activities, like a heartbeat, is kept once.
+        """
+        self._last_activity = time.monotonic()
+        self._pending_fetches += pending
+        recent = self._recent_activity
+        if not recent or recent[-1] != reason:
+            recent.append(reason)
+
+    async def watch_for_stall(self) -> None:
+        """Return once nothing has happened for ``stall_timeout`` seconds."""
+        window = self.stall_timeout
+        while True:
+            idle = time.monotonic() - self._last_activity
+            if self._pending_fetches > 0:
+                idle = 0
+            if idle >= window:
+                break
+            await asyncio.sleep(window - idle)
+
+        self._solve_stalled = True
+        self.log.error(
+            "[tornado] solve stalled: no progress for %ss, last activity:\n%s",
+            window,
+            "\n".join(f"\t{reason}" for reason in self._recent_activity),
+        )
+
     def cleanup(self) -> None:
         """Handle any cleanup tasks, as needed by specific implementations."""
+        self.cleanup_client()
+        self.cleanup_server()
+
+    async def cleanup_async(self) -> None:
+        """Stop the server, then stop the client without blocking the event loop."""
+        self.cleanup_server()
+        await asyncio.get_running_loop().run_in_executor(None, self.cleanup_client)
+
+    def cleanup_client(self) -> None:
+        """Stop the client of the solve, which may be called from a thread."""
+
+    def cleanup_server(self) -> None:
+        """Stop the web server, and close the shared proxy client if it was created."""
+        if self.trait_has_value("_upstream_client"):
+            self._upstream_client.close()
+        if self.trait_has_value("_prefetcher") and self._prefetcher:
+            self._prefetcher.close()
+        if self.trait_has_value("_rewrite_executor"):
+            self._rewrite_executor.shutdown(wait=False, cancel_futures=True)
         if self._http_server:
             self.log.debug("[tornado] stopping http server")
             self._http_server.stop()
@@ -128,7 +391,7 @@ class TornadoLocker(MicropipLocker):
     @property
     def cache_dir(self) -> Path:
         """The location of cached files discovered during the solve."""
-        return self.parent.manager.cache_dir / "browser-locker"
+        return self.parent.manager.cache_dir / BROWSER_LOCKER_CACHE
 
     @property
     def lockfile_cache(self) -> Path:
@@ -149,17 +412,18 @@ class TornadoLocker(MicropipLocker):
     def preflight(self) -> None:
         """Prepare the cache.
 
-        The PyPI cache is removed before each build, as the JSON cache is
-        invalidated by both references to the temporary ``files.pythonhosted.org``
-        proxy and a potential change to ``lock_date_epoch``.
+        The PyPI cache is kept between builds, as it only contains upstream JSON:
+        references to the temporary ``files.pythonhosted.org`` proxy and the
+        ``lock_date_epoch`` are applied as it is served. A recorded solve starts
+        from an empty cache, so every upstream response is in the cassette.
         """
-        pypi_cache = self.cache_dir / "pypi"
-        if pypi_cache.exists():
-            self.log.debug("[tornado] clearing pypi cache %s", pypi_cache)
-            shutil.rmtree(pypi_cache)
-
         if self.lockfile_cache.exists():
             self.lockfile_cache.unlink()
+        if self._cassette and self._cassette.recording and self.cache_dir.exists():
+            self.log.info(
+                "[tornado] clearing proxy cache to record: %s", self.cache_dir
+            )
+            shutil.rmtree(self.cache_dir)
 
     def collect(self) -> dict[str, Path]:
         """Copy all packages in the cached lockfile to ``output_dir``, and fix lock."""
@@ -185,7 +449,10 @@ class TornadoLocker(MicropipLocker):
             return {}
 
         stem = file_name.replace(f"{self.base_url}/", "")
-        if stem.startswith(PROXY):
+        if stem.startswith(f"{WHEELHOUSE}/") and self._wheelhouse:
+            _prefix, _files, index, rel = stem.split("/", 3)
+            found = self._wheelhouse.dirs[int(index)] / rel
+        elif stem.startswith(PROXY):
             stem = stem.replace(f"{PROXY}/", "")
             found = self.cache_dir / stem
         else:
@@ -199,19 +466,15 @@ class TornadoLocker(MicropipLocker):
     def fix_lock(self, found: dict[str, Path]) -> None:
         """Fill in missing metadata from the ``micropip.freeze`` output."""
         from pyodide_lock import PyodideLockSpec
-        from pyodide_lock.utils import add_wheels_to_spec
 
         lockfile = self.parent.lockfile
         lock_dir = lockfile.parent
 
         with tempfile.TemporaryDirectory() as td:
-            tdp = Path(td)
-            tmp_lock = tdp / PYODIDE_LOCK
-            shutil.copy2(self.lockfile_cache, tmp_lock)
-            [shutil.copy2(path, tdp / path.name) for path in found.values()]
-            spec = PyodideLockSpec.from_json(tdp / PYODIDE_LOCK)
-            tmp_wheels = sorted(tdp.glob("*.whl"))
-            spec = add_wheels_to_spec(spec, tmp_wheels)
+            tmp_lock = Path(td) / PYODIDE_LOCK
+            spec = PyodideLockSpec.from_json(self.lockfile_cache)
+            wheels = sorted(found.values(), key=lambda path: path.name)
+            spec = add_wheels_to_spec(spec, wheels, self.parent.wheel_catalog)
             spec.to_json(tmp_lock)
             lock_json = json.loads(tmp_lock.read_text(**UTF8))
 
@@ -254,7 +517,7 @@ class TornadoLocker(MicropipLocker):
             else:
                 # copy to be sibling of lockfile, leaving name unchanged
                 dest = lock_dir / file_name
-                shutil.copy2(found_path, dest)
+                self.parent.install_wheel(found_path, dest)
                 new_file_name = f"../../static/{PYODIDE_LOCK_STEM}/{file_name}"
         else:
             new_file_name = f"{self.parent.pyodide_cdn_url}/{just_file_name}"
@@ -273,9 +536,11 @@ class TornadoLocker(MicropipLocker):
     @default("_web_app")
     def _default_web_app(self) -> Application:
         """Build the web application."""
-        from tornado.web import Application
+        from .handlers.activity import ActivityApplication
 
-        return Application(self._handlers, **self.tornado_settings)
+        return ActivityApplication(
+            self._handlers, activity=self.note_activity, **self.tornado_settings
+        )
 
     @default("tornado_settings")
     def _default_tornado_settings(self) -> dict[str, Any]:
@@ -291,6 +556,78 @@ class TornadoLocker(MicropipLocker):
 
         return HTTPServer(self._web_app)
 
+    @default("_retry_policy")
+    def _default_retry_policy(self) -> RetryPolicy:
+        return RetryPolicy(
+            retries=self.retries,
+            max_delay=self.retry_max_delay,
+            host_budget=self.retry_host_budget,
+        )
+
+    @default("_upstream_client")
+    def _default_upstream_client(self) -> UpstreamClient:
+        if self._cassette:
+            return CassetteClient(
+                cassette=self._cassette,
+                engine=self.http_client_engine,
+                max_clients=self.max_clients,
+                max_per_host=self.max_per_host,
+                log=self.log,
+            )
+        return UpstreamClient(
+            engine=self.http_client_engine,
+            max_clients=self.max_clients,
+            max_per_host=self.max_per_host,
+            log=self.log,
+        )
+
+    @default("_rewrite_executor")
+    def _default_rewrite_executor(self) -> Executor:
+        return make_executor(self.rewrite_executor, self.rewrite_workers)
+
+    @default("_wheelhouse")
+    def _default_wheelhouse(self) -> Wheelhouse | None:
+        if not self.wheelhouses:
+            return None
+        lite_dir = Path(self.parent.manager.lite_dir)
+        return Wheelhouse(
+            [(lite_dir / path).resolve() for path in self.wheelhouses],
+            digests=self.parent.digests,
+            log=self.log,
+        )
+
+    @default("_prefetcher")
+    def _default_prefetcher(self) -> Prefetcher | None:
+        if self.prefetch_max_bytes <= 0:
+            return None
+        return Prefetcher(
+            root=self.cache_dir / "pythonhosted",
+            remote=self.pythonhosted_cdn_url,
+            client=self._upstream_client,
+            cache=self._proxy_cache,
+            max_bytes=self.prefetch_max_bytes,
+            wheel_store=self.parent.wheel_store,
+            log=self.log,
+        )
+
+    @default("_proxy_cache")
+    def _default_proxy_cache(self) -> ProxyCache:
+        return ProxyCache(
+            self.cache_dir,
+            max_bytes=self.cache_max_bytes,
+            compress_min_bytes=self.cache_compress_min_bytes,
+            memory_bytes=self.cache_memory_bytes,
+            log=self.log,
+        )
+
+    @default("stall_timeout")
+    def _default_stall_timeout(self) -> float:
+        return float(os.environ.get(ENV_VAR_STALL_TIMEOUT, "").strip() or "30")
+
+    @default("_solve_event")
+    def _default_solve_event(self) -> asyncio.Event:
+        return asyncio.Event()
+
     @default("port")
     def _default_port(self) -> int:
         return get_unused_port(self.host)
@@ -302,6 +639,7 @@ class TornadoLocker(MicropipLocker):
                 self.load_pyodide_options, **JSON_FMT
             ),
             "micropip_args_json": json.dumps(self.micropip_args, **JSON_FMT),
+            "heartbeat_ms": int(self.stall_timeout * 1000 / HEARTBEATS_PER_STALL),
         }
 
     @property
@@ -312,7 +650,12 @@ class TornadoLocker(MicropipLocker):
             f"{out_url}/{package}" if package.endswith(".whl") else package
             for package in self.parent.bootstrap_packages
         ]
-        return {"packages": packages}
+        options: dict[str, Any] = {"packages": packages}
+        if self.proxy_pyodide_cdn:
+            options[OPTION_LOCK_FILE_URL] = (
+                f"http://{LOCALHOST}:{self.port}/{PROXY}/{PYODIDE_LOCK_PROXIED}"
+            )
+        return options
 
     @default("micropip_args")
     def _default_micropip_args(self) -> dict[str, Any]:
@@ -322,8 +665,9 @@ class TornadoLocker(MicropipLocker):
         # overrides
         args.update(self.extra_micropip_args)
 
-        if self.constraints:
-            args.update(constraints=self.constraints)
+        constraints = [*self.constraints, *self.pins]
+        if constraints:
+            args.update(constraints=constraints)
 
         output_base_url = self.parent.manager.output_dir.as_posix()
         # required
@@ -333,7 +677,16 @@ class TornadoLocker(MicropipLocker):
                 for pkg in self.packages
             ]
             + self.specs,
-            index_urls=[f"{self.base_url}/{PROXY}/pypi/{{package_name}}/json"],
+            index_urls=[
+                f"{self.base_url}/{prefix}/simple"
+                if self.index_mode == INDEX_MODE_SIMPLE
+                else f"{self.base_url}/{prefix}/pypi/{{package_name}}/json"
+                for prefix, enabled in [
+                    (WHEELHOUSE, self.wheelhouses),
+                    (PROXY, not self.wheelhouse_only),
+                ]
+                if enabled
+            ],
         )
 
         return args
@@ -0,0 +1,226 @@
+"""A size-capped cache of files fetched by the proxies of a browser solve."""
+# Copyright (c) jupyterlite-pyodide-lock contributors.
+# Distributed under the terms of the BSD-3-Clause License.
+
+from __future__ import annotations
+
+import gzip
+import json
+import os
+import threading
+from collections import Counter, OrderedDict
+from logging import getLogger
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from jupyterlite_core.constants import UTF8
+
+from .constants import GZIP_SUFFIX, PROXY_CACHE_STATS
+
+if TYPE_CHECKING:
+    from logging import Logger
+
+#: a fallback logger
+_log = getLogger(__name__)
+
+#: suffixes of files which belong to another cached file
+SIDECAR_SUFFIXES = (".meta.json", GZIP_SUFFIX)
+
+#: bytes in a megabyte, for reporting
+MB = 1024 * 1024
+
+
+class ProxyCache:
+    """Keep proxied files within a byte budget, evicting the least recently used.
+
+    Cache hits are ``touch``-ed, so a file's modification time is its last use.
+    Only files in the folders of each proxy are managed: files at the ``root`` are
+    never evicted. Documents, like PyPI JSON, may be stored compressed, and the
+    most recently read are also kept in memory.
+    """
+
+    root: Path
+    log: Logger
+    #: the most bytes to keep on disk, or ``0`` for no limit
+    max_bytes: int
+    #: the least bytes of a document worth compressing
+    compress_min_bytes: int
+    #: the most bytes of documents to keep in memory
+    memory_bytes: int
+    #: counts of hits, misses and evictions
+    stats: Counter[str]
+    _memory: OrderedDict[Path, bytes]
+    _lock: threading.Lock
+
+    def __init__(
+        self,
+        root: Path,
+        *,
+        max_bytes: int = 0,
+        compress_min_bytes: int = 64 * 1024,
+        memory_bytes: int = 0,
+        log: Logger | None = None,
+    ) -> None:
+        """Initialize the cache members."""
+        self.root = root
+        self.max_bytes = max_bytes
+        self.compress_min_bytes = compress_min_bytes
+        self.memory_bytes = memory_bytes
+        self.log = log or _log
+        self.stats = Counter()
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def gz_path(path: Path) -> Path:
+        """Get the path of a compressed document."""
+        return path.with_name(f"{path.name}{GZIP_SUFFIX}")
+
+    def exists(self, path: Path) -> bool:
+        """Get whether a document is cached, compressed or not."""
+        return path.exists() or self.gz_path(path).exists()
+
+    def record(self, metric: str, count: int = 1) -> None:
+        """Count an event."""
+        with self._lock:
+            self.stats[metric] += count
+
+    def read(self, path: Path) -> bytes:
+        """Read a document from memory or disk, marking it as recently used."""
+        with self._lock:
+            body = self._memory.get(path)
+            if body is not None:
+                self._memory.move_to_end(path)
+                self.stats["memory_hits"] += 1
+        gz_path = self.gz_path(path)
+        on_disk = gz_path if gz_path.exists() else path
+        on_disk.touch()
+        if body is None:
+            body = on_disk.read_bytes()
+            if on_disk == gz_path:
+                body = gzip.decompress(body)
+            self.remember(path, body)
+        return body
+
+    def write(self, path: Path, body: bytes) -> None:
+        """Write a document, compressed if large enough, replacing any other copy."""
+        gz_path = self.gz_path(path)
+        if self.compress_min_bytes and len(body) >= self.compress_min_bytes:
+            write_bytes_atomic(gz_path, gzip.compress(body, compresslevel=6))
+            path.unlink(missing_ok=True)
+        else:
+            write_bytes_atomic(path, body)
+            gz_path.unlink(missing_ok=True)
+        self.remember(path, body)
+
+    def remember(self, path: Path, body: bytes) -> None:
+        """Keep a document in memory, forgetting the least recently used."""
+        if len(body) > self.memory_bytes:
+            self.forget(path)
+            return
+        with self._lock:
+            self._memory[path] = body
+            self._memory.move_to_end(path)
+            total = sum(map(len, self._memory.values()))
+            while total > self.memory_bytes:
+                _, old = self._memory.popitem(last=False)
+                total -= len(old)
+
+    def forget(self, path: Path) -> None:
+        """Stop keeping a document in memory."""
+        with self._lock:
+            self._memory.pop(path, None)
+
+    def get_entries(self) -> dict[Path, tuple[int, int, list[Path]]]:
+        """Get the bytes, last use, and files of each cached entry, with sidecars."""
+        entries: dict[Path, tuple[int, int, list[Path]]] = {}
+        if not self.root.exists():
+            return entries
+        for proxy_dir in sorted(p for p in self.root.iterdir() if p.is_dir()):
+            for dirpath, _dirnames, filenames in os.walk(proxy_dir):
+                for filename in filenames:
+                    path = Path(dirpath) / filename
+                    key = path
+                    for suffix in SIDECAR_SUFFIXES:
+                        key = key.with_name(key.name.removesuffix(suffix))
+                    stat = path.stat()
+                    size, used, files = entries.get(key, (0, 0, []))
+                    entries[key] = (
+                        size + stat.st_size,
+                        max(used, stat.st_mtime_ns),
+                        [*files, path],
+                    )
+        return entries
+
+    def evict(self) -> int:
+        """Remove the least recently used entries until within the byte budget."""
+        entries = self.get_entries()
+        total = sum(size for size, _used, _files in entries.values())
+        evicted = 0
+        if self.max_bytes:
+            by_use = sorted(entries.items(), key=lambda item: item[1][1])
+            for key, (size, _used, files) in by_use:
+                if total <= self.max_bytes:
+                    break
+                for path in files:
+                    path.unlink(missing_ok=True)
+                self.forget(key)
+                total -= size
+                evicted += 1
+        if evicted:
+            self.log.info(
+                "[proxy-cache] evicted %s entries, %.1fMB remain",
+                evicted,
+                total / MB,
+            )
+        self.record("evictions", evicted)
+        self.stats["files"] = len(entries) - evicted
+        self.stats["bytes"] = total
+        return evicted
+
+    def prune(self) -> str:
+        """Evict files over budget, then save and describe the statistics."""
+        self.evict()
+        self.save_stats()
+        return self.describe_stats(self.stats)
+
+    def save_stats(self) -> None:
+        """Write the statistics of the last solve, and the size of the cache."""
+        stats = {**self.stats, "max_bytes": self.max_bytes}
+        self.root.mkdir(parents=True, exist_ok=True)
+        (self.root / PROXY_CACHE_STATS).write_text(
+            json.dumps(stats, sort_keys=True), **UTF8
+        )
+
+    @staticmethod
+    def read_stats(root: Path) -> dict[str, Any]:
+        """Read the statistics of the last solve, if any."""
+        stats_path = root / PROXY_CACHE_STATS
+        if not stats_path.exists():
+            return {}
+        return dict(json.loads(stats_path.read_text(**UTF8)))
+
+    @staticmethod
+    def describe_stats(stats: dict[str, Any]) -> str:
+        """Describe the statistics of the last solve."""
+        if not stats:
+            return "empty"
+        max_bytes = stats.get("max_bytes", 0)
+        budget = f" of {max_bytes / MB:.1f}MB" if max_bytes else ""
+        return (
+            f"""{stats.get("files", 0)} files, {stats.get("bytes", 0) / MB:.1f}MB"""
+            f"""{budget}; hits {stats.get("hits", 0)}"""
+            f""" (memory {stats.get("memory_hits", 0)}),"""
+            f""" misses {stats.get("misses", 0)},"""
+            f""" evictions {stats.get("evictions", 0)}"""
+        )
+
+
+def write_bytes_atomic(path: Path, body: bytes) -> None:
+    """Write a file under a temporary name, then move it into place."""
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        tmp_path.write_bytes(body)
+        tmp_path.replace(path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
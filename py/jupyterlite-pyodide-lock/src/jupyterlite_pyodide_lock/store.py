@@ -0,0 +1,112 @@
+"""A content-addressed store of wheels, shared across builds and projects."""
+# Copyright (c) jupyterlite-pyodide-lock contributors.
+# Distributed under the terms of the BSD-3-Clause License.
+
+from __future__ import annotations
+
+import os
+from logging import getLogger
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from .constants import ENV_VAR_WHEEL_STORE, LINK_STRATEGIES, NAME
+from .hashing import sha256_file
+from .linking import Linker, get_linker
+
+if TYPE_CHECKING:
+    from logging import Logger
+
+#: a fallback logger
+_log = getLogger(__name__)
+
+
+def get_default_wheel_store_dir() -> Path:
+    """Get the default location of the shared wheel store."""
+    from_env = os.environ.get(ENV_VAR_WHEEL_STORE, "").strip()
+    if from_env:
+        return Path(from_env)
+    cache_home = os.environ.get("XDG_CACHE_HOME", "").strip()
+    cache_root = Path(cache_home) if cache_home else Path.home() / ".cache"
+    return cache_root / NAME / "wheels"
+
+
+class WheelStore:
+    """Keep one copy of each wheel, keyed by ``sha256``, and link it where needed.
+
+    The store contains:
+
+        * ``sha256/{digest[:2]}/{digest}``: the wheel content
+        * ``names/{file_name}``: a hard link to the content, for lookup by name
+    """
+
+    root: Path
+    log: Logger
+    linker: Linker
+
+    def __init__(
+        self, root: Path, log: Logger | None = None, linker: Linker | None = None
+    ) -> None:
+        """Initialize the store members."""
+        self.root = root
+        self.log = log or _log
+        self.linker = linker or get_linker(LINK_STRATEGIES)
+
+    def blob_path(self, sha256: str) -> Path:
+        """Get the location of wheel content by its ``sha256``."""
+        return self.root / "sha256" / sha256[:2] / sha256
+
+    def name_path(self, file_name: str) -> Path:
+        """Get the location of wheel content by its file name."""
+        return self.root / "names" / file_name
+
+    def find(
+        self, file_name: str | None = None, sha256: str | None = None
+    ) -> Path | None:
+        """Find a stored wheel by its ``sha256``, or else its file name.
+
+        The same file name may have different content from different indexes, so if
+        the ``sha256`` is known, a wheel found by name is only used if it matches.
+        """
+        if sha256:
+            blob = self.blob_path(sha256)
+            if blob.is_file():
+                return blob
+        if not file_name:
+            return None
+        by_name = self.name_path(file_name)
+        if not by_name.is_file():
+            return None
+        if sha256 and sha256_file(by_name) != sha256:
+            self.log.warning("[store] not reusing %s: different sha256", file_name)
+            return None
+        return by_name
+
+    def add(self, path: Path, sha256: str | None = None) -> str:
+        """Add a wheel to the store, returning its ``sha256``, if not already known."""
+        sha256 = sha256 or sha256_file(path)
+        blob = self.blob_path(sha256)
+
+        if not blob.exists():
+            self.link(path, blob)
+            self.log.debug("[store] added %s as %s", path.name, sha256)
+
+        name_path = self.name_path(path.name)
+        if not name_path.exists():
+            self.link(blob, name_path)
+
+        return sha256
+
+    def link_to(
+        self, dest: Path, file_name: str | None = None, sha256: str | None = None
+    ) -> bool:
+        """Link a stored wheel to a destination, if found."""
+        found = self.find(file_name=file_name, sha256=sha256)
+        if found is None:
+            return False
+        self.link(found, dest)
+        self.log.debug("[store] linked %s to %s", found, dest)
+        return True
+
+    def link(self, src: Path, dest: Path) -> None:
+        """Place a file at a destination with the best available strategy."""
+        self.linker.link(src, dest)
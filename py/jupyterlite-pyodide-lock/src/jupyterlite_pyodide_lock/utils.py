@@ -9,9 +9,10 @@ import os
 import shutil
 import socket
 from datetime import datetime, timezone
+from functools import lru_cache
 from logging import Logger, getLogger
 from pathlib import Path
-from urllib.parse import urlparse
+from urllib.parse import parse_qs, urlparse
 
 from psutil import NoSuchProcess, Process, wait_procs
 
@@ -39,8 +40,19 @@ TWaitProcs = tuple[TProcs, TProcs]
 _log = getLogger(__name__)
 
 
+@lru_cache(maxsize=65536)
 def warehouse_date_to_epoch(iso8601_str: str) -> int:
-    """Convert a Warehouse upload date to a UNIX epoch timestamp."""
+    """Convert a Warehouse upload date to a UNIX epoch timestamp.
+
+    Dates are parsed again for each request of a project, so are remembered.
+    """
+    if iso8601_str.endswith("Z"):
+        try:
+            parsed = datetime.fromisoformat(f"{iso8601_str[:-1]}+00:00")
+            return int(parsed.timestamp())
+        except ValueError:
+            pass
+
     formats = WAREHOUSE_UPLOAD_FORMAT_ANY
     for format_str in formats:
         try:
@@ -207,3 +219,9 @@ def url_wheel_filename(url_or_name: str) -> str | None:
     if parsed.path.endswith(".whl"):
         return parsed.path.split("/")[-1]
     return None
+
+
+def url_sha256(url: str) -> str | None:
+    """Get the ``sha256`` from a ``#sha256=`` URL fragment, if any."""
+    digests = parse_qs(urlparse(url).fragment).get("sha256")
+    return digests[0] if digests else None
@@ -0,0 +1,409 @@
+"""Tests of the caching proxy handler."""
+# Copyright (c) jupyterlite-pyodide-lock contributors.
+# Distributed under the terms of the BSD-3-Clause License.
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from hashlib import sha256
+from http import HTTPStatus
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, Any
+
+from jupyterlite_core.constants import UTF8
+from tornado.httpclient import AsyncHTTPClient, HTTPClientError
+from tornado.httpserver import HTTPServer
+from tornado.web import Application
+
+from jupyterlite_pyodide_lock.constants import (
+    LOCALHOST,
+    PYODIDE_LOCK,
+    SIMPLE_JSON_MIME,
+    SIMPLE_UPLOAD_TIME,
+)
+from jupyterlite_pyodide_lock.lockers.handlers import (
+    make_locked_name_skipper,
+    make_simple_lock_date_replacer,
+)
+from jupyterlite_pyodide_lock.lockers.handlers.cacher import (
+    CachingRemoteFiles,
+    StreamTee,
+)
+from jupyterlite_pyodide_lock.lockers.handlers.retry import RetryPolicy
+from jupyterlite_pyodide_lock.store import WheelStore
+from jupyterlite_pyodide_lock.utils import get_unused_port, warehouse_date_to_epoch
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from tornado.httpclient import HTTPResponse
+
+REMOTE = "https://example.com"
+ETAG = '"abc"'
+LOCK_DATE = "2024-01-01T00:00:00.000000Z"
+LATER_DATE = "2024-06-01T00:00:00Z"
+
+#: concurrent requests for the same file
+CONCURRENT = 5
+
+
+class SlowClient:
+    """A client which takes a while to fetch anything."""
+
+    def __init__(self) -> None:
+        """Initialize the fetched URLs."""
+        self.urls: list[str] = []
+
+    async def fetch(self, url: str, **_kwargs: Any) -> Any:
+        """Pretend to fetch a URL."""
+        self.urls.append(url)
+        await asyncio.sleep(0.1)
+        return SimpleNamespace(code=HTTPStatus.OK, headers={}, body=url.encode())
+
+
+def make_app(path: Path, client: Any, **kwargs: Any) -> Application:
+    """Make an application with just a caching proxy."""
+    config = {
+        "path": path,
+        "remote": REMOTE,
+        "log": logging.getLogger(__name__),
+        "client": client,
+        **kwargs,
+    }
+    return Application([("^/(.*)$", CachingRemoteFiles, config)])
+
+
+async def get_all(app: Application, names: list[str]) -> list[bytes]:
+    """Concurrently get some files from an application."""
+    return [res.body for res in await get_responses(app, names)]
+
+
+async def get_responses(
+    app: Application, names: list[str], **kwargs: Any
+) -> list[HTTPResponse]:
+    """Concurrently get responses for some files from an application."""
+    port = get_unused_port(LOCALHOST)
+    server = HTTPServer(app)
+    server.listen(port, LOCALHOST)
+    http = AsyncHTTPClient(force_instance=True)
+    try:
+        return await asyncio.gather(*[
+            http.fetch(f"http://{LOCALHOST}:{port}/{name}", **kwargs) for name in names
+        ])
+    finally:
+        http.close()
+        server.stop()
+
+
+class JsonClient:
+    """A client which responds with some JSON."""
+
+    def __init__(self, data: Any) -> None:
+        """Initialize the response data."""
+        self.data = data
+        self.requests: list[dict[str, str]] = []
+
+    async def fetch(self, _url: str, **kwargs: Any) -> Any:
+        """Pretend to fetch some JSON."""
+        self.requests.append(kwargs.get("headers", {}))
+        body = json.dumps(self.data).encode()
+        return SimpleNamespace(code=HTTPStatus.OK, headers={}, body=body)
+
+
+def test_cacher_single_flight(tmp_path: Path) -> None:
+    """Verify concurrent requests for a file share one upstream fetch."""
+    client = SlowClient()
+    names = ["a.json"] * CONCURRENT + ["b.json"]
+    bodies = asyncio.run(get_all(make_app(tmp_path, client), names))
+    assert bodies == [f"{REMOTE}/{name}".encode() for name in names]
+    assert sorted(client.urls) == [f"{REMOTE}/a.json", f"{REMOTE}/b.json"]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a.json", "b.json"]
+    assert not CachingRemoteFiles.in_flight
+
+
+class StreamingClient:
+    """A client which streams a response in chunks, if asked."""
+
+    def __init__(self, *statuses: int) -> None:
+        """Initialize the statuses to respond with before succeeding."""
+        self.statuses = [*statuses]
+        self.urls: list[str] = []
+
+    async def fetch(self, url: str, **kwargs: Any) -> Any:
+        """Pretend to stream a URL."""
+        self.urls.append(url)
+        if "streaming_callback" not in kwargs:
+            return SimpleNamespace(
+                code=HTTPStatus.OK, headers={}, body=url.encode() * 3
+            )
+        status = self.statuses.pop(0) if self.statuses else HTTPStatus.OK
+        kwargs["header_callback"](f"HTTP/1.1 {status} Whatever\r\n")
+        kwargs["header_callback"](f"Content-Length: {len(url) * 3}\r\n")
+        kwargs["header_callback"]("\r\n")
+        for _ in range(3):
+            kwargs["streaming_callback"](url.encode())
+            await asyncio.sleep(0.01)
+        if status != HTTPStatus.OK:
+            raise HTTPClientError(status)
+        return SimpleNamespace(body=b"")
+
+
+def test_cacher_stream(tmp_path: Path) -> None:
+    """Verify files are forwarded while cached, and error bodies are ignored."""
+    client = StreamingClient(HTTPStatus.SERVICE_UNAVAILABLE)
+    app = make_app(
+        tmp_path,
+        client,
+        stream=True,
+        retry_policy=RetryPolicy(base_delay=0.001),
+        rewrites={"/json$": []},
+    )
+    names = ["a.whl", "a.whl", "b/json"]
+    bodies = asyncio.run(get_all(app, names))
+    assert bodies == [f"{REMOTE}/{name}".encode() * 3 for name in names[:2]] + [
+        f"{REMOTE}/b/json".encode() * 3
+    ]
+    assert sorted(client.urls) == [f"{REMOTE}/{name}" for name in names]
+    assert sorted(p.name for p in tmp_path.rglob("*") if p.is_file()) == [
+        "a.whl",
+        "json",
+        "json.meta.json",
+    ]
+
+
+class SlowReader:
+    """A handler whose client only reads what it is sent once ``reading``."""
+
+    def __init__(self) -> None:
+        """Initialize the sent bytes, and the flushes still to be read."""
+        self.written = b""
+        self.received = b""
+        self.reading = False
+        self.flushes: list[asyncio.Future[None]] = []
+        self.log = logging.getLogger(__name__)
+
+    def start_stream(self, *_args: Any) -> None:
+        """Pretend to set headers."""
+
+    def write(self, chunk: bytes) -> None:
+        """Buffer a chunk to send."""
+        self.written += chunk
+
+    def flush(self) -> asyncio.Future[None]:
+        """Send buffered chunks, which are only read when ``reading``."""
+        future = asyncio.get_running_loop().create_future()
+        self.flushes.append(future)
+        if self.reading:
+            self.read()
+        return future
+
+    def read(self) -> None:
+        """Read everything sent so far."""
+        self.received = self.written
+        for future in self.flushes:
+            future.set_result(None)
+        self.flushes = []
+
+
+def test_cacher_stream_slow_reader(tmp_path: Path) -> None:
+    """Verify a client that can't keep up is sent the rest from the cache."""
+    chunks = [bytes([i]) * 10 for i in range(10)]
+    cache_path = tmp_path / "a.whl"
+    reader = SlowReader()
+    tee = StreamTee(reader, cache_path, max_pending=25)  # type: ignore[arg-type]
+
+    async def _stream() -> None:
+        tee.on_header("HTTP/1.1 200 OK\r\n")
+        for chunk in chunks:
+            tee.on_chunk(chunk)
+        tee.finish()
+        assert tee.lagging
+        assert reader.written == b"".join(chunks[:3])
+        reader.reading = True
+        reader.read()
+        await tee.catch_up()
+
+    asyncio.run(_stream())
+    assert reader.received == cache_path.read_bytes() == b"".join(chunks)
+    assert not tee.pending
+
+
+class ValidatingClient:
+    """A client which supports conditional requests."""
+
+    def __init__(self) -> None:
+        """Initialize the requests."""
+        self.requests: list[dict[str, str]] = []
+        self.missing: set[str] = set()
+
+    async def fetch(self, url: str, **kwargs: Any) -> Any:
+        """Pretend to fetch a document, unless it has not been modified."""
+        headers = kwargs.get("headers", {})
+        self.requests.append(headers)
+        if url in self.missing:
+            raise HTTPClientError(HTTPStatus.NOT_FOUND)
+        if headers.get("If-None-Match") == ETAG:
+            response = SimpleNamespace(code=HTTPStatus.NOT_MODIFIED, headers={})
+            raise HTTPClientError(HTTPStatus.NOT_MODIFIED, response=response)  # type: ignore[arg-type]
+        return SimpleNamespace(
+            code=HTTPStatus.OK, headers={"ETag": ETAG}, body=b"upstream " + url.encode()
+        )
+
+
+def test_cacher_revalidate(tmp_path: Path) -> None:
+    """Verify documents are revalidated, and rewritten as they are served."""
+    client = ValidatingClient()
+    rewrites = {"/json$": [(b"upstream", b"local")]}
+    body = f"local {REMOTE}/a/json".encode()
+
+    app = make_app(tmp_path, client, rewrites=rewrites)
+    assert asyncio.run(get_all(app, ["a/json"] * 2)) == [body] * 2
+    assert asyncio.run(get_all(app, ["a/json"])) == [body]
+    assert client.requests == [{}, {"If-None-Match": ETAG}]
+    assert (tmp_path / "a/json").read_bytes() == f"upstream {REMOTE}/a/json".encode()
+
+    app = make_app(tmp_path, client, rewrites=rewrites, frozen_epoch=1)
+    assert asyncio.run(get_all(app, ["a/json"])) == [body]
+    assert len(client.requests) == 2  # noqa: PLR2004
+
+
+def test_cacher_negative(tmp_path: Path) -> None:
+    """Verify missing documents are remembered, and skipped documents not fetched."""
+    client = ValidatingClient()
+    client.missing = {f"{REMOTE}/missing/json"}
+    names = ["missing/json", "skipped/json"]
+    rewrites: dict[str, Any] = {"/json$": []}
+
+    def _skip(path: str) -> bool:
+        return path.startswith("skipped/")
+
+    for _ in range(2):
+        app = make_app(tmp_path, client, rewrites=rewrites, negative_ttl=60, skip=_skip)
+        responses = asyncio.run(get_responses(app, names, raise_error=False))
+        assert [res.code for res in responses] == [HTTPStatus.NOT_FOUND] * 2
+
+    assert len(client.requests) == 1
+
+
+def test_cacher_locked_name_skipper(tmp_path: Path) -> None:
+    """Verify documents are skipped for bootstrap packages, unless in ``specs``."""
+    packages = {
+        "foo-bar": {"name": "Foo_Bar"},
+        "micropip": {"name": "micropip"},
+        "numpy": {},
+    }
+    (tmp_path / PYODIDE_LOCK).write_text(json.dumps({"packages": packages}), **UTF8)
+    locker: Any = SimpleNamespace(
+        parent=SimpleNamespace(pyodide_addon=SimpleNamespace(output_pyodide=tmp_path)),
+        specs=["foo.bar >=1"],
+    )
+
+    skip = make_locked_name_skipper(locker)
+
+    assert [
+        path
+        for path in ["Foo_Bar/json", "micropip/json", "NumPy/json", "other/json"]
+        if skip(path)
+    ] == ["micropip/json", "NumPy/json"]
+
+
+def test_cacher_simple_index(tmp_path: Path) -> None:
+    """Verify PEP 691 project pages are cached, and filtered by lock date."""
+    locker: Any = SimpleNamespace(
+        parent=SimpleNamespace(lock_date_epoch=warehouse_date_to_epoch(LOCK_DATE)),
+        log=logging.getLogger(__name__),
+    )
+    files = [
+        {"filename": "a-1.0-py3-none-any.whl", SIMPLE_UPLOAD_TIME: LOCK_DATE},
+        {"filename": "a-2.0-py3-none-any.whl", SIMPLE_UPLOAD_TIME: LATER_DATE},
+        {"filename": "a-3.0-py3-none-any.whl"},
+    ]
+    client = JsonClient({"name": "a", "files": files})
+    app = make_app(
+        tmp_path,
+        client,
+        rewrites={"/$": [(b"upload-time", make_simple_lock_date_replacer(locker))]},
+        mime_map={r"/index\.json$": SIMPLE_JSON_MIME},
+        index_file="index.json",
+        accept=SIMPLE_JSON_MIME,
+    )
+    [res] = asyncio.run(get_responses(app, ["a/"]))
+    assert res.headers["Content-Type"] == SIMPLE_JSON_MIME
+    assert [f["filename"] for f in json.loads(res.body)["files"]] == [
+        files[0]["filename"],
+        files[2]["filename"],
+    ]
+    assert client.requests == [{"Accept": SIMPLE_JSON_MIME}]
+    assert (tmp_path / "a/index.json").exists()
+
+
+def test_cacher_transform(tmp_path: Path) -> None:
+    """Verify transformed documents are cached by settings and upstream content."""
+    client = JsonClient({"a": 1, "b": 2})
+    calls: list[bytes] = []
+
+    def _transform(raw: bytes) -> bytes:
+        calls.append(raw)
+        return json.dumps({"a": json.loads(raw)["a"]}).encode()
+
+    for key in ["one", "one", "two"]:
+        app = make_app(
+            tmp_path,
+            client,
+            rewrites={"/json$": []},
+            frozen_epoch=1,
+            transform=_transform,
+            transform_key=key,
+        )
+        assert asyncio.run(get_all(app, ["a/json"])) == [b'{"a": 1}']
+
+    assert len(calls) == 2  # noqa: PLR2004
+    assert len(client.requests) == 1
+    assert len(list(tmp_path.glob("a/json.*.slim"))) == 2  # noqa: PLR2004
+
+
+class WheelClient:
+    """A client which responds with a project document, or a wheel."""
+
+    def __init__(self, wheel: str, content: bytes) -> None:
+        """Initialize the wheel and its content."""
+        self.wheel = wheel
+        self.content = content
+        self.urls: list[str] = []
+
+    async def fetch(self, url: str, **_kwargs: Any) -> Any:
+        """Pretend to fetch a document or a wheel."""
+        self.urls.append(url)
+        body = self.content
+        if url.endswith("/json"):
+            digests = {"sha256": sha256(self.content).hexdigest()}
+            artifact = {"url": f"{REMOTE}/{self.wheel}", "digests": digests}
+            body = json.dumps({"releases": {"1.0": [artifact]}}).encode()
+        return SimpleNamespace(code=HTTPStatus.OK, headers={}, body=body)
+
+
+def test_cacher_wheel_digests(tmp_path: Path) -> None:
+    """Verify a stored wheel with the same name, but another ``sha256``, isn't used."""
+    wheel = "foo-1.0.0-py3-none-any.whl"
+    store = WheelStore(tmp_path / "store")
+    other = tmp_path / "other" / wheel
+    other.parent.mkdir()
+    other.write_bytes(b"other foo")
+    store.add(other)
+
+    client = WheelClient(wheel, b"foo")
+    app = make_app(
+        tmp_path / "cache",
+        client,
+        rewrites={"/json$": []},
+        wheel_store=store,
+        wheel_digests={},
+    )
+
+    async def _get() -> list[bytes]:
+        return [*await get_all(app, ["foo/json"]), *await get_all(app, [wheel])]
+
+    assert asyncio.run(_get())[-1] == b"foo"
+    assert client.urls == [f"{REMOTE}/foo/json", f"{REMOTE}/{wheel}"]
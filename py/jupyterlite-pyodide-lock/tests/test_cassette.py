@@ -0,0 +1,121 @@
+"""Tests of recording and replaying upstream responses."""
+# Copyright (c) jupyterlite-pyodide-lock contributors.
+# Distributed under the terms of the BSD-3-Clause License.
+
+from __future__ import annotations
+
+import asyncio
+import zipfile
+from http import HTTPStatus
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, Any
+
+import pytest
+from tornado.httpclient import HTTPClientError
+
+from jupyterlite_pyodide_lock.cassette import Cassette, get_cassette_key
+from jupyterlite_pyodide_lock.constants import CASSETTE_RECORD, CASSETTE_REPLAY
+from jupyterlite_pyodide_lock.lockers.handlers.upstream import CassetteClient
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+REMOTE = "https://example.com"
+
+
+class RecordedClient:
+    """A client which responds with its URL, unless missing."""
+
+    def __init__(self) -> None:
+        """Initialize the requests."""
+        self.requests: list[tuple[str, dict[str, str]]] = []
+
+    async def fetch(self, url: str, **kwargs: Any) -> Any:
+        """Pretend to fetch a URL."""
+        self.requests.append((url, kwargs.get("headers", {})))
+        if url.endswith("missing"):
+            raise HTTPClientError(HTTPStatus.NOT_FOUND)
+        body = url.encode()
+        if "streaming_callback" in kwargs:
+            kwargs["streaming_callback"](body)
+            body = b""
+        headers = {"Content-Type": "text/plain", "Set-Cookie": "x"}
+        return SimpleNamespace(code=HTTPStatus.OK, headers=headers, body=body)
+
+    def close(self) -> None:
+        """Pretend to close connections."""
+
+
+def make_client(cassette: Cassette, inner: RecordedClient) -> CassetteClient:
+    """Make a cassette client around a fake client."""
+    client = CassetteClient(cassette=cassette, engine="simple")
+    client.client.close()
+    client.client = inner  # type: ignore[assignment]
+    return client
+
+
+async def record(client: CassetteClient) -> None:
+    """Fetch some URLs, as a proxy would."""
+    await client.fetch(f"{REMOTE}/a", headers={"If-None-Match": '"x"'})
+    await client.fetch(f"{REMOTE}/b", streaming_callback=lambda _chunk: None)
+    with pytest.raises(HTTPClientError):
+        await client.fetch(f"{REMOTE}/missing")
+
+
+async def replay(client: CassetteClient) -> tuple[list[Any], list[str], list[bytes]]:
+    """Fetch the recorded URLs, and one which wasn't."""
+    headers: list[str] = []
+    chunks: list[bytes] = []
+    plain = await client.fetch(f"{REMOTE}/a")
+    streamed = await client.fetch(
+        f"{REMOTE}/b", header_callback=headers.append, streaming_callback=chunks.append
+    )
+    codes = []
+    for name in ["missing", "never"]:
+        with pytest.raises(HTTPClientError) as err:
+            await client.fetch(f"{REMOTE}/{name}")
+        codes += [err.value.code]
+    return [plain, streamed, *codes], headers, chunks
+
+
+def test_cassette_record_replay(tmp_path: Path) -> None:
+    """Verify responses are recorded once, and replayed without fetching."""
+    path = tmp_path / f"{get_cassette_key({'specs': ['a']})}.zip"
+    inner = RecordedClient()
+
+    recorder = Cassette(path, mode=CASSETTE_RECORD)
+    asyncio.run(record(make_client(recorder, inner)))
+    recorder.save()
+
+    assert [url for url, _headers in inner.requests] == [
+        f"{REMOTE}/a",
+        f"{REMOTE}/b",
+        f"{REMOTE}/missing",
+    ]
+    assert inner.requests[0][1] == {}
+    assert not recorder.partial_dir.exists()
+    with zipfile.ZipFile(path) as zf:
+        assert len(zf.namelist()) == 4  # noqa: PLR2004
+
+    player = Cassette(path, mode=CASSETTE_REPLAY)
+    results, headers, chunks = asyncio.run(replay(make_client(player, inner)))
+    player.close()
+
+    plain, streamed, missing, never = results
+    assert len(inner.requests) == 3  # noqa: PLR2004
+    assert plain.body == f"{REMOTE}/a".encode()
+    assert plain.headers["Content-Type"] == "text/plain"
+    assert "Set-Cookie" not in plain.headers
+    assert streamed.body == b""
+    assert chunks == [f"{REMOTE}/b".encode()]
+    assert headers[0].startswith("HTTP/1.1 200")
+    assert headers[-1] == "\r\n"
+    assert missing == never == HTTPStatus.NOT_FOUND
+
+
+def test_cassette_missing(tmp_path: Path) -> None:
+    """Verify a missing cassette replays nothing."""
+    player = Cassette(tmp_path / "missing.zip", mode=CASSETTE_REPLAY)
+    assert player.play(f"{REMOTE}/a") is None
+    player.save()
+    assert not player.path.exists()
@@ -0,0 +1,101 @@
+"""Tests of the wheel metadata catalog."""
+# Copyright (c) jupyterlite-pyodide-lock contributors.
+# Distributed under the terms of the BSD-3-Clause License.
+
+from __future__ import annotations
+
+import zipfile
+from typing import TYPE_CHECKING
+
+import pyodide_lock.utils
+from pyodide_lock import PyodideLockSpec
+from pyodide_lock.spec import InfoSpec
+
+from jupyterlite_pyodide_lock import catalog
+from jupyterlite_pyodide_lock.catalog import WheelCatalog, add_wheels_to_spec
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    import pytest
+
+#: wheels to build, with their ``Requires-Dist``
+WHEELS = {
+    "foo": ["bar[baz] ; python_version > '3'", "nope ; sys_platform == 'win32'"],
+    "bar": ["qux ; extra == 'baz'"],
+    "qux": [],
+}
+
+INFO = InfoSpec(
+    arch="wasm32", platform="emscripten_3_1_58", version="0.26.0", python="3.12.1"
+)
+
+
+def make_wheel(
+    root: Path, name: str, requires: list[str], *, module: bool = True
+) -> Path:
+    """Write a minimal wheel, optionally without any importable module."""
+    wheel = root / f"{name}-1.0.0-py3-none-any.whl"
+    dist_info = f"{name}-1.0.0.dist-info"
+    metadata = [
+        "Metadata-Version: 2.1",
+        f"Name: {name}",
+        "Version: 1.0.0",
+        *[f"Requires-Dist: {req}" for req in requires],
+    ]
+    with zipfile.ZipFile(wheel, "w") as zf:
+        if module:
+            zf.writestr(f"{name}/__init__.py", "")
+        zf.writestr(f"{dist_info}/METADATA", "\n".join(metadata))
+        zf.writestr(f"{dist_info}/WHEEL", "Wheel-Version: 1.0\nTag: py3-none-any\n")
+        zf.writestr(f"{dist_info}/RECORD", "")
+    return wheel
+
+
+def test_catalog_reads_once(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Verify an unchanged wheel is only read once, even after reopening."""
+    wheels = [make_wheel(tmp_path, name, reqs) for name, reqs in WHEELS.items()]
+    reads: list[Path] = []
+    read_wheel_info = catalog.read_wheel_info
+
+    def _read(wheel: Path) -> catalog.WheelInfo | None:
+        reads.append(wheel)
+        return read_wheel_info(wheel)
+
+    monkeypatch.setattr(catalog, "read_wheel_info", _read)
+    db = tmp_path / "catalog.sqlite3"
+
+    infos = WheelCatalog(db).get_many(wheels)
+    assert [i["name"] for i in infos.values()] == [*WHEELS]
+    assert infos[wheels[0]]["imports"] == ["foo"]
+    assert reads == wheels
+
+    assert WheelCatalog(db).get_many(wheels) == infos
+    assert reads == wheels
+
+    make_wheel(tmp_path, "qux", ["foo"])
+    assert WheelCatalog(db).get(wheels[-1])["requires_dist"] == ["foo"]  # type: ignore[index]
+    assert reads == [*wheels, wheels[-1]]
+
+
+def test_catalog_add_wheels_to_spec(tmp_path: Path) -> None:
+    """Verify the catalog-backed lock matches the upstream implementation."""
+    wheels = [make_wheel(tmp_path, name, reqs) for name, reqs in WHEELS.items()]
+    spec = PyodideLockSpec(info=INFO, packages={})
+
+    expected = pyodide_lock.utils.add_wheels_to_spec(spec, wheels)
+    observed = add_wheels_to_spec(spec, wheels, WheelCatalog(tmp_path / "db"))
+
+    assert observed.packages == expected.packages
+    assert observed.packages["foo"].depends == ["bar"]
+    assert observed.packages["bar"].depends == ["qux"]
+
+
+def test_catalog_no_imports(tmp_path: Path) -> None:
+    """Verify a wheel without an importable module is locked without imports."""
+    wheel = make_wheel(tmp_path, "qux", [], module=False)
+    spec = PyodideLockSpec(info=INFO, packages={})
+
+    observed = add_wheels_to_spec(spec, [wheel], WheelCatalog(tmp_path / "db"))
+
+    assert observed.packages["qux"].imports == []
@@ -122,6 +122,20 @@ def test_cli_good_build(
     assert "https://" not in pruned_text
 
 
+def test_cli_proxy_pyodide_cdn(lite_cli: LiteRunner, a_lite_config: Path) -> None:
+    """Verify a browser solves with bootstrap packages from the CDN proxy."""
+    from jupyterlite_pyodide_lock.constants import PYODIDE_LOCK_STEM
+
+    patch_config(
+        a_lite_config,
+        PyodideLockAddon={"specs": ["ipywidgets >=8.1.2,<8.1.3"]},
+        BrowserLocker={"proxy_pyodide_cdn": True},
+    )
+    lite_cli("build", "--debug")
+    lock = a_lite_config.parent / "_output/static" / PYODIDE_LOCK_STEM / PYODIDE_LOCK
+    assert "ipywidgets" in pyodide_lock.PyodideLockSpec.from_json(lock).packages
+
+
 def test_cli_bad_build(lite_cli: LiteRunner, a_lite_config: Path) -> None:
     """Verify an impossible package solve fails."""
     patch_config(a_lite_config, PyodideLockAddon={"enabled": True, "specs": ["torch"]})
@@ -0,0 +1,68 @@
+"""Tests of concurrent downloads."""
+# Copyright (c) jupyterlite-pyodide-lock contributors.
+# Distributed under the terms of the BSD-3-Clause License.
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import Counter
+from typing import TYPE_CHECKING
+
+import pytest
+from jupyterlite_core.constants import UTF8
+
+from jupyterlite_pyodide_lock.downloads import fetch_many
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+
+@pytest.mark.parametrize("max_per_host", [1, 2, 4])
+def test_fetch_many_per_host(tmp_path: Path, max_per_host: int) -> None:
+    """Verify downloads run concurrently, but respect the per-host limit."""
+    lock = threading.Lock()
+    running: Counter[str] = Counter()
+    peak: Counter[str] = Counter()
+
+    def _fake_fetch_one(url: str, dest: Path) -> None:
+        host = url.split("/")[2]
+        with lock:
+            running[host] += 1
+            peak[host] = max(peak[host], running[host])
+        time.sleep(0.05)
+        dest.write_text(url, **UTF8)
+        with lock:
+            running[host] -= 1
+
+    pending = {
+        f"https://{host}/{i}.whl": tmp_path / f"{host}-{i}.whl"
+        for host in ["a.example", "b.example"]
+        for i in range(6)
+    }
+
+    assert fetch_many(_fake_fetch_one, pending, max_per_host=max_per_host)
+    assert all(dest.exists() for dest in pending.values())
+    assert max(peak.values()) == max_per_host
+
+
+def test_fetch_many_error(tmp_path: Path) -> None:
+    """Verify all downloads are attempted, even if one fails."""
+
+    def _fake_fetch_one(url: str, dest: Path) -> None:
+        if "bad" in url:
+            msg = f"can't fetch {url}"
+            raise ValueError(msg)
+        dest.write_text(url, **UTF8)
+
+    pending = {f"https://a.example/{n}.whl": tmp_path / f"{n}.whl" for n in "abc"}
+    pending["https://a.example/bad.whl"] = tmp_path / "bad.whl"
+
+    with pytest.raises(ValueError, match="bad"):
+        fetch_many(_fake_fetch_one, pending)
+
+    assert sorted(p.name for p in tmp_path.glob("*.whl")) == [
+        "a.whl",
+        "b.whl",
+        "c.whl",
+    ]
@@ -0,0 +1,91 @@
+"""Tests of the lock dependency graph."""
+# Copyright (c) jupyterlite-pyodide-lock contributors.
+# Distributed under the terms of the BSD-3-Clause License.
+
+from __future__ import annotations
+
+import random
+import time
+from typing import Any
+
+import pytest
+
+from jupyterlite_pyodide_lock.graph import LockGraph, compile_patterns
+
+#: the size of synthetic locks
+N_SYNTHETIC = 10_000
+
+#: the most dependencies of a synthetic package
+MAX_DEPENDS = 4
+
+#: generous seconds to build graphs of, and find closures in, synthetic locks
+MAX_SYNTHETIC_SECONDS = 10
+
+
+def make_lock(depends: dict[str, list[str]]) -> dict[str, dict[str, Any]]:
+    """Build a minimal ``packages`` from some dependencies."""
+    return {name: {"name": name, "depends": deps} for name, deps in depends.items()}
+
+
+def make_synthetic_lock(seed: int = 42) -> dict[str, dict[str, Any]]:
+    """Build a large lock, where each package depends on a few earlier ones."""
+    rand = random.Random(seed)  # noqa: S311
+    depends: dict[str, list[str]] = {}
+    for i in range(N_SYNTHETIC):
+        n_depends = min(i, rand.randint(0, MAX_DEPENDS))
+        depends[f"pkg-{i}"] = [f"pkg-{j}" for j in rand.sample(range(i), n_depends)]
+    return make_lock(depends)
+
+
+@pytest.mark.parametrize(
+    ("patterns", "name", "expected"),
+    [
+        ([], "foo", False),
+        (["^foo$"], "foo", True),
+        (["^foo$"], "foo-bar", False),
+        (["bar", "foo"], "foo-bar", True),
+        (["(?i)^FOO$"], "foo", True),
+    ],
+)
+def test_graph_patterns(patterns: list[str], name: str, expected: bool) -> None:  # noqa: FBT001
+    """Verify combined patterns behave like each pattern with ``re.match``."""
+    assert compile_patterns(patterns)(name) == expected
+
+
+def test_graph_closure() -> None:
+    """Verify forward and reverse closures, and missing dependencies."""
+    graph = LockGraph(
+        make_lock({
+            "a": ["B"],
+            "b": ["c", "not-locked"],
+            "c": ["a"],
+            "d": ["c"],
+            "e": [],
+        })
+    )
+    assert graph.match(["^[ab]$"]) == {"a", "b"}
+    assert graph.closure(["a"]) == {"a", "b", "c"}
+    assert graph.closure(["e"]) == {"e"}
+    assert graph.dependents_closure(["c"]) == {"a", "b", "c", "d"}
+    assert graph.missing == {"b": ["not-locked"]}
+
+
+def test_graph_synthetic_benchmark() -> None:
+    """Verify closures of a large synthetic lock are complete, and fast enough."""
+    packages = make_synthetic_lock()
+    chain = make_lock({
+        f"pkg-{i}": [f"pkg-{i - 1}"] if i else [] for i in range(N_SYNTHETIC)
+    })
+
+    start = time.perf_counter()
+    graph = LockGraph(packages)
+    roots = graph.match([r"^pkg-\d*7$"])
+    closure = graph.closure(roots)
+    chain_closure = LockGraph(chain).closure([f"pkg-{N_SYNTHETIC - 1}"])
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < MAX_SYNTHETIC_SECONDS
+    assert roots <= closure
+    assert all(dep in closure for name in closure for dep in graph.depends[name])
+    assert max(len(deps) for deps in graph.depends.values()) <= MAX_DEPENDS
+    assert len(chain_closure) == N_SYNTHETIC
@@ -0,0 +1,58 @@
+"""Tests of streaming, remembered file digests."""
+# Copyright (c) jupyterlite-pyodide-lock contributors.
+# Distributed under the terms of the BSD-3-Clause License.
+
+from __future__ import annotations
+
+import io
+from hashlib import sha256
+from typing import TYPE_CHECKING
+
+from jupyterlite_pyodide_lock import hashing
+from jupyterlite_pyodide_lock.hashing import DigestMemo, copy_with_sha256
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    import pytest
+
+
+def test_hashing_copy() -> None:
+    """Verify a digest is calculated while copying."""
+    digest = sha256()
+    dest = io.BytesIO()
+    copy_with_sha256(io.BytesIO(b"foo" * 1000), dest, digest)
+    assert dest.getvalue() == b"foo" * 1000
+    assert digest.hexdigest() == sha256(b"foo" * 1000).hexdigest()
+
+
+def test_hashing_memo(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Verify unchanged files, and their hard links, are only read once."""
+    reads: list[Path] = []
+    sha256_file = hashing.sha256_file
+
+    def _sha256_file(path: Path) -> str:
+        reads.append(path)
+        return sha256_file(path)
+
+    monkeypatch.setattr(hashing, "sha256_file", _sha256_file)
+
+    paths = [tmp_path / f"{i}.whl" for i in range(3)]
+    for i, path in enumerate(paths):
+        path.write_bytes(b"x" * i)
+    linked = tmp_path / "linked.whl"
+    linked.hardlink_to(paths[0])
+
+    memo_json = tmp_path / "digests.json"
+    memo = DigestMemo(memo_json)
+    digests = memo.sha256_many(paths)
+    assert digests == {path: sha256(path.read_bytes()).hexdigest() for path in paths}
+    assert memo.verify(linked, digests[paths[0]])
+    assert sorted(reads) == sorted(paths)
+
+    assert DigestMemo(memo_json).sha256_many(paths) == digests
+    assert sorted(reads) == sorted(paths)
+
+    paths[1].write_bytes(b"changed")
+    assert not DigestMemo(memo_json).verify(paths[1], digests[paths[1]])
+    assert reads[-1] == paths[1]
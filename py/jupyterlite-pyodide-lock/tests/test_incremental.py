@@ -0,0 +1,106 @@
+"""Tests of seeding solves with pins from a previous lock."""
+# Copyright (c) jupyterlite-pyodide-lock contributors.
+# Distributed under the terms of the BSD-3-Clause License.
+
+from __future__ import annotations
+
+import json
+import logging
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, Any
+
+from jupyterlite_core.constants import UTF8
+
+from jupyterlite_pyodide_lock.addons.lock import PyodideLockAddon, resolve_with_pins
+from jupyterlite_pyodide_lock.constants import PYODIDE_LOCK
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+#: a logger for the tests
+LOG = logging.getLogger(__name__)
+
+
+def write_lock(path: Path, versions: dict[str, str]) -> None:
+    """Write a minimal lock of packages with versions."""
+    packages = {
+        name: {"name": name, "version": version, "package_type": "package"}
+        for name, version in versions.items()
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({"packages": packages}), **UTF8)
+
+
+def make_addon(tmp_path: Path, *, incremental: bool = True) -> Any:
+    """Make just enough of an addon to find previous pins."""
+    out_pyodide = tmp_path / "output/static/pyodide"
+    write_lock(out_pyodide / PYODIDE_LOCK, {"micropip": "0.9.0", "numpy": "2.0.0"})
+    return SimpleNamespace(
+        incremental=incremental,
+        lockfile=tmp_path / "output/static/pyodide-lock" / PYODIDE_LOCK,
+        previous_lockfile=tmp_path / "cache/pyodide-lock-previous.json",
+        pyodide_addon=SimpleNamespace(output_pyodide=out_pyodide),
+        log=LOG,
+    )
+
+
+def test_incremental_pins(tmp_path: Path) -> None:
+    """Verify only changed, indirect packages of the previous lock are pinned."""
+    addon = make_addon(tmp_path)
+    write_lock(
+        addon.previous_lockfile,
+        {
+            "micropip": "0.9.0",
+            "numpy": "2.1.0",
+            "Foo_Bar": "1.0.0",
+            "direct": "1.0.0",
+            "constrained": "1.0.0",
+            "local": "1.0.0",
+        },
+    )
+    local = tmp_path / "local-1.0.0-py3-none-any.whl"
+
+    pins = PyodideLockAddon.get_previous_pins(
+        addon, [local], ["direct>=1"], ["constrained<2"]
+    )
+
+    assert pins == ["foo-bar ==1.0.0", "numpy ==2.1.0"]
+
+
+def test_incremental_off(tmp_path: Path) -> None:
+    """Verify nothing is pinned if not ``incremental``, or without a previous lock."""
+    assert not PyodideLockAddon.get_previous_pins(make_addon(tmp_path), [], [], [])
+
+    addon = make_addon(tmp_path, incremental=False)
+    write_lock(addon.previous_lockfile, {"foo": "1.0.0"})
+    assert not PyodideLockAddon.get_previous_pins(addon, [], [], [])
+
+
+def test_incremental_fallback(tmp_path: Path) -> None:
+    """Verify a solve with conflicting pins is retried without any."""
+    lockfile = tmp_path / PYODIDE_LOCK
+    attempts: list[list[str]] = []
+
+    def _make_locker(pins: list[str]) -> Any:
+        def _resolve_sync() -> bool:
+            attempts.append(pins)
+            if pins:
+                return False
+            lockfile.write_text("{}", **UTF8)
+            return True
+
+        return SimpleNamespace(resolve_sync=_resolve_sync)
+
+    assert resolve_with_pins(_make_locker, lockfile, ["foo ==1.0.0"], LOG)
+    assert attempts == [["foo ==1.0.0"], []]
+
+
+def test_incremental_no_lock(tmp_path: Path) -> None:
+    """Verify a solve without pins is not retried."""
+    attempts: list[list[str]] = []
+
+    def _make_locker(pins: list[str]) -> Any:
+        return SimpleNamespace(resolve_sync=lambda: attempts.append(pins))
+
+    assert not resolve_with_pins(_make_locker, tmp_path / PYODIDE_LOCK, [], LOG)
+    assert attempts == [[]]
@@ -0,0 +1,63 @@
+"""Tests of link strategies."""
+# Copyright (c) jupyterlite-pyodide-lock contributors.
+# Distributed under the terms of the BSD-3-Clause License.
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import pytest
+
+from jupyterlite_pyodide_lock.constants import (
+    LINK_COPY,
+    LINK_HARDLINK,
+    LINK_REFLINK,
+    LINK_STRATEGIES,
+)
+from jupyterlite_pyodide_lock.linking import Linker
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+WHEEL = "foo-1.0.0-py3-none-any.whl"
+
+#: a link, a probe, and a replacement
+LINKS_PER_TEST = 3
+
+
+@pytest.mark.parametrize(
+    "strategies",
+    [
+        (LINK_COPY,),
+        (LINK_HARDLINK, LINK_COPY),
+        (LINK_REFLINK, LINK_COPY),
+        LINK_STRATEGIES,
+    ],
+)
+def test_linker(tmp_path: Path, strategies: tuple[str, ...]) -> None:
+    """Verify files are placed, and replaced without writing through links."""
+    linker = Linker(strategies)
+    src = tmp_path / "src" / WHEEL
+    src.parent.mkdir()
+    src.write_bytes(b"foo")
+    dest = tmp_path / "dest" / WHEEL
+
+    strategy = linker.link(src, dest)
+    assert strategy in strategies
+    assert dest.read_bytes() == b"foo"
+    assert dest.samefile(src) == (strategy == LINK_HARDLINK)
+    assert linker.probe(tmp_path / "src", tmp_path / "dest" / "new") == strategy
+
+    other = tmp_path / "other" / WHEEL
+    other.parent.mkdir()
+    other.write_bytes(b"other foo")
+    linker.link(other, dest)
+    assert dest.read_bytes() == b"other foo"
+    assert src.read_bytes() == b"foo"
+    assert sum(linker.counts.values()) == LINKS_PER_TEST
+
+
+def test_linker_unknown() -> None:
+    """Verify unknown strategies are rejected."""
+    with pytest.raises(ValueError, match="symlink"):
+        Linker(["symlink"])
@@ -0,0 +1,57 @@
+"""Tests of the solved lockfile cache."""
+# Copyright (c) jupyterlite-pyodide-lock contributors.
+# Distributed under the terms of the BSD-3-Clause License.
+
+from __future__ import annotations
+
+import json
+from typing import TYPE_CHECKING
+
+from jupyterlite_core.constants import UTF8
+
+from jupyterlite_pyodide_lock.constants import PYODIDE_LOCK, PYODIDE_LOCK_STEM
+from jupyterlite_pyodide_lock.lock_cache import LockResultCache, get_inputs_digest
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+WHEEL = "foo-1.0.0-py3-none-any.whl"
+STALE_WHEEL = "bar-1.0.0-py3-none-any.whl"
+OTHER_WHEEL = "qux-1.0.0-py3-none-any.whl"
+
+
+def test_lock_cache_roundtrip(tmp_path: Path) -> None:
+    """Verify a lockfile and its sibling wheels are restored."""
+    lock_dir = tmp_path / "_output/static" / PYODIDE_LOCK_STEM
+    lock_dir.mkdir(parents=True)
+    lockfile = lock_dir / PYODIDE_LOCK
+    lock_json = {
+        "packages": {
+            "foo": {"file_name": f"../../static/{PYODIDE_LOCK_STEM}/{WHEEL}"},
+            "baz": {"file_name": "https://example.com/baz-1.0.0-py3-none-any.whl"},
+        }
+    }
+    lockfile.write_text(json.dumps(lock_json), **UTF8)
+    (lock_dir / WHEEL).write_bytes(b"foo")
+
+    digest = get_inputs_digest({"specs": ["foo"]})
+    assert digest == get_inputs_digest({"specs": ["foo"]})
+    assert digest != get_inputs_digest({"specs": ["foo", "baz"]})
+
+    cache = LockResultCache(tmp_path / "cache")
+    assert not cache.restore(digest, lockfile)
+    cache.save(digest, lockfile)
+
+    # a rebuilt wheel of the same size, and a wheel of another lock
+    (lock_dir / WHEEL).unlink()
+    (lock_dir / WHEEL).write_bytes(b"oof")
+    (lock_dir / STALE_WHEEL).write_bytes(b"bar")
+    (lock_dir / OTHER_WHEEL).write_bytes(b"qux")
+    stale_json = {"packages": {"bar": {"file_name": STALE_WHEEL}}}
+    lockfile.write_text(json.dumps(stale_json), **UTF8)
+
+    assert cache.restore(digest, lockfile)
+    assert json.loads(lockfile.read_text(**UTF8)) == lock_json
+    assert (lock_dir / WHEEL).read_bytes() == b"foo"
+    assert not (lock_dir / STALE_WHEEL).exists()
+    assert (lock_dir / OTHER_WHEEL).read_bytes() == b"qux"
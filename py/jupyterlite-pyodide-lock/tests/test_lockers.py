@@ -0,0 +1,160 @@
+"""Tests of locker lifecycles."""
+# Copyright (c) jupyterlite-pyodide-lock contributors.
+# Distributed under the terms of the BSD-3-Clause License.
+
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, Any
+
+from traitlets import Instance
+
+from jupyterlite_pyodide_lock.cassette import get_cassette_key
+from jupyterlite_pyodide_lock.constants import (
+    INDEX_MODE_SIMPLE,
+    OPTION_LOCK_FILE_URL,
+    PROXY,
+    PYODIDE_LOCK,
+)
+from jupyterlite_pyodide_lock.lockers.handlers import write_proxied_lock
+from jupyterlite_pyodide_lock.lockers.tornado import TornadoLocker
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+#: seconds a signalled solve may take to be noticed
+MAX_LATENCY = 0.5
+
+#: the least time a stall can be detected after the last activity
+STALL_MIN = 0.25
+
+
+class OrphanLocker(TornadoLocker):
+    """A locker that doesn't need a ``PyodideLockAddon``."""
+
+    parent: Any = Instance(object, allow_none=True)
+
+
+def test_lockers_halt_wakes_waiter() -> None:
+    """Verify halting a solve wakes the waiter without polling."""
+    locker = OrphanLocker()
+
+    async def _solve() -> float:
+        start = time.perf_counter()
+        asyncio.get_running_loop().call_later(0.01, locker.halt_solve)
+        await locker.wait_for_solve(asyncio.sleep(60))
+        return time.perf_counter() - start
+
+    assert asyncio.run(_solve()) < MAX_LATENCY
+    assert locker._solve_halted  # noqa: SLF001
+
+
+def test_lockers_other_waiter() -> None:
+    """Verify another awaitable, like a client exiting, also ends the wait."""
+    locker = OrphanLocker()
+
+    async def _solve() -> None:
+        await locker.wait_for_solve(asyncio.sleep(0.01))
+
+    asyncio.run(_solve())
+    assert not locker._solve_halted  # noqa: SLF001
+
+
+def test_lockers_stall() -> None:
+    """Verify a solve without progress is abandoned, but activity postpones it."""
+    locker = OrphanLocker(stall_timeout=0.1)
+
+    async def _solve() -> float:
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        for delay in [0.05, 0.1, 0.15]:
+            loop.call_later(delay, locker.note_activity, f"GET {delay}")
+        await locker.wait_for_solve(asyncio.sleep(60))
+        return time.perf_counter() - start
+
+    elapsed = asyncio.run(_solve())
+    assert locker._solve_stalled  # noqa: SLF001
+    assert not locker._solve_halted  # noqa: SLF001
+    assert STALL_MIN < elapsed < MAX_LATENCY
+
+
+def get_locker_cassette_key(**kwargs: Any) -> str:
+    """Get the cassette key of a locker with some settings."""
+    locker = OrphanLocker(**kwargs)
+    locker.parent = SimpleNamespace(lock_date_epoch=None)
+    return get_cassette_key(locker.cassette_inputs)
+
+
+def test_lockers_cassette_inputs() -> None:
+    """Verify settings which change the proxied URLs change the cassette."""
+    key = get_locker_cassette_key(specs=["foo"])
+    assert key == get_locker_cassette_key(specs=["foo"], pins=["bar ==1"])
+    assert key == get_locker_cassette_key(specs=["foo"], stall_timeout=1)
+    for settings in [
+        {"index_mode": INDEX_MODE_SIMPLE},
+        {"pypi_api_url": "https://example.com/pypi"},
+        {"wheelhouses": ["wheels"]},
+        {"wheelhouse_only": True},
+        {"proxy_pyodide_cdn": True},
+        {"slim_json": False},
+        {"slim_json_constraints": True},
+        {"extra_micropip_args": {"keep_going": True}},
+    ]:
+        assert key != get_locker_cassette_key(specs=["foo"], **settings), settings
+
+
+def test_lockers_heartbeat() -> None:
+    """Verify browser heartbeats postpone a stall, and are only reported once."""
+    locker = OrphanLocker(stall_timeout=0.1)
+
+    async def _solve() -> None:
+        loop = asyncio.get_running_loop()
+        for i in range(10):
+            loop.call_later(0.03 * i, locker.note_activity, "[heartbeat] solving")
+        loop.call_later(0.3, locker.halt_solve)
+        await locker.wait_for_solve(asyncio.sleep(60))
+
+    asyncio.run(_solve())
+    assert locker._solve_halted  # noqa: SLF001
+    assert not locker._solve_stalled  # noqa: SLF001
+    assert [*locker._recent_activity] == [  # noqa: SLF001
+        "waiting for solve",
+        "[heartbeat] solving",
+    ]
+
+
+def test_lockers_proxied_lock(tmp_path: Path) -> None:
+    """Verify only packages missing from ``output_pyodide`` use the CDN proxy."""
+    output_dir = tmp_path / "output"
+    out_pyodide = output_dir / "static/pyodide"
+    out_pyodide.mkdir(parents=True)
+    (out_pyodide / "local-1.0-py3-none-any.whl").write_bytes(b"")
+    remote = "https://example.com/remote-1.0-py3-none-any.whl"
+    packages = {
+        "local": {"file_name": "local-1.0-py3-none-any.whl"},
+        "missing": {"file_name": "missing-1.0-py3-none-any.whl"},
+        "remote": {"file_name": remote},
+    }
+    (out_pyodide / PYODIDE_LOCK).write_text(json.dumps({"packages": packages}))
+    parent = SimpleNamespace(
+        pyodide_addon=SimpleNamespace(output_pyodide=out_pyodide),
+        manager=SimpleNamespace(cache_dir=tmp_path / "cache", output_dir=output_dir),
+        bootstrap_packages=["micropip"],
+    )
+    locker = OrphanLocker(port=9999, proxy_pyodide_cdn=True)
+    locker.parent = parent
+
+    lock_path = write_proxied_lock(locker)
+    proxied = json.loads(lock_path.read_text())["packages"]
+    assert proxied["local"]["file_name"] == (
+        f"{locker.base_url}/static/pyodide/local-1.0-py3-none-any.whl"
+    )
+    assert proxied["remote"] == packages["remote"]
+    assert proxied["missing"]["file_name"] == (
+        f"{locker.base_url}/{PROXY}/pyodide/missing-1.0-py3-none-any.whl"
+    )
+    lock_url = locker.load_pyodide_options[OPTION_LOCK_FILE_URL]
+    assert lock_url.endswith(f"/{PROXY}/{lock_path.name}")
@@ -0,0 +1,40 @@
+"""Tests of incremental offline resolution."""
+# Copyright (c) jupyterlite-pyodide-lock contributors.
+# Distributed under the terms of the BSD-3-Clause License.
+
+from __future__ import annotations
+
+import os
+from typing import TYPE_CHECKING
+
+from jupyterlite_pyodide_lock.addons.offline import (
+    get_offline_key,
+    get_offline_state,
+    is_offline_current,
+)
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+STEM = "../../static/pyodide-lock"
+
+
+def test_offline_state(tmp_path: Path) -> None:
+    """Verify an offline result is only reused for the same entry and wheel."""
+    pkg_info = {"file_name": "https://example.com/foo.whl", "sha256": "abc"}
+    key = get_offline_key(pkg_info, STEM)
+    assert key == get_offline_key({**pkg_info}, STEM)
+    assert key != get_offline_key({**pkg_info, "sha256": "def"}, STEM)
+
+    dest = tmp_path / "foo.whl"
+    dest.write_bytes(b"foo")
+    state = get_offline_state(key, {**pkg_info, "file_name": "foo.whl"}, dest)
+    assert state["file_name"] == "foo.whl"
+    assert is_offline_current(state)
+
+    stat = dest.stat()
+    os.utime(dest, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    assert not is_offline_current(state)
+
+    dest.unlink()
+    assert not is_offline_current(state)
@@ -0,0 +1,65 @@
+"""Tests of running rewrites away from the event loop."""
+# Copyright (c) jupyterlite-pyodide-lock contributors.
+# Distributed under the terms of the BSD-3-Clause License.
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+from datetime import datetime, timezone
+
+import pytest
+
+from jupyterlite_pyodide_lock.constants import WAREHOUSE_UPLOAD_FORMAT_ANY
+from jupyterlite_pyodide_lock.lockers.handlers.offload import (
+    EXECUTORS,
+    make_executor,
+    offload,
+)
+from jupyterlite_pyodide_lock.lockers.handlers.warehouse import WarehouseSlimmer
+from jupyterlite_pyodide_lock.utils import warehouse_date_to_epoch
+
+PROJECT = {
+    "info": {"name": "a"},
+    "releases": {"1.0": [{"filename": "a-1.0.tar.gz"}]},
+}
+
+
+@pytest.mark.parametrize("kind", EXECUTORS)
+def test_offload(kind: str) -> None:
+    """Verify picklable work uses the pool, and other work uses threads."""
+    executor = make_executor(kind, 1)
+
+    async def _run() -> tuple[bytes, int]:
+        body, elapsed = await offload(
+            executor, WarehouseSlimmer(), json.dumps(PROJECT).encode(), picklable=True
+        )
+        assert elapsed >= 0
+        pid, _elapsed = await offload(executor, os.getpid)
+        return body, pid
+
+    try:
+        body, pid = asyncio.run(_run())
+    finally:
+        executor.shutdown()
+
+    assert json.loads(body)["releases"] == {}
+    assert pid == os.getpid()
+
+
+@pytest.mark.parametrize(
+    "iso8601",
+    ["2024-01-02T03:04:05.678901Z", "2024-01-02T03:04:05Z", "2024-01-02T03:04:05.6Z"],
+)
+def test_warehouse_date_fast_path(iso8601: str) -> None:
+    """Verify parsing upload dates matches the Warehouse formats."""
+    for fmt in WAREHOUSE_UPLOAD_FORMAT_ANY:
+        try:
+            expected = datetime.strptime(iso8601, fmt).replace(tzinfo=timezone.utc)
+        except ValueError:
+            continue
+        assert warehouse_date_to_epoch(iso8601) == int(expected.timestamp())
+        break
+    else:  # pragma: no cover
+        pytest.fail(f"{iso8601} is not a Warehouse date")
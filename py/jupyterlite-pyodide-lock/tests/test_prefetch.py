@@ -0,0 +1,94 @@
+"""Tests of speculatively fetching wheels."""
+# Copyright (c) jupyterlite-pyodide-lock contributors.
+# Distributed under the terms of the BSD-3-Clause License.
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from http import HTTPStatus
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, Any
+
+from jupyterlite_pyodide_lock.lockers.handlers.prefetch import (
+    Prefetcher,
+    pick_likely_wheel,
+)
+from jupyterlite_pyodide_lock.proxy_cache import ProxyCache
+
+from .test_cacher import get_all, make_app
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+REMOTE = "https://files.example.com"
+WHEEL = "packages/a-1.0-py3-none-any.whl"
+
+
+def make_project(files: dict[str, dict[str, Any]]) -> bytes:
+    """Make a Warehouse project document with some files, by version."""
+    releases: dict[str, list[dict[str, Any]]] = {}
+    for filename, extra in files.items():
+        version = filename.split("-")[1].removesuffix(".tar.gz")
+        releases.setdefault(version, []).append({
+            "filename": filename,
+            "url": f"{REMOTE}/packages/{filename}",
+            "size": 10,
+            **extra,
+        })
+    return json.dumps({"info": {"name": "a"}, "releases": releases}).encode()
+
+
+def test_prefetch_pick() -> None:
+    """Verify the newest final pure python wheel is picked."""
+    body = make_project({
+        "a-1.0-py3-none-any.whl": {},
+        "a-1.1-py3-none-any.whl": {"yanked": True},
+        "a-1.2-cp312-cp312-pyodide_2024_0_wasm32.whl": {},
+        "a-1.3.tar.gz": {},
+        "a-2.0rc1-py3-none-any.whl": {},
+    })
+    assert pick_likely_wheel(body) == (f"{REMOTE}/{WHEEL}", 10)
+    simple = {"files": [{"filename": "a-1.0-py3-none-any.whl", "url": "x"}]}
+    assert pick_likely_wheel(json.dumps(simple).encode()) == ("x", 0)
+
+
+class WheelClient:
+    """A client which responds with its URL, slowly."""
+
+    def __init__(self) -> None:
+        """Initialize the fetched URLs."""
+        self.urls: list[str] = []
+
+    async def fetch(self, url: str, **_kwargs: Any) -> Any:
+        """Pretend to fetch a URL."""
+        self.urls.append(url)
+        await asyncio.sleep(0.05)
+        return SimpleNamespace(code=HTTPStatus.OK, headers={}, body=url.encode())
+
+
+def test_prefetch_wheel(tmp_path: Path) -> None:
+    """Verify a requested wheel waits for its prefetch, within the budget."""
+    client = WheelClient()
+    cache = ProxyCache(tmp_path)
+    prefetcher = Prefetcher(
+        root=tmp_path,
+        remote=REMOTE,
+        client=client,  # type: ignore[arg-type]
+        cache=cache,
+        max_bytes=15,
+        log=logging.getLogger(__name__),
+    )
+    app = make_app(tmp_path, client, remote=REMOTE, prefetcher=prefetcher)
+
+    async def _run() -> list[bytes]:
+        await prefetcher.schedule(make_project({"a-1.0-py3-none-any.whl": {}}))
+        await prefetcher.schedule(make_project({"b-1.0-py3-none-any.whl": {}}))
+        return await get_all(app, [WHEEL])
+
+    assert asyncio.run(_run()) == [f"{REMOTE}/{WHEEL}".encode()]
+    assert client.urls == [f"{REMOTE}/{WHEEL}"]
+    assert prefetcher.used == 1
+    assert cache.stats["prefetched"] == 1
+    assert cache.stats["prefetch_skipped"] == 1
@@ -0,0 +1,61 @@
+"""Tests of the size-capped proxy cache."""
+# Copyright (c) jupyterlite-pyodide-lock contributors.
+# Distributed under the terms of the BSD-3-Clause License.
+
+from __future__ import annotations
+
+import os
+from typing import TYPE_CHECKING
+
+from jupyterlite_pyodide_lock.proxy_cache import ProxyCache
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+#: bytes of a document worth compressing in the tests
+COMPRESS_MIN = 100
+
+
+def test_proxy_cache_documents(tmp_path: Path) -> None:
+    """Verify large documents are compressed, and small ones kept in memory."""
+    cache = ProxyCache(tmp_path, compress_min_bytes=COMPRESS_MIN, memory_bytes=50)
+    big, small = tmp_path / "pypi/big/json", tmp_path / "pypi/small/json"
+    big.parent.mkdir(parents=True)
+    small.parent.mkdir(parents=True)
+
+    cache.write(big, b"{}" * COMPRESS_MIN)
+    cache.write(small, b"{}")
+    assert not big.exists()
+    assert cache.gz_path(big).stat().st_size < COMPRESS_MIN
+    assert small.read_bytes() == b"{}"
+
+    assert cache.read(big) == b"{}" * COMPRESS_MIN
+    assert cache.read(small) == b"{}"
+    assert cache.stats["memory_hits"] == 1
+
+    cache.write(big, b"{}")
+    assert big.exists()
+    assert not cache.gz_path(big).exists()
+
+
+def test_proxy_cache_evict(tmp_path: Path) -> None:
+    """Verify the least recently used entries are evicted, with their sidecars."""
+    cache = ProxyCache(tmp_path, max_bytes=250)
+    (tmp_path / "pyodide-lock.json").write_bytes(b"x" * 1000)
+    paths = [tmp_path / f"pythonhosted/{i}.whl" for i in range(3)]
+    paths[0].parent.mkdir()
+    for i, path in enumerate(paths):
+        path.write_bytes(b"x" * 100)
+        path.with_name(f"{path.name}.meta.json").write_bytes(b"{}")
+        os.utime(path, ns=(i * 10**9, i * 10**9))
+
+    cache.read(paths[0])
+    assert cache.evict() == 1
+    assert [path.exists() for path in paths] == [True, False, True]
+    assert not paths[1].with_name(f"{paths[1].name}.meta.json").exists()
+    assert (tmp_path / "pyodide-lock.json").exists()
+
+    summary = cache.prune()
+    assert "2 files" in summary
+    assert "evictions 1" in summary
+    assert ProxyCache.read_stats(tmp_path)["evictions"] == 1
@@ -0,0 +1,88 @@
+"""Tests of retrying proxied fetches."""
+# Copyright (c) jupyterlite-pyodide-lock contributors.
+# Distributed under the terms of the BSD-3-Clause License.
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+from tornado.httpclient import HTTPClientError
+
+from jupyterlite_pyodide_lock.lockers.handlers.cacher import CachingRemoteFiles
+from jupyterlite_pyodide_lock.lockers.handlers.retry import RetryPolicy
+
+URL = "https://example.com/foo.json"
+HOST = "example.com"
+
+#: seconds a first, successful attempt may take
+MAX_FIRST_ATTEMPT = 0.2
+
+
+class FakeClient:
+    """A client which fails with some errors, then succeeds."""
+
+    def __init__(self, *errors: Exception) -> None:
+        """Initialize the errors to raise."""
+        self.errors = [*errors]
+        self.calls = 0
+
+    async def fetch(self, url: str) -> Any:
+        """Fail with the next error, or succeed."""
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return SimpleNamespace(body=url.encode())
+
+
+def fetch(client: FakeClient, policy: RetryPolicy) -> bytes:
+    """Fetch the URL with a fake handler."""
+    handler: Any = SimpleNamespace(
+        client=client, retry_policy=policy, log=logging.getLogger(__name__)
+    )
+    res = asyncio.run(CachingRemoteFiles.fetch_with_retries(handler, URL))
+    return res.body
+
+
+def test_retry_first_attempt_immediate() -> None:
+    """Verify a successful first attempt doesn't wait."""
+    policy = RetryPolicy()
+    start = time.perf_counter()
+    assert fetch(FakeClient(), policy) == URL.encode()
+    assert time.perf_counter() - start < MAX_FIRST_ATTEMPT
+    assert policy.metrics[HOST] == {"attempts": 1}
+
+
+def test_retry_retryable() -> None:
+    """Verify server errors are retried, within a budget."""
+    policy = RetryPolicy(base_delay=0.001, host_budget=2)
+    client = FakeClient(HTTPClientError(503), HTTPClientError(599))
+    assert fetch(client, policy) == URL.encode()
+    assert policy.metrics[HOST] == {"attempts": 3, "retries": 2}
+
+    client = FakeClient(HTTPClientError(502))
+    with pytest.raises(HTTPClientError):
+        fetch(client, policy)
+    assert policy.metrics[HOST]["exhausted"] == 1
+    assert "failures 1" in policy.summary()
+
+
+def test_retry_not_retryable() -> None:
+    """Verify client errors fail at once."""
+    policy = RetryPolicy()
+    client = FakeClient(HTTPClientError(404))
+    with pytest.raises(HTTPClientError):
+        fetch(client, policy)
+    assert client.calls == 1
+
+
+@pytest.mark.parametrize("attempt", [1, 2, 3, 10])
+def test_retry_delay(attempt: int) -> None:
+    """Verify delays are jittered below an exponential, capped limit."""
+    policy = RetryPolicy(base_delay=1, max_delay=3)
+    assert policy.get_delay(0) == 0
+    assert 0 <= policy.get_delay(attempt) <= min(3, 2 ** (attempt - 1))
@@ -0,0 +1,63 @@
+"""Tests of the shared wheel store."""
+# Copyright (c) jupyterlite-pyodide-lock contributors.
+# Distributed under the terms of the BSD-3-Clause License.
+
+from __future__ import annotations
+
+from hashlib import sha256
+from typing import TYPE_CHECKING
+
+from jupyterlite_pyodide_lock.store import WheelStore
+from jupyterlite_pyodide_lock.utils import url_sha256
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+WHEEL = "foo-1.0.0-py3-none-any.whl"
+
+
+def test_store_roundtrip(tmp_path: Path) -> None:
+    """Verify a wheel is stored once, and found by name or ``sha256``."""
+    store = WheelStore(tmp_path / "store")
+    wheel = tmp_path / "cache" / WHEEL
+    wheel.parent.mkdir()
+    wheel.write_bytes(b"foo")
+    digest = sha256(b"foo").hexdigest()
+
+    assert store.find(file_name=WHEEL) is None
+    assert store.add(wheel) == digest
+    assert store.add(wheel) == digest
+
+    by_name = store.find(file_name=WHEEL)
+    by_sha = store.find(sha256=digest)
+    assert by_name
+    assert by_sha
+    assert by_name.samefile(by_sha)
+
+    other = tmp_path / "other" / WHEEL
+    assert store.link_to(other, sha256=digest)
+    assert other.read_bytes() == b"foo"
+    assert not store.link_to(other, file_name="bar-1.0.0-py3-none-any.whl")
+
+
+def test_store_sha256_mismatch(tmp_path: Path) -> None:
+    """Verify a wheel found by name is only used if it has any known ``sha256``."""
+    store = WheelStore(tmp_path / "store")
+    wheel = tmp_path / "cache" / WHEEL
+    wheel.parent.mkdir()
+    wheel.write_bytes(b"foo")
+    store.add(wheel)
+    other_digest = sha256(b"other foo").hexdigest()
+
+    assert store.find(file_name=WHEEL)
+    assert store.find(file_name=WHEEL, sha256=sha256(b"foo").hexdigest())
+    assert store.find(file_name=WHEEL, sha256=other_digest) is None
+    assert not store.link_to(
+        tmp_path / "other" / WHEEL, file_name=WHEEL, sha256=other_digest
+    )
+
+
+def test_store_url_sha256() -> None:
+    """Verify a ``sha256`` is found in a URL fragment."""
+    assert url_sha256(f"https://example.com/{WHEEL}#sha256=abc") == "abc"
+    assert url_sha256(f"https://example.com/{WHEEL}") is None
@@ -0,0 +1,79 @@
+"""Tests of the shared upstream client for proxies."""
+# Copyright (c) jupyterlite-pyodide-lock contributors.
+# Distributed under the terms of the BSD-3-Clause License.
+
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+from typing import Any
+
+from jupyterlite_pyodide_lock.lockers.handlers import upstream
+from jupyterlite_pyodide_lock.lockers.handlers.upstream import UpstreamClient
+
+from .test_lockers import OrphanLocker
+
+#: the most concurrent fetches to one host in the test
+MAX_PER_HOST = 2
+
+
+class FakeClient:
+    """A client which tracks concurrent fetches, by host."""
+
+    def __init__(self) -> None:
+        """Initialize the counters."""
+        self.active: dict[str, int] = {}
+        self.peak: dict[str, int] = {}
+        self.closed = False
+
+    async def fetch(self, url: str, **_kwargs: Any) -> Any:
+        """Pretend to fetch a URL."""
+        host = url.split("/")[2]
+        self.active[host] = self.active.get(host, 0) + 1
+        self.peak[host] = max(self.peak.get(host, 0), self.active[host])
+        await asyncio.sleep(0.01)
+        self.active[host] -= 1
+        return SimpleNamespace(body=url.encode())
+
+    def close(self) -> None:
+        """Pretend to close connections."""
+        self.closed = True
+
+
+def test_upstream_engine_auto() -> None:
+    """Verify the ``auto`` engine falls back to the simple client."""
+    client = UpstreamClient(engine=upstream.ENGINE_AUTO)
+    assert client.engine in {upstream.ENGINE_CURL, upstream.ENGINE_SIMPLE}
+    assert client.client.max_clients == client.max_clients  # type: ignore[attr-defined]
+    client.close()
+
+
+def test_upstream_per_host() -> None:
+    """Verify concurrent fetches are limited per host, but not across hosts."""
+    client = UpstreamClient(engine=upstream.ENGINE_SIMPLE, max_per_host=MAX_PER_HOST)
+    fake = FakeClient()
+    client.client = fake  # type: ignore[assignment]
+    urls = [f"https://{host}/{i}" for host in ["a.org", "b.org"] for i in range(10)]
+
+    async def _fetch_all() -> list[Any]:
+        return await asyncio.gather(*map(client.fetch, urls))
+
+    assert [res.body for res in asyncio.run(_fetch_all())] == [
+        url.encode() for url in urls
+    ]
+    assert fake.peak == {"a.org": MAX_PER_HOST, "b.org": MAX_PER_HOST}
+
+
+def test_upstream_locker_cleanup() -> None:
+    """Verify a locker closes its client with the server, if it was created."""
+    locker = OrphanLocker(http_client_engine=upstream.ENGINE_SIMPLE, max_clients=3)
+    locker._http_server = None  # noqa: SLF001
+    locker.cleanup_server()
+    assert not locker.trait_has_value("_upstream_client")
+
+    client = locker._upstream_client  # noqa: SLF001
+    assert client.max_clients == 3  # noqa: PLR2004
+    fake = FakeClient()
+    client.client = fake  # type: ignore[assignment]
+    locker.cleanup_server()
+    assert fake.closed
@@ -0,0 +1,124 @@
+"""Tests of slimming Warehouse JSON."""
+# Copyright (c) jupyterlite-pyodide-lock contributors.
+# Distributed under the terms of the BSD-3-Clause License.
+
+from __future__ import annotations
+
+import json
+import pickle  # noqa: S403
+from typing import Any
+
+import pytest
+
+from jupyterlite_pyodide_lock.lockers.handlers.warehouse import (
+    WarehouseSlimmer,
+    get_artifact_digests,
+    is_browser_wheel,
+)
+from jupyterlite_pyodide_lock.utils import warehouse_date_to_epoch
+
+LOCK_DATE = "2024-01-01T00:00:00.000000Z"
+EARLY_DATE = "2023-01-01T00:00:00.000000Z"
+LATER_DATE = "2024-06-01T00:00:00.000000Z"
+
+
+def make_project(releases: dict[str, list[tuple[str, str]]]) -> bytes:
+    """Make a Warehouse project document."""
+    data: dict[str, Any] = {
+        "info": {"name": "A_Project"},
+        "releases": {
+            version: [
+                {"filename": filename, "upload_time_iso_8601": uploaded}
+                for filename, uploaded in artifacts
+            ]
+            for version, artifacts in releases.items()
+        },
+    }
+    data["urls"] = data["releases"][max(releases)]
+    return json.dumps(data).encode()
+
+
+PROJECT = make_project({
+    "1.0": [
+        ("a_project-1.0.tar.gz", EARLY_DATE),
+        ("a_project-1.0-py3-none-any.whl", EARLY_DATE),
+    ],
+    "1.1": [
+        ("a_project-1.1-cp312-cp312-manylinux_2_17_x86_64.whl", EARLY_DATE),
+        ("a_project-1.1-cp312-cp312-pyodide_2024_0_wasm32.whl", EARLY_DATE),
+    ],
+    "1.2": [("a_project-1.2.tar.gz", EARLY_DATE)],
+    "2.0": [("a_project-2.0-py3-none-any.whl", LATER_DATE)],
+})
+
+
+def get_files(slimmer: WarehouseSlimmer) -> dict[str, list[str]]:
+    """Get the remaining files of each release."""
+    data = json.loads(slimmer(PROJECT))
+    return {
+        version: [a["filename"] for a in artifacts]
+        for version, artifacts in data["releases"].items()
+    }
+
+
+@pytest.mark.parametrize(
+    ("filename", "expected"),
+    [
+        ("a-1.0-py3-none-any.whl", True),
+        ("a-1.0-cp312-cp312-emscripten_3_1_58_wasm32.whl", True),
+        ("a-1.0-cp312-cp312-pyodide_2024_0_wasm32.whl", True),
+        ("a-1.0-cp312-cp312-win_amd64.whl", False),
+        ("a-1.0.tar.gz", False),
+    ],
+)
+def test_warehouse_browser_wheel(filename: str, expected: bool) -> None:  # noqa: FBT001
+    """Verify which files can be installed in the browser."""
+    assert is_browser_wheel(filename) == expected
+
+
+def test_warehouse_slim() -> None:
+    """Verify only browser-compatible wheels, and their releases, are kept."""
+    assert get_files(WarehouseSlimmer()) == {
+        "1.0": ["a_project-1.0-py3-none-any.whl"],
+        "1.1": ["a_project-1.1-cp312-cp312-pyodide_2024_0_wasm32.whl"],
+        "2.0": ["a_project-2.0-py3-none-any.whl"],
+    }
+
+
+def test_warehouse_lock_date_constraints() -> None:
+    """Verify releases are filtered by lock date and constraints in one pass."""
+    slimmer = WarehouseSlimmer(
+        lock_date_epoch=warehouse_date_to_epoch(LOCK_DATE),
+        slim=False,
+        constraints=["a-project>=1.1", "A.Project<2"],
+    )
+    assert get_files(slimmer) == {
+        "1.1": [
+            "a_project-1.1-cp312-cp312-manylinux_2_17_x86_64.whl",
+            "a_project-1.1-cp312-cp312-pyodide_2024_0_wasm32.whl",
+        ],
+        "1.2": ["a_project-1.2.tar.gz"],
+    }
+    assert json.loads(slimmer(PROJECT))["urls"] == []
+
+
+def test_warehouse_key() -> None:
+    """Verify the cache key follows the settings, and survives pickling."""
+    slimmer = WarehouseSlimmer(constraints=["a-project<2"])
+    assert slimmer.enabled
+    assert not WarehouseSlimmer(slim=False).enabled
+    assert slimmer.key != WarehouseSlimmer().key
+    assert pickle.loads(pickle.dumps(slimmer)).key == slimmer.key  # noqa: S301
+
+
+def test_warehouse_artifact_digests() -> None:
+    """Verify the ``sha256`` of artifacts are found in Warehouse and PEP 691 JSON."""
+    url = "https://files.pythonhosted.org/packages/a_project-1.0-py3-none-any.whl"
+    warehouse = {
+        "releases": {"1.0": [{"url": url, "digests": {"sha256": "abc"}}]},
+        "urls": [{"url": "https://example.com/a.whl", "digests": {}}],
+    }
+    pep_691 = {"files": [{"url": f"{url}#sha256=abc", "hashes": {"sha256": "abc"}}]}
+
+    assert get_artifact_digests(json.dumps(warehouse).encode()) == {url: "abc"}
+    assert get_artifact_digests(json.dumps(pep_691).encode()) == {url: "abc"}
@@ -0,0 +1,129 @@
+"""Tests of serving local wheels as a package index."""
+# Copyright (c) jupyterlite-pyodide-lock contributors.
+# Distributed under the terms of the BSD-3-Clause License.
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+from http import HTTPStatus
+from typing import TYPE_CHECKING
+
+import pytest
+from tornado.httpclient import AsyncHTTPClient
+from tornado.httpserver import HTTPServer
+from tornado.web import Application
+from traitlets.config import Config
+
+from jupyterlite_pyodide_lock.constants import (
+    INDEX_MODE_JSON,
+    INDEX_MODE_SIMPLE,
+    INDEX_MODES,
+    LOCALHOST,
+    SIMPLE_JSON_MIME,
+)
+from jupyterlite_pyodide_lock.lockers.browser import BrowserLocker
+from jupyterlite_pyodide_lock.lockers.handlers.wheelhouse import (
+    Wheelhouse,
+    WheelhouseIndex,
+    find_wheelhouse_wheels,
+)
+from jupyterlite_pyodide_lock.utils import get_unused_port
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from tornado.httpclient import HTTPResponse
+
+FILES_URL = "http://localhost/_wheelhouse/files"
+
+
+@pytest.fixture
+def a_wheelhouse(tmp_path: Path) -> Wheelhouse:
+    """Provide some folders of wheels."""
+    names = {
+        "one/nested": ["A_Project-1.0-py3-none-any.whl", "b-1.0-py3-none-any.whl"],
+        "two": ["a_project-2.0-py3-none-any.whl", "a_project-1.0-py3-none-any.whl"],
+    }
+    for folder, files in names.items():
+        (tmp_path / folder).mkdir(parents=True)
+        for name in files:
+            (tmp_path / folder / name).write_bytes(name.encode())
+    dirs = [tmp_path / "one", tmp_path / "two", tmp_path / "missing"]
+    return Wheelhouse(dirs, log=logging.getLogger(__name__))
+
+
+def test_wheelhouse_warehouse_json(a_wheelhouse: Wheelhouse) -> None:
+    """Verify wheels are described like the Warehouse JSON API."""
+    data = a_wheelhouse.get_warehouse_json("a.project", FILES_URL)
+    assert data is not None
+    assert data["info"] == {"name": "a-project", "version": "2.0"}
+    [one] = data["releases"]["1.0"]
+    assert one["url"] == f"{FILES_URL}/0/nested/A_Project-1.0-py3-none-any.whl"
+    expected = hashlib.sha256(b"A_Project-1.0-py3-none-any.whl").hexdigest()
+    assert one["digests"] == {"sha256": expected}
+    assert data["urls"][0]["url"] == f"{FILES_URL}/1/a_project-2.0-py3-none-any.whl"
+    assert a_wheelhouse.get_warehouse_json("c", FILES_URL) is None
+
+
+def test_wheelhouse_simple_json(a_wheelhouse: Wheelhouse) -> None:
+    """Verify wheels are described like the PEP 691 simple API."""
+    data = a_wheelhouse.get_simple_json("B", FILES_URL)
+    assert data is not None
+    assert data["versions"] == ["1.0"]
+    assert [f["filename"] for f in data["files"]] == ["b-1.0-py3-none-any.whl"]
+
+
+async def get_responses(
+    wheelhouse: Wheelhouse, index_mode: str, paths: list[str]
+) -> list[HTTPResponse]:
+    """Get some documents from a wheelhouse index."""
+    route = "^/simple/([^/]+)/$" if index_mode == INDEX_MODE_SIMPLE else "^/(.*)/json$"
+    config = {
+        "wheelhouse": wheelhouse,
+        "files_url": FILES_URL,
+        "index_mode": index_mode,
+        "log": logging.getLogger(__name__),
+    }
+    port = get_unused_port(LOCALHOST)
+    server = HTTPServer(Application([(route, WheelhouseIndex, config)]))
+    server.listen(port, LOCALHOST)
+    http = AsyncHTTPClient(force_instance=True)
+    try:
+        return [
+            await http.fetch(f"http://{LOCALHOST}:{port}/{path}", raise_error=False)
+            for path in paths
+        ]
+    finally:
+        http.close()
+        server.stop()
+
+
+@pytest.mark.parametrize("index_mode", INDEX_MODES)
+def test_wheelhouse_index(a_wheelhouse: Wheelhouse, index_mode: str) -> None:
+    """Verify known projects are served, and unknown projects are not found."""
+    pattern = "{}/json" if index_mode == INDEX_MODE_JSON else "simple/{}/"
+    paths = [pattern.format(name) for name in ["b", "c"]]
+    found, missing = asyncio.run(get_responses(a_wheelhouse, index_mode, paths))
+    assert missing.code == HTTPStatus.NOT_FOUND
+    assert found.code == HTTPStatus.OK
+    content_type = SIMPLE_JSON_MIME if index_mode == INDEX_MODE_SIMPLE else "json"
+    assert content_type in found.headers["Content-Type"]
+    assert "b-1.0-py3-none-any.whl" in json.dumps(json.loads(found.body))
+
+
+def test_wheelhouse_lock_inputs(tmp_path: Path) -> None:
+    """Verify the wheels of the most specific configured wheelhouses are found."""
+    for folder in ["base", "browser"]:
+        (tmp_path / folder).mkdir()
+        (tmp_path / folder / f"{folder}-1.0-py3-none-any.whl").write_bytes(b"")
+    config = Config({
+        "TornadoLocker": {"wheelhouses": ["base"]},
+        "BrowserLocker": {"wheelhouses": ["browser", "missing"]},
+    })
+
+    wheels = find_wheelhouse_wheels(config, BrowserLocker, tmp_path)
+
+    assert [w.name for w in wheels] == ["browser-1.0-py3-none-any.whl"]